@@ -1,8 +0,0 @@
-import shardedBot
-
-if __name__ == "__main__":
-    instance = 0
-    instances = 4
-    shards = 84
-    shard_ids = [0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14, 15, 16, 17, 18, 19, 20]
-    shardedBot.NekoBot(instance=instance, instances=instances, shard_count=shards, shard_ids=shard_ids, max_messages=101).run()
@@ -1,57 +1,54 @@
+import os, sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
 import rethinkdb as r
 import math
-import numpy as np
 import time
+from modules.utils import activity
 
 r_conn = r.connect(db="nekobot")
 
 def get_single():
     userid = str(input("Userid: "))
-    data = r.table("levelSystem").get(userid).run(r_conn, array_limit=500000)
+    data = r.table("levelSystem").get(userid).run(r_conn)
 
     if not data:
         print("User not found")
         exit(0)
 
+    stats = activity.summarize(data.get("xpactivity", activity.empty()))
+
     print("Blacklisted? %s" % data["blacklisted"])
     print("Last XP %s" % data["lastxp"])
-    print("Amount of xp times %s" % len(data["lastxptimes"]))
+    print("Amount of xp times %s" % stats["count"])
     print("XP %s" % data["xp"])
     print("Level %s" % (int((1 / 278) * (9 + math.sqrt(81 + 1112 * (data["xp"]))))))
 
-    lasttime = data["lastxptimes"][0]
-    i = []
-    for times in data["lastxptimes"]:
-
-        x = (int(times) - int(lasttime))
-        i.append(x)
-        print("Seconds Since: %s" % x)
-
+    recent = data.get("xpactivity", activity.empty())["recent"]
+    lasttime = recent[0] if recent else 0
+    for times in recent:
+        print("Seconds Since: %s" % (int(times) - int(lasttime)))
         lasttime = times
 
-    print("Seconds since last: %s" % (int(time.time()) - int(lasttime)))
-    print("Average: %s" % np.mean(i))
+    print("Seconds since last: %s" % (int(time.time()) - int(stats["last"])))
+    print("Average: %s" % stats["mean"])
+    print("Stddev: %s" % stats["stddev"])
+    print("Shortest: %s" % stats["min"])
 
 def get_top():
     top_amount = int(input("Top: "))
     top_seconds = int(input("Seconds: "))
-    top = r.table("levelSystem").order_by(r.desc("xp")).limit(top_amount).run(r_conn, array_limit=500000)
+    top = r.table("levelSystem").order_by(r.desc("xp")).limit(top_amount).pluck("id", "xpactivity").run(r_conn)
     print("Retrieved Data")
 
     users = []
 
     for user in top:
-        lasttime = user["lastxptimes"][0]
-        i = []
-        for times in user["lastxptimes"]:
-            x = (int(times) - int(lasttime))
-            i.append(x)
-            lasttime = times
-
-        average = int(float(np.mean(i)))
+        stats = activity.summarize(user.get("xpactivity", activity.empty()))
+        average = int(stats["mean"])
 
         if average < top_seconds:
-            users.append(f"ID: {user['id']} Average: {average} Amount: {len(i)}")
+            users.append(f"ID: {user['id']} Average: {average} Amount: {stats['count']}")
 
     print("\n".join(users))
 
@@ -0,0 +1,147 @@
+import os, sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import argparse
+import csv
+import itertools
+import time
+import numpy as np
+import rethinkdb as r
+from modules.utils import activity
+
+# Batch version of LevelCheck/ecoCheck. Streams levelSystem.xpactivity and
+# economy.betactivity with a cursor, CHUNK users at a time, into columnar
+# arrays and scores every user at once:
+#
+#   mean/cv       - from the whole-history summary (count, first, last, gapsq)
+#   median/rcv    - median and coefficient of variation of the recent intervals
+#   bursts        - recent intervals shorter than --burst seconds
+#
+# The recent stats need at least --min-intervals intervals, below that they
+# are left out of the score instead of making a short ring look regular.
+#
+# Scripts earn xp/bet on a timer, so a very regular (low cv) or bursty
+# history scores high. Only the --top highest scores are kept between
+# chunks, so memory stays bounded by the chunk size whatever the table size.
+
+TABLES = {
+    "levelSystem": "xpactivity",
+    "economy": "betactivity"
+}
+
+FIELDS = ["table", "id", "score", "count", "mean", "cv", "median", "rcv", "bursts", "min", "last"]
+
+def chunks(cursor, size: int):
+    while True:
+        chunk = list(itertools.islice(cursor, size))
+        if not chunk:
+            return
+        yield chunk
+
+def columns(docs: list, field: str):
+    """Summary fields as 1d arrays and the recent rings as a padded (users x RECENT) array."""
+    n = len(docs)
+    ids = np.empty(n, dtype=object)
+    summary = np.zeros((n, 5), dtype=np.float64)
+    recent = np.full((n, activity.RECENT), np.nan)
+    for i, doc in enumerate(docs):
+        act = doc.get(field) or activity.empty()
+        ids[i] = doc["id"]
+        summary[i] = (act["count"], act["first"], act["last"], act["gapsq"], act["mingap"])
+        ring = act["recent"]
+        if ring:
+            recent[i, :len(ring)] = ring
+    return ids, summary, recent
+
+def score(summary: np.ndarray, recent: np.ndarray, burst: float, min_intervals: int = 2):
+    count, first, last, gapsq, mingap = summary.T
+    gaps = np.maximum(count - 1, 1)
+    mean = (last - first) / gaps
+    std = np.sqrt(np.maximum(gapsq / gaps - mean * mean, 0))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cv = np.where(mean > 0, std / mean, 0)
+
+        intervals = np.diff(recent, axis=1)
+        valid = ~np.isnan(intervals)
+        n_intervals = valid.sum(axis=1)
+        # Users with too few intervals get nan (or 0 bursts) rather than a mean of one gap
+        enough = n_intervals >= max(min_intervals, 1)
+        n = np.where(enough, n_intervals, 1)
+        rmean = np.where(enough, np.where(valid, intervals, 0).sum(axis=1) / n, np.nan)
+        rstd = np.sqrt((np.where(valid, intervals - rmean[:, None], 0) ** 2).sum(axis=1) / n)
+        rcv = np.where(enough & (rmean > 0), rstd / rmean, np.nan)
+        median = np.full(len(count), np.nan)
+        if enough.any():
+            median[enough] = np.nanmedian(intervals[enough], axis=1)
+        bursts = np.where(enough, (np.where(valid, intervals, np.inf) < burst).sum(axis=1), 0)
+        burst_ratio = np.where(enough, bursts / n, 0)
+
+    # Regular timing counts most, bursts second, both scaled by how much history backs them
+    regularity = 1 - np.clip(np.minimum(cv, np.nan_to_num(rcv, nan=1.0)), 0, 1)
+    weight = np.log10(np.maximum(count, 1))
+    return {
+        "score": (regularity * 2 + burst_ratio) * weight,
+        "count": count,
+        "mean": mean,
+        "cv": cv,
+        "median": np.nan_to_num(median),
+        "rcv": np.nan_to_num(rcv),
+        "bursts": bursts,
+        "min": mingap,
+        "last": last
+    }
+
+def analyze(conn, table: str, *, chunk: int, top: int, burst: float, min_events: int, min_intervals: int):
+    field = TABLES[table]
+    cursor = r.table(table).pluck("id", field).run(conn)
+    best = None
+    scanned = 0
+    for docs in chunks(cursor, chunk):
+        ids, summary, recent = columns(docs, field)
+        # Too little history to say anything, don't score it at all
+        keep = summary[:, 0] >= min_events
+        rows = score(summary[keep], recent[keep], burst, min_intervals)
+        rows["id"] = ids[keep]
+        if best is not None:
+            rows = {k: np.concatenate([best[k], rows[k]]) for k in rows}
+        if len(rows["score"]) > top:
+            idx = np.argpartition(-rows["score"], top)[:top]
+            rows = {k: v[idx] for k, v in rows.items()}
+        best = rows
+        scanned += len(docs)
+        print("%s: %s users scanned" % (table, scanned), file=sys.stderr)
+    cursor.close()
+    if best is None:
+        return []
+    order = np.argsort(-best["score"])
+    return [dict({k: best[k][i] for k in best}, table=table) for i in order]
+
+def main():
+    parser = argparse.ArgumentParser(description="Rank likely xp/bet farmers")
+    parser.add_argument("--table", choices=list(TABLES) + ["both"], default="both")
+    parser.add_argument("--chunk", type=int, default=50000, help="users per batch")
+    parser.add_argument("--top", type=int, default=500, help="suspects kept per table")
+    parser.add_argument("--burst", type=float, default=5, help="intervals shorter than this count as a burst")
+    parser.add_argument("--min-events", type=int, default=20)
+    parser.add_argument("--min-intervals", type=int, default=2, help="recent intervals needed for median/rcv/bursts")
+    parser.add_argument("--out", default="suspects.csv")
+    args = parser.parse_args()
+
+    conn = r.connect(db="nekobot")
+    start = time.time()
+    report = []
+    for table in (TABLES if args.table == "both" else [args.table]):
+        report += analyze(conn, table, chunk=args.chunk, top=args.top, burst=args.burst,
+                          min_events=args.min_events, min_intervals=args.min_intervals)
+    conn.close()
+
+    report.sort(key=lambda x: x["score"], reverse=True)
+    with open(args.out, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(FIELDS)
+        for row in report:
+            writer.writerow([row["table"], row["id"]] + [round(float(row[k]), 3) for k in FIELDS[2:]])
+    print("Wrote %s suspects to %s in %.1fs" % (len(report), args.out, time.time() - start))
+
+if __name__ == "__main__":
+    main()
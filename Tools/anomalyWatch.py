@@ -0,0 +1,136 @@
+import os, sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import asyncio
+import logging
+import aiohttp
+import rethinkdb as r
+import config
+from modules.utils.anomaly import Detector
+
+# Watches the economy and levelSystem changefeeds and flags accounts that
+# change too fast, instead of finding them later with ecoCheck/LevelCheck.
+#
+# Each feed is projected server-side to {id, delta, frozen, transfer} and
+# changes that don't touch the balance/xp are dropped before they reach us.
+# Transfers (the ledger gives both sides a new lasttransfer) don't count
+# towards net change, what a user receives through them has its own
+# threshold so coins funnelled in from alts are still caught. Every
+# change goes through a per-user sliding window (modules/utils/anomaly.py),
+# so this keeps up with thousands of changes a second without polling.
+#
+# Flagged users are posted to the webhook in batches every ALERT_INTERVAL
+# seconds. With AUTO_FREEZE=1 flagged economy accounts are frozen, xp
+# anomalies are only reported.
+
+SPAN = int(os.environ.get("SPAN", 60))
+ECO_MAX_EVENTS = int(os.environ.get("ECO_MAX_EVENTS", 30))
+# Net change per SPAN. The largest single legitimate payout is a 75k bet on
+# green in roulette, 2.7M net, so one lucky spin stays under the default.
+ECO_MAX_NET = int(os.environ.get("ECO_MAX_NET", 5000000))
+# Received through transfers per SPAN, a single transfer is capped at 10M
+ECO_MAX_RECEIVED = int(os.environ.get("ECO_MAX_RECEIVED", 20000000))
+XP_MAX_NET = int(os.environ.get("XP_MAX_NET", 2000))
+AUTO_FREEZE = os.environ.get("AUTO_FREEZE", "0") == "1"
+ALERT_INTERVAL = int(os.environ.get("ALERT_INTERVAL", 5))
+
+log = logging.getLogger("anomalyWatch")
+webhook_url = "https://discordapp.com/api/webhooks/{0}/{1}".format(config.webhook_id, config.webhook_token)
+
+FEEDS = {
+    "economy": ("balance", Detector(span=SPAN, max_events=ECO_MAX_EVENTS, max_net=ECO_MAX_NET,
+                                    max_received=ECO_MAX_RECEIVED)),
+    "levelSystem": ("xp", Detector(span=SPAN, max_events=0, max_net=XP_MAX_NET))
+}
+
+def feed_query(table: str, field: str):
+    return r.table(table).changes(squash=False).filter(
+        r.row["new_val"].ne(None)
+    ).map(lambda change: {
+        "id": change["new_val"]["id"],
+        "delta": change["new_val"][field].default(0).coerce_to("number").sub(
+            change["old_val"][field].default(0).coerce_to("number")),
+        "frozen": change["new_val"]["frozen"].default(False),
+        "transfer": change["new_val"]["lasttransfer"].default(None).ne(
+            change["old_val"]["lasttransfer"].default(None))
+    }).filter(r.row["delta"].ne(0))
+
+class Watcher:
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.alerts = []
+        self.conn = None
+        self.session = aiohttp.ClientSession(loop=loop)
+
+    async def flag(self, table: str, user: str, reason: str):
+        action = ""
+        if AUTO_FREEZE and table == "economy":
+            try:
+                await r.table("economy").get(user).update({"frozen": True}).run(self.conn)
+                action = " (frozen)"
+            except r.ReqlError as e:
+                log.warning("Failed to freeze %s: %s" % (user, e))
+        log.warning("%s: %s %s%s" % (table, user, reason, action))
+        self.alerts.append("%s: %s %s%s" % (table, user, reason, action))
+
+    async def consume(self, table: str):
+        field, detector = FEEDS[table]
+        delay = 1
+        while True:
+            conn = None
+            try:
+                conn = await r.connect(host="localhost", db="nekobot")
+                feed = await feed_query(table, field).run(conn)
+                delay = 1
+                while await feed.fetch_next():
+                    change = await feed.next()
+                    reason = detector.observe(change["id"], change["delta"], transfer=change["transfer"])
+                    if reason and not change["frozen"]:
+                        self.loop.create_task(self.flag(table, change["id"], reason))
+            except r.ReqlError as e:
+                log.warning("%s changefeed failed, reconnecting in %ss: %s" % (table, delay, e))
+            finally:
+                if conn is not None:
+                    await conn.close(noreply_wait=False)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 60)
+
+    async def send_alerts(self):
+        while True:
+            await asyncio.sleep(ALERT_INTERVAL)
+            if not self.alerts:
+                continue
+            # One message per batch keeps a burst of flags under the webhook rate limit
+            lines, self.alerts = self.alerts[:20], self.alerts[20:]
+            content = "**Anomalies**\n" + "\n".join(lines)
+            try:
+                async with self.session.post(webhook_url, json={"content": content[:2000]}) as resp:
+                    if resp.status == 429 or resp.status >= 500:
+                        # Keep them for the next batch
+                        self.alerts = (lines + self.alerts)[:1000]
+                        log.warning("Failed to post alerts, webhook returned %s" % resp.status)
+                    elif resp.status >= 400:
+                        log.warning("Webhook rejected alerts: %s %s" % (resp.status, await resp.text()))
+            except aiohttp.ClientError as e:
+                self.alerts = (lines + self.alerts)[:1000]
+                log.warning("Failed to post alerts: %s" % e)
+
+    async def housekeeping(self):
+        while True:
+            await asyncio.sleep(SPAN)
+            for table, (_, detector) in FEEDS.items():
+                detector.sweep()
+                log.info("%s: %s" % (table, detector.stats()))
+
+    async def run(self):
+        r.set_loop_type("asyncio")
+        self.conn = await r.connect(host="localhost", db="nekobot")
+        await asyncio.gather(self.send_alerts(), self.housekeeping(),
+                             *[self.consume(table) for table in FEEDS], loop=self.loop)
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="[%(asctime)s][anomalyWatch][%(levelname)s] %(message)s")
+    log.info("Auto-freeze is %s" % ("on" if AUTO_FREEZE else "off"))
+    loop = asyncio.get_event_loop()
+    loop.run_until_complete(Watcher(loop).run())
@@ -0,0 +1,53 @@
+import os, sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import glob
+import time
+from io import BytesIO
+from colorthief import ColorThief
+from modules.utils.render_jobs import dominant_color
+
+# Compares the NumPy dominant colour job against ColorThief on every image in
+# IMAGES (default data/), printing the time each takes and how far apart the
+# two colours are (euclidean RGB distance, 0 = identical, 441 = black/white).
+
+IMAGES = os.environ.get("IMAGES", "data")
+ROUNDS = int(os.environ.get("ROUNDS", 5))
+
+def timed(fn, data):
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        result = fn(data)
+    return result, (time.perf_counter() - start) / ROUNDS * 1000
+
+def main():
+    files = sorted(f for ext in ("png", "jpg", "jpeg", "gif")
+                   for f in glob.glob(os.path.join(IMAGES, "*.%s" % ext)))
+    if not files:
+        return print("No images in %s" % IMAGES)
+
+    total_ct = total_np = 0
+    distances = []
+    print("%-32s %10s %10s %8s" % ("image", "colorthief", "numpy", "distance"))
+    for path in files:
+        with open(path, "rb") as f:
+            data = f.read()
+        try:
+            ct, ct_ms = timed(lambda d: ColorThief(BytesIO(d)).get_color(), data)
+            np, np_ms = timed(dominant_color, data)
+        except Exception as e:
+            print("%-32s failed: %s" % (os.path.basename(path)[:32], e))
+            continue
+        distance = sum((a - b) ** 2 for a, b in zip(ct, np)) ** 0.5
+        total_ct += ct_ms
+        total_np += np_ms
+        distances.append(distance)
+        print("%-32s %8.2fms %8.2fms %8.1f" % (os.path.basename(path)[:32], ct_ms, np_ms, distance))
+
+    if distances:
+        print("\n%s images, colorthief %.2fms avg, numpy %.2fms avg (%.1fx), mean distance %.1f" % (
+            len(distances), total_ct / len(distances), total_np / len(distances),
+            total_ct / max(total_np, 0.001), sum(distances) / len(distances)))
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,26 @@
+import os, sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
 import rethinkdb as r
-import numpy as np
 import time
+from modules.utils import activity
 
 r_conn = r.connect(db="nekobot")
 
 user = input("User: ")
 data = r.table("economy").get(str(user)).run(r_conn)
 
-lasttime = data["bettimes"][0]
-i = []
-for times in data["bettimes"]:
-    x = (int(times) - int(lasttime))
-    i.append(x)
-    print("Seconds Since: %s" % x)
+betactivity = data.get("betactivity", activity.empty())
+stats = activity.summarize(betactivity)
+
+lasttime = betactivity["recent"][0] if betactivity["recent"] else 0
+for times in betactivity["recent"]:
+    print("Seconds Since: %s" % (int(times) - int(lasttime)))
     lasttime = times
 
-print("Seconds since last: %s" % (int(time.time()) - int(lasttime)))
-print("Amount: %s" % len(data["bettimes"]))
-print("Average: %s" % np.mean(i))
+print("Seconds since last: %s" % (int(time.time()) - int(stats["last"])))
+print("Amount: %s" % stats["count"])
+print("Average: %s" % stats["mean"])
+print("Stddev: %s" % stats["stddev"])
 
 r_conn.close()
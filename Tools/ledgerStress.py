@@ -0,0 +1,80 @@
+import os, sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import asyncio
+import random
+import time
+import rethinkdb as r
+from modules.utils.ledger import Ledger, LedgerError
+
+# Hammers the ledger with concurrent bets, payouts and transfers on a scratch
+# table and checks that money is neither lost nor duplicated:
+#   final total == starting total - successful debits + credits
+# and no balance ever ends up negative.
+
+TABLE = "ledger_stress"
+ACCOUNTS = int(os.environ.get("ACCOUNTS", 20))
+START_BALANCE = int(os.environ.get("START_BALANCE", 10000))
+OPERATIONS = int(os.environ.get("OPERATIONS", 20000))
+CONCURRENCY = int(os.environ.get("CONCURRENCY", 200))
+
+class StressBot:
+    def __init__(self, r_conn):
+        self.r_conn = r_conn
+
+async def main():
+    r.set_loop_type("asyncio")
+    conn = await r.connect(host="localhost", db="nekobot")
+    if TABLE in await r.table_list().run(conn):
+        await r.table_drop(TABLE).run(conn)
+    await r.table_create(TABLE).run(conn)
+
+    accounts = [str(i) for i in range(ACCOUNTS)]
+    await r.table(TABLE).insert([{"id": x, "balance": START_BALANCE, "lastpayday": "0", "frozen": False}
+                                 for x in accounts]).run(conn)
+
+    ledger = Ledger(StressBot(conn), table=TABLE)
+    stats = {"debited": 0, "credited": 0, "transferred": 0, "refused": 0}
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+
+    async def operation():
+        async with semaphore:
+            op = random.random()
+            amount = random.randint(1, START_BALANCE // 2)
+            try:
+                if op < .4:
+                    await ledger.debit(random.choice(accounts), amount, bet=True)
+                    stats["debited"] += amount
+                elif op < .6:
+                    await ledger.credit(random.choice(accounts), amount)
+                    stats["credited"] += amount
+                else:
+                    sender, receiver = random.sample(accounts, 2)
+                    await ledger.transfer(sender, receiver, amount)
+                    stats["transferred"] += amount
+            except LedgerError:
+                stats["refused"] += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*[operation() for _ in range(OPERATIONS)])
+    elapsed = time.perf_counter() - start
+
+    balances = await r.table(TABLE)["balance"].coerce_to("array").run(conn)
+    expected = ACCOUNTS * START_BALANCE - stats["debited"] + stats["credited"]
+    total = sum(balances)
+
+    print("%s operations in %.2fs (%.0f ops/s), concurrency %s" % (OPERATIONS, elapsed, OPERATIONS / elapsed, CONCURRENCY))
+    print("Refused: %s, transferred: %s" % (stats["refused"], stats["transferred"]))
+    print("Expected total: %s, actual total: %s" % (expected, total))
+    print("Lowest balance: %s" % min(balances))
+
+    await r.table_drop(TABLE).run(conn)
+    conn.close()
+
+    if total != expected or min(balances) < 0:
+        print("FAILED")
+        exit(1)
+    print("OK")
+
+if __name__ == "__main__":
+    asyncio.get_event_loop().run_until_complete(main())
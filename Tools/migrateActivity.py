@@ -0,0 +1,30 @@
+import os, sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import rethinkdb as r
+from modules.utils import activity
+
+# Converts the old unbounded lastxptimes/bettimes arrays into the capped
+# xpactivity/betactivity documents. Safe to re-run, already converted
+# documents no longer have the old field and are skipped. Run it with the
+# bot stopped so no XP or bets land between the read and the replace.
+
+r_conn = r.connect(db="nekobot")
+
+def migrate(table, old_field, new_field):
+    cursor = r.table(table).has_fields(old_field).pluck("id", old_field).run(r_conn, array_limit=500000)
+    done = 0
+    for doc in cursor:
+        times = sorted(int(float(x)) for x in doc[old_field])
+        r.table(table).get(doc["id"]).replace(
+            r.row.without(old_field).merge({new_field: activity.from_times(times)})
+        ).run(r_conn)
+        done += 1
+        if done % 1000 == 0:
+            print("%s: %s documents migrated" % (table, done))
+    print("%s: finished, %s documents migrated" % (table, done))
+
+if __name__ == "__main__":
+    migrate("levelSystem", "lastxptimes", "xpactivity")
+    migrate("economy", "bettimes", "betactivity")
+    r_conn.close()
@@ -0,0 +1,119 @@
+import os, sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import asyncio
+import time
+from collections import Counter
+from aiohttp import web
+from modules.utils.httpclient import HTTPClient
+from modules.utils.upstream import CircuitOpen, RateLimited
+
+# Runs the upstream gateway in HTTPClient against a local stub server and
+# checks the circuit breaker, token bucket, adaptive timeout and hedging.
+# Each scenario gets a fresh client so their stats don't mix.
+
+PORT = int(os.environ.get("PORT", 8765))
+BASE = "http://127.0.0.1:%s" % PORT
+
+hits = Counter()
+seen = set()
+
+async def ok(request):
+    hits["ok"] += 1
+    return web.json_response({"ok": True})
+
+async def slow(request):
+    hits["slow"] += 1
+    await asyncio.sleep(float(request.query.get("delay", 3)))
+    return web.json_response({"ok": True})
+
+async def fail(request):
+    hits["fail"] += 1
+    return web.json_response({"ok": False}, status=500)
+
+async def flaky(request):
+    # First attempt for an id hangs, a retry answers straight away
+    hits["flaky"] += 1
+    key = request.query["id"]
+    if key not in seen:
+        seen.add(key)
+        await asyncio.sleep(5)
+    return web.json_response({"ok": True})
+
+def check(name: str, passed: bool, detail: str = ""):
+    print("%s %s %s" % ("PASS" if passed else "FAIL", name, detail))
+    return passed
+
+async def breaker(loop):
+    client = HTTPClient(loop)
+    for _ in range(5):
+        try:
+            await client.get_json(BASE + "/fail")
+        except Exception:
+            pass
+    before = hits["fail"]
+    start = time.perf_counter()
+    try:
+        await client.get_json(BASE + "/fail")
+        opened = False
+    except CircuitOpen:
+        opened = True
+    elapsed = (time.perf_counter() - start) * 1000
+    await client.close()
+    return check("breaker", opened and hits["fail"] == before, "failed fast in %.2fms" % elapsed)
+
+async def rate_limit(loop):
+    client = HTTPClient(loop, upstream_limits={"127.0.0.1": (10, 10)})
+    client.upstreams.max_wait = 0.5
+    results = await asyncio.gather(*[client.get_json(BASE + "/ok") for _ in range(30)],
+                                   return_exceptions=True, loop=loop)
+    limited = sum(isinstance(x, RateLimited) for x in results)
+    await client.close()
+    return check("rate limit", 10 <= 30 - limited <= 17, "%s allowed, %s limited" % (30 - limited, limited))
+
+async def adaptive_timeout(loop):
+    client = HTTPClient(loop)
+    for _ in range(30):
+        await client.get_json(BASE + "/ok")
+    timeout = client.upstreams.get("127.0.0.1").timeout()
+    start = time.perf_counter()
+    try:
+        await client.get_json(BASE + "/slow?delay=10")
+        timed_out = False
+    except asyncio.TimeoutError:
+        timed_out = True
+    elapsed = time.perf_counter() - start
+    await client.close()
+    return check("adaptive timeout", timed_out and elapsed < 5,
+                 "timeout %.2fs, slow request gave up after %.2fs" % (timeout, elapsed))
+
+async def hedging(loop):
+    client = HTTPClient(loop)
+    for _ in range(30):
+        await client.get_json(BASE + "/ok")
+    start = time.perf_counter()
+    await client.get_json(BASE + "/flaky?id=hedge", hedge=True)
+    elapsed = time.perf_counter() - start
+    hedged = client.upstreams.get("127.0.0.1").counter["hedged"]
+    await client.close()
+    return check("hedging", hedged == 1 and elapsed < 1, "answered in %.3fs, %s hedged" % (elapsed, hedged))
+
+async def main(loop):
+    app = web.Application()
+    app.router.add_get("/ok", ok)
+    app.router.add_get("/slow", slow)
+    app.router.add_get("/fail", fail)
+    app.router.add_get("/flaky", flaky)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", PORT).start()
+    try:
+        results = [await scenario(loop) for scenario in (breaker, rate_limit, adaptive_timeout, hedging)]
+    finally:
+        await runner.cleanup()
+    print("\n%s/%s passed" % (sum(results), len(results)))
+    return all(results)
+
+if __name__ == "__main__":
+    loop = asyncio.get_event_loop()
+    sys.exit(0 if loop.run_until_complete(main(loop)) else 1)
@@ -0,0 +1,167 @@
+"""Plans shard ranges and runs one NekoBot process per range.
+
+    python launcher.py                          # shards and processes from config / the machine
+    python launcher.py --shards 84 --per-process 21
+    python launcher.py plan --shards 84         # only print the shard ranges
+    python launcher.py run --instance 0 --instances 4 --shards 84 --ids 0-20
+
+The supervisor restarts a crashed process with exponential backoff (reset
+once it has stayed up for a while) and logs every process's CPU and RSS.
+A process that exits cleanly, e.g. after `ipc shutdown`, is not restarted.
+"""
+import argparse
+import asyncio
+import logging
+import math
+import os
+import signal
+import sys
+import time
+
+import psutil
+
+log = logging.getLogger("launcher")
+
+# Rough per shard and per process memory, used to cap the process count on small machines
+SHARD_MB = 150
+PROCESS_MB = 250
+
+def plan(shards: int, per_process: int):
+    """Contiguous shard id ranges, [range(0, 21), range(21, 42), ...]."""
+    return [range(start, min(start + per_process, shards)) for start in range(0, shards, per_process)]
+
+def auto_per_process(shards: int):
+    """Shards per process from CPU cores, with fewer processes if memory is tight."""
+    cores = os.cpu_count() or 1
+    available = psutil.virtual_memory().total / (1 << 20) * 0.8
+    by_memory = int((available - shards * SHARD_MB) // PROCESS_MB)
+    if by_memory < 1:
+        log.warning("%s shards want ~%sMB, only %dMB available" % (shards, shards * SHARD_MB, available))
+    processes = max(1, min(cores, shards, by_memory))
+    return math.ceil(shards / processes)
+
+def run_instance(args):
+    import shardedBot
+    ids = [int(x) for x in args.ids.split("-")]
+    shard_ids = list(range(ids[0], ids[-1] + 1))
+    shardedBot.NekoBot(instance=args.instance, instances=args.instances, shard_count=args.shards,
+                       shard_ids=shard_ids, max_messages=args.max_messages, slim_cache=args.slim,
+                       tracemalloc_frames=args.tracemalloc).run()
+
+class Supervisor:
+
+    def __init__(self, loop, ranges: list, shards: int, *, max_messages: int = 101, extra: list = None,
+                 report_interval: int = 60,
+                 backoff: float = 5.0, max_backoff: float = 300.0, stable_after: float = 600.0):
+        self.loop = loop
+        self.ranges = ranges
+        self.shards = shards
+        self.max_messages = max_messages
+        self.extra = extra or []
+        self.report_interval = report_interval
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.stable_after = stable_after
+        self.processes = {}
+        self.stopping = False
+        self.__procs = {}
+
+    def command(self, instance: int):
+        ids = self.ranges[instance]
+        return [sys.executable, os.path.abspath(__file__), "run",
+                "--instance", str(instance),
+                "--instances", str(len(self.ranges)),
+                "--shards", str(self.shards),
+                "--ids", "%s-%s" % (ids[0], ids[-1]),
+                "--max-messages", str(self.max_messages)] + self.extra
+
+    async def supervise(self, instance: int):
+        failures = 0
+        while not self.stopping:
+            started = time.monotonic()
+            process = await asyncio.create_subprocess_exec(*self.command(instance), loop=self.loop)
+            self.processes[instance] = process
+            log.info("Instance %s started, pid %s, shards %s" % (instance, process.pid, self.ranges[instance]))
+            code = await process.wait()
+            self.processes.pop(instance, None)
+            self.__procs.pop(process.pid, None)
+            if self.stopping or code == 0:
+                log.info("Instance %s exited with %s" % (instance, code))
+                return
+            if time.monotonic() - started > self.stable_after:
+                failures = 0
+            delay = min(self.backoff * 2 ** failures, self.max_backoff)
+            failures += 1
+            log.warning("Instance %s exited with %s, restarting in %ss" % (instance, code, delay))
+            await asyncio.sleep(delay)
+
+    def report(self):
+        for instance, process in sorted(self.processes.items()):
+            try:
+                # Keep the psutil handle, cpu_percent() is measured since its previous call
+                proc = self.__procs.get(process.pid)
+                if proc is None:
+                    proc = self.__procs[process.pid] = psutil.Process(process.pid)
+                with proc.oneshot():
+                    rss = proc.memory_info().rss
+                    cpu = proc.cpu_percent()
+                    rss += sum(child.memory_info().rss for child in proc.children(recursive=True))
+            except psutil.Error:
+                continue
+            log.info("Instance %s (pid %s): %.1f%% CPU, %.1fMB RSS" % (instance, process.pid, cpu, rss / (1 << 20)))
+
+    async def report_loop(self):
+        while not self.stopping:
+            await asyncio.sleep(self.report_interval)
+            self.report()
+
+    def stop(self):
+        self.stopping = True
+        for process in self.processes.values():
+            if process.returncode is None:
+                process.terminate()
+
+    async def run(self):
+        reporter = self.loop.create_task(self.report_loop())
+        await asyncio.gather(*[self.supervise(x) for x in range(len(self.ranges))], loop=self.loop)
+        reporter.cancel()
+
+def main():
+    parser = argparse.ArgumentParser(description="NekoBot shard launcher")
+    parser.add_argument("mode", nargs="?", default="supervise", choices=["supervise", "plan", "run"])
+    parser.add_argument("--shards", type=int, help="total shard count")
+    parser.add_argument("--per-process", type=int, help="shards per process, derived from the machine if not set")
+    parser.add_argument("--max-messages", type=int, default=101)
+    parser.add_argument("--slim", action="store_true", help="skip caching presences, activities and typing")
+    parser.add_argument("--tracemalloc", type=int, default=0, help="tracemalloc frames, 0 to disable")
+    parser.add_argument("--report-interval", type=int, default=60)
+    parser.add_argument("--instance", type=int)
+    parser.add_argument("--instances", type=int)
+    parser.add_argument("--ids", help="shard id range for run, e.g. 0-20")
+    args = parser.parse_args()
+
+    if args.mode == "run":
+        return run_instance(args)
+
+    logging.basicConfig(level=logging.INFO, format="[%(asctime)s][launcher][%(levelname)s] %(message)s")
+
+    if args.shards is None:
+        import config
+        args.shards = getattr(config, "shard_count", 84)
+    per_process = args.per_process or auto_per_process(args.shards)
+    ranges = plan(args.shards, per_process)
+    for instance, ids in enumerate(ranges):
+        log.info("Instance %s: shards %s-%s (%s)" % (instance, ids[0], ids[-1], len(ids)))
+    if args.mode == "plan":
+        return
+
+    loop = asyncio.get_event_loop()
+    extra = ["--tracemalloc", str(args.tracemalloc)] + (["--slim"] if args.slim else [])
+    supervisor = Supervisor(loop, ranges, args.shards, max_messages=args.max_messages, extra=extra,
+                            report_interval=args.report_interval)
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, supervisor.stop)
+    loop.run_until_complete(supervisor.run())
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,12 @@
 import discord, random, time, datetime, asyncio
 from discord.ext import commands
-from PIL import Image, ImageDraw, ImageFont
-import textwrap
-import aiohttp, config, ujson
+from io import BytesIO
+import config
 import rethinkdb as r
-import os
 from prettytable import PrettyTable
+from .utils.cards import CardCache
+from .utils.i18n import catalog
 
-# Languages
-languages = ["english", "weeb", "tsundere", "polish", "spanish", "french"]
-lang = {}
-
-for l in languages:
-    with open("lang/%s.json" % l, encoding="utf-8") as f:
-        lang[l] = ujson.load(f)
-
-def getlang(la:str):
-    return lang.get(la, None)
 
 list_ = [
     "Shiro",
@@ -80,6 +70,9 @@ class CardGame:
 
     def __init__(self, bot):
         self.bot = bot
+        self.cards = CardCache(bot.render,
+                               maxsize=getattr(config, "card_cache_size", 256),
+                               disk_dir=getattr(config, "card_cache_dir", None))
 
     async def __has_account(self, user:int):
         if await r.table("cardgame").get(str(user)).run(self.bot.r_conn):
@@ -103,16 +96,12 @@ class CardGame:
     @commands.cooldown(1, 5, commands.BucketType.user)
     async def card(self, ctx: commands.Context):
         """Loli Card Game OwO"""
-        lang = await self.bot.redis.get(f"{ctx.author.id}-lang")
-        if lang:
-            lang = lang.decode('utf8')
-        else:
-            lang = "english"
+        lang = await self.bot.prefs.get_lang(ctx.author.id)
 
         await self.__check_for_user(ctx.author.id)
 
         if ctx.invoked_subcommand is None:
-            return await ctx.send(getlang(lang)["cardgame"]["card_help"])
+            return await ctx.send(catalog.get(lang, "cardgame.card_help"))
 
     @card.command(name="transfer")
     async def card_transfer(self, ctx, card_number, user:discord.Member):
@@ -176,7 +165,7 @@ class CardGame:
     #     if len(user_data["cards"]) == 0:
     #         return await ctx.send("%s has no cards." % user.mention)
     #
-    #     await ctx.send(getlang(lang)["cardgame"]["battle"]["confirm"].format(user, author))
+    #     await ctx.send(catalog.format(lang, "cardgame.battle.confirm", user, author))
     #
     #     def check_user(m):
     #         return m.author == user and m.channel == ctx.message.channel
@@ -188,49 +177,49 @@ class CardGame:
     #         msg = await self.bot.wait_for('message', check=check_user, timeout=15.0)
     #     except asyncio.TimeoutError:
     #         await ctx.send(embed=discord.Embed(color=0xff5630,
-    #                                            description=getlang(lang)["cardgame"]["battle"]["cancelled"]))
+    #                                            description=catalog.get(lang, "cardgame.battle.cancelled")))
     #         return
     #
     #     if msg.content.lower() == "yes":
-    #         await ctx.send(getlang(lang)["cardgame"]["battle"]["author_select"].format(author))
+    #         await ctx.send(catalog.format(lang, "cardgame.battle.author_select", author))
     #         try:
     #             msg = await self.bot.wait_for('message', check=check_author, timeout=15.0)
     #         except asyncio.TimeoutError:
     #             return await ctx.send(embed=discord.Embed(color=0xff5630,
-    #                                                       description=getlang(lang)["cardgame"]["battle"]["cancelled"]))
+    #                                                       description=catalog.get(lang, "cardgame.battle.cancelled")))
     #         try:
     #             msgcontent = int(msg.content)
     #         except:
-    #             return await ctx.send(getlang(lang)["cardgame"]["battle"]["invalid"])
+    #             return await ctx.send(catalog.get(lang, "cardgame.battle.invalid"))
     #         if msgcontent <= 0:
-    #             return await ctx.send(getlang(lang)["cardgame"]["battle"]["invalid"])
+    #             return await ctx.send(catalog.get(lang, "cardgame.battle.invalid"))
     #         elif msgcontent > 6:
-    #             return await ctx.send(getlang(lang)["cardgame"]["battle"]["invalid"])
+    #             return await ctx.send(catalog.get(lang, "cardgame.battle.invalid"))
     #
     #         try:
     #             author_card = author_data["cards"][msgcontent]
     #         except:
-    #             return await ctx.send(getlang(lang)["cardgame"]["battle"]["invalid_slot"].format(author))
+    #             return await ctx.send(catalog.format(lang, "cardgame.battle.invalid_slot", author))
     #
     #         else:
-    #             await ctx.send(getlang(lang)["cardgame"]["battle"]["author_select"].format(user))
+    #             await ctx.send(catalog.format(lang, "cardgame.battle.author_select", user))
     #             try:
     #                 msg = await self.bot.wait_for('message', check=check_user, timeout=15.0)
     #             except asyncio.TimeoutError:
-    #                 return await ctx.send(embed=discord.Embed(color=0xff5630, description=getlang(lang)["cardgame"]["battle"]["cancelled"]))
+    #                 return await ctx.send(embed=discord.Embed(color=0xff5630, description=catalog.get(lang, "cardgame.battle.cancelled")))
     #             try:
     #                 msgcontent = int(msg.content)
     #             except:
-    #                 return await ctx.send(getlang(lang)["cardgame"]["battle"]["invalid"])
+    #                 return await ctx.send(catalog.get(lang, "cardgame.battle.invalid"))
     #             if msgcontent <= 0:
-    #                 return await ctx.send(getlang(lang)["cardgame"]["battle"]["invalid"])
+    #                 return await ctx.send(catalog.get(lang, "cardgame.battle.invalid"))
     #             elif msgcontent > 6:
-    #                 return await ctx.send(getlang(lang)["cardgame"]["battle"]["invalid"])
+    #                 return await ctx.send(catalog.get(lang, "cardgame.battle.invalid"))
     #
     #             try:
     #                 user_card = user_data["cards"][msgcontent]
     #             except:
-    #                 return await ctx.send(getlang(lang)["cardgame"]["battle"]["invalid_slot"].format(author))
+    #                 return await ctx.send(catalog.format(lang, "cardgame.battle.invalid_slot", author))
     #
     #             author_card_name = author_card["name"]
     #             author_card_attack = author_card["attack"]
@@ -259,16 +248,12 @@ class CardGame:
     #                                         description=f"**{author.name}** vs **{user.name}**\n"
     #                                                     f"**{user.name}** Beat **{author.name}**"))
     #     else:
-    #         return await ctx.send(getlang(lang)["cardgame"]["battle"]["cancelled"])
+    #         return await ctx.send(catalog.get(lang, "cardgame.battle.cancelled"))
 
     @card.command(name='daily')
     async def card_daily(self, ctx):
         """Get your card daily"""
-        lang = await self.bot.redis.get(f"{ctx.author.id}-lang")
-        if lang:
-            lang = lang.decode('utf8')
-        else:
-            lang = "english"
+        lang = await self.bot.prefs.get_lang(ctx.author.id)
 
         await self.__check_for_user(ctx.author.id)
 
@@ -290,7 +275,7 @@ class CardGame:
             return await ctx.send("You have %s hours and %s minutes until your next daily." % (h, m,))
 
         if len(cards) >= 6:
-            return await ctx.send(getlang(lang)["cardgame"]["daily"]["slots_full"])
+            return await ctx.send(catalog.get(lang, "cardgame.daily.slots_full"))
 
         character_loli = str(random.choice(list_)).lower().replace(' ', '_')
 
@@ -306,79 +291,7 @@ class CardGame:
         }
 
         await r.table("cardgame").get(str(author.id)).update(newdata).run(self.bot.r_conn)
-        await ctx.send(getlang(lang)["cardgame"]["daily"]["given_char"].format(character_loli.replace('_', ' ').title()))
-
-    def _generate_card(self, character: str, num: int, attack: int, defense: int):
-        card_name = f"data/{character}.jpg"
-        img = Image.open('data/card.jpg')
-        _character = Image.open(card_name).resize((314, 313))
-
-        draw = ImageDraw.Draw(img)
-        title_font = ImageFont.truetype("data/fonts/card.ttf", 40)
-        lower_font = ImageFont.truetype("data/fonts/card.ttf", 20)
-        desc_font = ImageFont.truetype("data/fonts/card.ttf", 16)
-
-        img.paste(_character, (52, 114))
-
-        if character == 'kanna':
-            description = "Be sure to keep this loli charged. Very thicc thighs."
-        elif character == 'yaya':
-            description = "She'll be your puppet if you promise to marry her."
-        elif character == 'yoshino':
-            description = "She must be a happy loli. Word of the wise never have her lose Yoshinon."
-        elif character == 'toujou_koneko':
-            description = "A Neko Loli who will not kindly treat perverted actions."
-        elif character == 'terminus_est':
-            description = "A sword who can transform into a loli. For some reason is just fine wearing only knee socks but not being fully naked."
-        elif character == 'azuki_azusa':
-            description = "A hard working loli who pretends to be rich. Likes animals and works a lot of jobs to afford the act."
-        elif character == 'itsuka_kotori':
-            description = "A bipolar loli. The color of the ribbon determines her personally as weak for white and strong for black."
-        elif character == 'tachibana_kanade':
-            description = "An \"Angel\" who develops her own body to defend."
-        elif character == 'nyaruko':
-            description = "An obessive otaku loli who will kill anyone that dares attempt to harm what she loves. "
-        elif character == 'cirno':
-            description = "A ice fairy who never backs down from a challenge. She is very weak in respect to others but won't stop trying."
-        elif character == 'flandre_scarlet':
-            description = "She respects her sister so much that she never leaves the mansion due to her orders. Is nice, quiet, and a tad nuts. "
-        elif character == 'shiro':
-            description = "Genius gamer who is excellent at both strategy and in first person shooters. She will quickly master languages."
-        elif character == 'aihara_enju':
-            description = "A rabbit type girl who will protect her friends. Can get jealous even to friends and tries to marry her partner at every chance."
-        elif character == 'takanashi_rikka':
-            description = "A loli suffering from \"8th grade syndrome\" who believes she has the power of the tyrants's eye an will always walk around with an umbrella."
-        elif character == 'tsutsukakushi_tsukiko':
-            description = "A gluttonous loli who will eat numerous snacks and cannot show emotion. Thinks of herself as childish."
-        elif character == 'aisaka_taiga':
-            description = "Kind to those she trusts while aggressive to others. She hates he height pointed out or being called the palm top tiger."
-        elif character == 'hasegawa_kobato':
-            description = "A very shy loli who enjoys cosplaying. She is almost always dressed up in a cosplay of her favorite gothic vampire."
-        elif character == 'sprout_tina':
-            description = "A noctural loli. She will be sleepy during the day; however, when night falls she becomes an excellent sniper Who follows every order."
-        elif character == 'konjiki_no_yami':
-            description = "Attacks those that talk about something she doesn't like and hates perverted people."
-        elif character == 'yukihira_furano':
-            description = "A quiet girl that will insert sexual or vulgar words or phrases into sentences. Is also a part of the \"Reject Five\""
-        elif character == 'tatsumaki':
-            description = "Arrogant and overconfident. She considers her job as a duty and also can get bored while not fighting monsters."
-        elif character == 'victorique_de_blois':
-            description = "Bored by a normal life so she wants cases or other things to entertain her. She dislikes most strangers. She is also very intelligent."
-        elif character == "holo":
-            description = ""
-        elif character == "dva":
-            description = ""
-        elif character == "hibiki":
-            description = "Qtiest qt of all qts"
-        else:
-            description = ""
-
-        draw.text((37, 23), character.replace('_', ' '), (0, 0, 0), title_font)
-        draw.text((255, 550), str(attack), (0, 0, 0), lower_font)
-        draw.text((344, 550), str(defense), (0, 0, 0), lower_font)
-        draw.text((40, 477), textwrap.fill(description, 37), (0, 0, 0), font=desc_font)
-
-        img.save(f"data/cards/{num}.png")
+        await ctx.send(catalog.format(lang, "cardgame.daily.given_char", character_loli.replace('_', ' ').title()))
 
     @card.command(name='sell')
     async def card_sell(self, ctx, num: int):
@@ -419,9 +332,15 @@ class CardGame:
             await ctx.send("❌ | **Cancelled Transaction.**")
             return
 
-        await r.table("cardgame").get(str(author.id)).update({"cards": r.row["cards"].delete_at(num-1)}).run(self.bot.r_conn)
-        economy = await r.table("economy").get(str(author.id)).run(self.bot.r_conn)
-        await r.table("economy").get(str(author.id)).update({"balance": economy["balance"] + cardprice}).run(self.bot.r_conn)
+        # Only remove the card if it's still in that slot, so a double sell can't pay out twice
+        result = await r.table("cardgame").get(str(author.id)).update(
+            lambda row: r.branch(row["cards"].count().ge(num).and_(row["cards"].nth(num-1).eq(card)),
+                                 {"cards": row["cards"].delete_at(num-1)},
+                                 r.error("Card not found"))
+        ).run(self.bot.r_conn)
+        if result["errors"]:
+            return await ctx.send("No cards in this slot...")
+        await self.bot.ledger.credit(author.id, cardprice)
 
         await ctx.send(f"Sold {cardname} for {cardprice}")
 
@@ -475,36 +394,22 @@ class CardGame:
         character_name_en = str(character_name).replace('_', ' ').title()
         attack = card["attack"]
         defense = card["defense"]
-        self._generate_card(character_name, num, attack, defense)
+        image = await self.cards.get(character_name, attack, defense)
 
         embed = discord.Embed(color=0xDEADBF, title=character_name_en)
         embed.add_field(name="Attack", value=str(attack))
         embed.add_field(name="Defense", value=str(defense))
 
-        await ctx.send(file=discord.File(f'data/cards/{num}.png'), embed=embed.set_image(url=f'attachment://{num}.png'))
-        os.remove("data/cards/%s.png" % num)
+        await ctx.send(file=discord.File(BytesIO(image), filename=f'{num}.png'), embed=embed.set_image(url=f'attachment://{num}.png'))
 
     @card.command(name='generate', hidden=True)
     @commands.is_owner()
     async def card_gen(self, ctx, character: str = "shiro", attack: int = 1, defense: int = 1):
         """Recieve your dailies"""
-        card_name = f"data/{character}.jpg"
-        img = Image.open('data/card.jpg')
-        _character = Image.open(card_name).resize((314, 313))
-
-        draw = ImageDraw.Draw(img)
-        title_font = ImageFont.truetype("data/fonts/card.ttf", 40)
-        lower_font = ImageFont.truetype("data/fonts/card.ttf", 20)
-
-        img.paste(_character, (52, 114))
-
-        draw.text((37, 23), character.replace('_', ' '), (0, 0, 0), title_font)
-        draw.text((255, 550), str(attack), (0, 0, 0), lower_font)
-        draw.text((344, 550), str(defense), (0, 0, 0), lower_font)
+        image = await self.cards.get(character, attack, defense, description=False)
 
         num = random.randint(1, 10000000)
-        img.save(f"data/cards/{num}.png")
-        await ctx.send(file=discord.File(f"data/cards/{num}.png"),
+        await ctx.send(file=discord.File(BytesIO(image), filename=f"{num}.png"),
                        embed=discord.Embed(color=0xDEADBF).set_image(url=f'attachment://{num}.png'))
 
 
@@ -1,4 +1,4 @@
-import asyncio, config, discord, random, aiohttp
+import asyncio, config, discord, random
 import logging
 
 from .utils import instance_tools
@@ -38,18 +38,18 @@ class DiscordBotsOrgAPI:
                             "server_count": int(guilds),
                             "shard_count": self.bot.shard_count
                         }
-                        async with aiohttp.ClientSession() as cs:
-                            await cs.post(url, json=payload, headers={"Authorization": config.dbots_key})
+                        await self.bot.http_client.request("POST", url, read="text", json=payload,
+                                                           headers={"Authorization": config.dbots_key})
                         log.info("Posted server count. {}".format(guilds))
                     except Exception as e:
                         log.error('Failed to post server count\n{}: {}'.format(type(e).__name__, e))
 
                     try:
-                        async with aiohttp.ClientSession() as session:
-                            await session.post('https://bots.discord.pw/api/bots/310039170792030211/stats',
-                                                    headers={'Authorization': f'{config.dpw_key}'},
-                                                    json={"server_count": int(guilds),
-                                                          "shard_count": self.bot.shard_count})
+                        await self.bot.http_client.request("POST", 'https://bots.discord.pw/api/bots/310039170792030211/stats',
+                                                           read="text",
+                                                           headers={'Authorization': f'{config.dpw_key}'},
+                                                           json={"server_count": int(guilds),
+                                                                 "shard_count": self.bot.shard_count})
                     except Exception as e:
                         log.error(f"Failed to post to pw, {e}")
                     try:
@@ -57,8 +57,8 @@ class DiscordBotsOrgAPI:
                         payload = {
                             "guild_count": int(guilds)
                         }
-                        async with aiohttp.ClientSession() as cs:
-                            await cs.post(url, json=payload, headers={"Authorization": config.ds_key})
+                        await self.bot.http_client.request("POST", url, read="text", json=payload,
+                                                           headers={"Authorization": config.ds_key})
                     except Exception as e:
                         log.error(f"Failed to post to ds, {e}")
                 # try:
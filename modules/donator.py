@@ -2,7 +2,7 @@ from discord.ext import commands
 import discord
 import rethinkdb as r
 import rethinkdb as rethonk
-import asyncio, aiohttp
+import asyncio
 from prettytable import PrettyTable
 
 import random
@@ -30,21 +30,19 @@ class Donator:
     async def __send_loods(self):
         all_data = await rethonk.table("autolooder").order_by("id").run(self.bot.r_conn)
         choices = all_data.get("choices", ["hentai", "neko", "hentai_anal", "lewdneko", "lewdkitsune"])
-        async with aiohttp.ClientSession() as cs:
-            for data in all_data:
-                log.info("Attempting to send to %s" % data["channel"])
-                try:
-                    channel = self.bot.get_channel(int(data["channel"]))
-                    if channel.is_nsfw():
-                        log.info("Sending loods to %s" % channel.id)
-                        em = discord.Embed(color=0xDEADBF)
-                        async with cs.get("https://nekobot.xyz/api/image?type=%s" % random.choice(choices)) as r:
-                            res = await r.json()
-                        em.set_image(url=res["message"])
-                        await channel.send(embed=em)
-                except Exception as e:
-                    log.info("Failed to send loods to %s, %s" % (data["channel"], e,))
-                    pass
+        for data in all_data:
+            log.info("Attempting to send to %s" % data["channel"])
+            try:
+                channel = self.bot.get_channel(int(data["channel"]))
+                if channel.is_nsfw():
+                    log.info("Sending loods to %s" % channel.id)
+                    em = discord.Embed(color=0xDEADBF)
+                    res = await self.bot.http_client.get_json("https://nekobot.xyz/api/image?type=%s" % random.choice(choices))
+                    em.set_image(url=res["message"])
+                    await channel.send(embed=em)
+            except Exception as e:
+                log.info("Failed to send loods to %s, %s" % (data["channel"], e,))
+                pass
 
     async def __autoloodme(self):
         while True:
@@ -53,10 +51,7 @@ class Donator:
             await asyncio.sleep(3600)
 
     async def __post_to_hook(self, embed:discord.Embed):
-        async with aiohttp.ClientSession() as cs:
-            webhook = discord.Webhook.from_url("https://discordapp.com/api/webhooks/%s/%s" % (webhook_id, webhook_token,),
-                                               adapter=discord.AsyncWebhookAdapter(cs))
-            await webhook.send(embed=embed)
+        self.bot.webhooks.send("https://discordapp.com/api/webhooks/%s/%s" % (webhook_id, webhook_token,), embed=embed)
 
     async def __has_donated(self, user:int):
         all_data = await r.table("donator").order_by("id").run(self.bot.r_conn)
@@ -91,15 +86,13 @@ class Donator:
         if not await self.__has_donated(ctx.author.id):
             return await ctx.send("You need to be a **donator** to use this command.")
 
-        async with aiohttp.ClientSession() as session:
-            url = f"https://nekobot.xyz/api/imagegen" \
-                  f"?type=trap" \
-                  f"&name={user.name}" \
-                  f"&author={ctx.author.name}" \
-                  f"&image={user.avatar_url_as(format='png')}"
-            async with session.get(url) as response:
-                t = await response.json()
-                await ctx.send(embed=discord.Embed(color=0xDEADBF).set_image(url=t['message']))
+        url = f"https://nekobot.xyz/api/imagegen" \
+              f"?type=trap" \
+              f"&name={user.name}" \
+              f"&author={ctx.author.name}" \
+              f"&image={user.avatar_url_as(format='png')}"
+        t = await self.bot.http_client.get_json(url)
+        await ctx.send(embed=discord.Embed(color=0xDEADBF).set_image(url=t['message']))
 
     @commands.command(hidden=True)
     @commands.is_owner()
@@ -152,7 +145,7 @@ class Donator:
         table.field_names = ["User", "Key"]
         for key in allkeys:
             table.add_row([str(key["user"]), str(key["id"])])
-        x = await haste(str(table))
+        x = await haste(str(table), self.bot.http_client)
         await ctx.send(x)
 
     @commands.command(hidden=True)
@@ -2,11 +2,13 @@ import rethinkdb as r
 from discord.ext import commands
 import discord
 from config import weeb, dbots_key
-import aiohttp, asyncio
+import asyncio
 import base64, random
 import datetime, time, math
 from prettytable import PrettyTable
 import hooks
+from .utils import activity
+from .utils.ledger import LedgerError
 
 auth = {"Authorization": "Wolke " + weeb,
         "User-Agent": "NekoBot/4.2.0"}
@@ -17,6 +19,8 @@ class economy:
 
     def __init__(self, bot):
         self.bot = bot
+        self.__level_accounts = set()
+        self.__rep_cache = {}
 
     def _required_exp(self, level: int):
         if level < 0:
@@ -29,76 +33,70 @@ class economy:
     def _find_level(self, total_exp):
         return int((1 / 278) * (9 + math.sqrt(81 + 1112 * (total_exp))))
 
-    async def __has_account(self, user:int):
-        if await r.table("economy").get(str(user)).run(self.bot.r_conn):
-            return True
-        else:
-            return False
-
-    async def __get_balance(self, user:int):
-        balance = await r.table("economy").get(str(user)).run(self.bot.r_conn)
-        return int(balance["balance"])
-
-    async def __has_level_account(self, user:int):
-        if await r.table("levels").get(str(user)).run(self.bot.r_conn):
-            return True
-        else:
-            return False
-
-    async def __create_level_account(self, user:int):
+    async def __check_level_account(self, user:int):
+        if user in self.__level_accounts:
+            return
         data = {
             "id": str(user),
             "info": "",
             "color": "deadbf"
         }
-        await r.table("levels").insert(data).run(self.bot.r_conn)
-
-    async def __check_level_account(self, user:int):
-        if not await self.__has_level_account(user):
-            await self.__create_level_account(user)
+        # Creates the account only if it's missing, in one round-trip
+        await r.table("levels").insert(data, conflict=lambda id, old, new: old).run(self.bot.r_conn)
+        self.__level_accounts.add(user)
+
+    def __ledger_error(self, error:LedgerError, no_account:str, insufficient:str):
+        if error.reason == "no_account":
+            return no_account
+        elif error.reason == "frozen":
+            return "This account is frozen"
+        elif error.reason == "insufficient":
+            return insufficient
+        elif error.reason == "receiver_no_account":
+            return "The user you are sending to doesn't have an account, they can create one with `register`"
+        elif error.reason == "receiver_frozen":
+            return "The user you are sending to has a frozen account."
+        return "Transaction failed."
 
     async def __get_rep_data(self, user:int):
-        async with aiohttp.ClientSession(headers=auth) as cs:
-            async with cs.get("https://api.weeb.sh/reputation/310039170792030211/%s" % (user,)) as r:
-                res = await r.json()
+        res = await self.bot.http_client.get_json("https://api.weeb.sh/reputation/310039170792030211/%s" % (user,), headers=auth)
         return res
 
+    async def __get_rep(self, user:int):
+        """Reputation with a short cache, falls back to the last known value if weeb.sh is slow or down."""
+        cached = self.__rep_cache.get(user)
+        if cached and cached[1] > time.monotonic():
+            return cached[0]
+        try:
+            rep = (await asyncio.wait_for(self.__get_rep_data(user), timeout=3))["user"]["reputation"]
+        except Exception:
+            return cached[0] if cached else 0
+        self.__rep_cache[user] = (rep, time.monotonic() + 60)
+        if len(self.__rep_cache) > 5000:
+            now = time.monotonic()
+            self.__rep_cache = {k: v for k, v in self.__rep_cache.items() if v[1] > now}
+        return rep
+
+    async def __get_profile_data(self, user:int, guild:int):
+        """Everything the profile needs from the database in one query."""
+        user = str(user)
+        return await r.expr({
+            "levels": r.table("levels").get(user),
+            "balance": r.table("economy").get(user)["balance"].default(0),
+            "xp": r.table("levelSystem").get(user)["xp"].default(None),
+            "guild_xp": r.table("guildXP").get(str(guild))[user]["xp"].default(None),
+            "married": r.table("marriage").get(user)["marriedTo"].default(None)
+        }).run(self.bot.r_conn)
+
     async def __has_voted(self, user:int):
         if await r.table("votes").get(str(user)).run(self.bot.r_conn):
             return True
         else:
             return False
 
-    async def __update_balance(self, user:int, amount:int):
-        await r.table("economy").get(str(user)).update({"balance": int(amount)}).run(self.bot.r_conn)
-
-    async def __update_payday_time(self, user:int):
-        await r.table("economy").get(str(user)).update({"lastpayday": str(int(time.time()))}).run(self.bot.r_conn)
-
     async def __post_to_hook(self, action:str, user:discord.Member, amount):
-        try:
-            async with aiohttp.ClientSession() as cs:
-                webhook = discord.Webhook.from_url(hooks.get_url(), adapter=discord.AsyncWebhookAdapter(cs))
-                await webhook.send("User: %s (%s)\nAction: %s\nAmount: %s\nTime: %s" % (str(user), user.id, action, amount, int(time.time())))
-        except:
-            pass
-
-    async def __add_bettime(self, user:int):
-        try:
-            data = await r.table("economy").get(str(user)).run(self.bot.r_con
-            bettimes = data["bettimes"]
-            bettimes.append(str(int(time.time())))
-            await r.table("economy").get(str(user)).update({"bettimes": bettimes}).run(self.bot.r_conn)
-        except:
-            pass
-
-    async def __is_frozen(self, user:int):
-        data = await r.table("economy").get(str(user)).run(self.bot.r_conn)
-        frozen = data.get("frozen", False)
-        if frozen:
-            return True
-        else:
-            return False
+        self.bot.webhooks.send(hooks.get_url(), "User: %s (%s)\nAction: %s\nAmount: %s\nTime: %s" % (
+            str(user), user.id, action, amount, int(time.time())))
 
     @commands.command()
     @commands.cooldown(1, 5, commands.BucketType.user)
@@ -108,18 +106,18 @@ class economy:
 
         await self.__check_level_account(user.id)
 
-        if await self.__has_account(user.id):
+        data = {
+            "id": str(user.id),
+            "balance": 0,
+            "lastpayday": "0",
+            "betactivity": activity.empty(),
+            "frozen": False
+        }
+        result = await r.table("economy").insert(data, conflict="error").run(self.bot.r_conn)
+        if result["errors"]:
             await ctx.send("You already have an account.")
         else:
-            data = {
-                "id": str(user.id),
-                "balance": 0,
-                "lastpayday": "0",
-                "bettimes": [],
-                "frozen": False
-            }
             await self.__post_to_hook("Register", ctx.author, 0)
-            await r.table("economy").insert(data).run(self.bot.r_conn)
             await ctx.send("Made an account!")
 
     @commands.command()
@@ -132,11 +130,8 @@ class economy:
 
         await self.__check_level_account(user.id)
 
-        if await self.__has_account(user.id):
-            balance = await self.__get_balance(user.id)
-            await ctx.send("💵 | Balance: **$%s**" % balance)
-        else:
-            await ctx.send("💵 | Balance: **$0**")
+        balance = await self.bot.ledger.balance(user.id)
+        await ctx.send("💵 | Balance: **$%s**" % balance)
 
     @commands.command()
     @commands.guild_only()
@@ -148,30 +143,22 @@ class economy:
         if user is None:
             user = ctx.author
 
-        await self.__check_level_account(user.id)
+        data, rep, _ = await asyncio.gather(self.__get_profile_data(user.id, ctx.guild.id),
+                                            self.__get_rep(user.id),
+                                            self.__check_level_account(user.id))
 
-        # Level Check
-        if not await self.__has_level_account(user.id):
+        if data["levels"]:
+            info = base64.b64decode(data["levels"]["info"]).decode("utf8")
+            color = int(data["levels"]["color"], 16)
+        else:
             info = ""
             color = int("deadbf", 16)
-        else:
-            userinfo = await r.table("levels").get(str(user.id)).run(self.bot.r_conn)
-            info = base64.b64decode(userinfo["info"]).decode("utf8")
-            color = int(userinfo["color"], 16)
-
-        # Economy Check
-        if not await self.__has_account(user.id):
-            balance = 0
-        else:
-            balance = await self.__get_balance(user.id)
 
-        # Get Users Reputation
-        rep = (await self.__get_rep_data(user.id))["user"]["reputation"]
+        balance = data["balance"]
 
-        # Get Users Level
-        xp = await r.table("levelSystem").get(str(user.id)).run(self.bot.r_conn)
-        if xp:
-            xp = xp["xp"]
+        xp = data["xp"]
+        if xp is not None:
+            xp += self.bot.xp.pending_xp(user.id)
             level = self._find_level(xp)
             required = self._level_exp(level + 1)
         else:
@@ -179,13 +166,8 @@ class economy:
             level = 0
             required = 0
 
-        # Get users guild level
-        _guild_xp = await r.table("guildXP").get(str(ctx.guild.id)).run(self.bot.r_conn)
-        if _guild_xp:
-            try:
-                guild_xp = _guild_xp[str(ctx.author.id)]["xp"]
-            except:
-                guild_xp = 0
+        guild_xp = data["guild_xp"]
+        if guild_xp is not None:
             guild_level = self._find_level(guild_xp)
             guild_required = self._level_exp(guild_level + 1)
         else:
@@ -193,12 +175,12 @@ class economy:
             guild_level = 0
             guild_required = 0
 
-        # Get user married to
-        married = await r.table("marriage").get(str(user.id)).run(self.bot.r_conn)
-        if not married:
+        if not data["married"]:
             married = "Nobody"
         else:
-            married = await self.bot.get_user_info(married["marriedTo"])
+            married = self.bot.get_user(int(data["married"]))
+            if married is None:
+                married = await self.bot.get_user_info(int(data["married"]))
 
         em = discord.Embed(color=color)
         em.title = "%s's Profile" % user.name
@@ -216,47 +198,32 @@ class economy:
         user = ctx.author
         await self.__check_level_account(user.id)
 
-        if not await self.__has_account(user.id):
-            return await ctx.send("You don't have a bank account. Make one with `register`")
-
-        user_data = await r.table("economy").get(str(user.id)).run(self.bot.r_conn)
-        last_payday = user_data["lastpayday"]
-        user_balance = int(user_data["balance"])
-        if await self.__is_frozen(ctx.author.id):
-            return await ctx.send("This account is frozen")
-
-        tn = int(time.time())
-        st = int(last_payday)
-        tl = tn - st
-        if not tl >= 86400:
-            i = datetime.timedelta(seconds=86400 - tl)
-            d = datetime.datetime(1, 1, 1) + i
-            return await ctx.send("You have `%s` until your next daily." % d.strftime("%H:%M:%S"))
-
+        em = discord.Embed(color=0xDEADBF)
         if await self.__has_voted(user.id): # If user has voted
-            em = discord.Embed(color=0xDEADBF)
             em.title = "Daily Voter Bonus"
             weekday = datetime.datetime.today().weekday()
             if weekday <= 4: # If its a weekend, give weekend bonus.
+                action, amount = "Daily (Vote Weekend)", 12500
                 em.description = "You have received **12500** weekend bonus credits!"
-                await self.__post_to_hook("Daily (Vote Weekend)", ctx.author, 12500)
-                await self.__update_payday_time(user.id)
-                await self.__update_balance(user.id, user_balance + 12500)
             else:
+                action, amount = "Daily (Vote)", 7500
                 em.description = "You have received **7500** credits!"
-                await self.__post_to_hook("Daily (Vote)", ctx.author, 7500)
-                await self.__update_payday_time(user.id)
-                await self.__update_balance(user.id, user_balance + 7500)
-            await ctx.send(embed=em)
         else:
-            em = discord.Embed(color=0xDEADBF)
+            action, amount = "Daily (Non Vote)", 5000
             em.title = "Daily Bonus"
             em.description = "You have received **5000** credits!"
             em.set_footer(text="Voting will give you 7500 👀")
-            await self.__post_to_hook("Daily (Non Vote)", ctx.author, 5000)
-            await self.__update_payday_time(user.id)
-            await self.__update_balance(user.id, user_balance + 5000)
-            await ctx.send(embed=em)
+
+        try:
+            await self.bot.ledger.claim_daily(user.id, amount)
+        except LedgerError as e:
+            if e.reason == "cooldown":
+                d = datetime.datetime(1, 1, 1) + datetime.timedelta(seconds=e.remaining)
+                return await ctx.send("You have `%s` until your next daily." % d.strftime("%H:%M:%S"))
+            return await ctx.send(self.__ledger_error(e, "You don't have a bank account. Make one with `register`", ""))
+
+        await self.__post_to_hook(action, ctx.author, amount)
+        await ctx.send(embed=em)
 
     @commands.command()
     @commands.cooldown(1, 7, commands.BucketType.user)
@@ -277,22 +244,19 @@ class economy:
 
         await ctx.trigger_typing()
 
-        async with aiohttp.ClientSession() as cs:
-            async with cs.post("https://api.weeb.sh/reputation/310039170792030211/%s" % user.id,
-                               headers=auth,
-                               data={"source_user": str(ctx.author.id)}) as r:
-                data = await r.json()
+        data = await self.bot.http_client.post_json("https://api.weeb.sh/reputation/310039170792030211/%s" % user.id,
+                                                    headers=auth,
+                                                    data={"source_user": str(ctx.author.id)})
 
-            if data['status'] == 200:
-                await ctx.send("**%s has given %s 1 reputation point!**" % (ctx.author.name.replace("@", "@\u200B"),
-                                                                            user.mention,))
-            else:
-                async with cs.get("https://api.weeb.sh/reputation/310039170792030211/%s" % ctx.author.id,
-                                   headers=auth) as r:
-                    repdata = await r.json()
-                nextrep = repdata["user"]["nextAvailableReputations"][0]
-                timeleft = (datetime.datetime(1, 1, 1) + datetime.timedelta(milliseconds=nextrep)).strftime("%H:%M:%S")
-                await ctx.send("**%s, you can give more reputation in `%s`**" % (ctx.author.mention, timeleft,))
+        if data['status'] == 200:
+            await ctx.send("**%s has given %s 1 reputation point!**" % (ctx.author.name.replace("@", "@\u200B"),
+                                                                        user.mention,))
+        else:
+            repdata = await self.bot.http_client.get_json("https://api.weeb.sh/reputation/310039170792030211/%s" % ctx.author.id,
+                                                          headers=auth)
+            nextrep = repdata["user"]["nextAvailableReputations"][0]
+            timeleft = (datetime.datetime(1, 1, 1) + datetime.timedelta(milliseconds=nextrep)).strftime("%H:%M:%S")
+            await ctx.send("**%s, you can give more reputation in `%s`**" % (ctx.author.mention, timeleft,))
 
     @commands.command()
     @commands.cooldown(1, 7, commands.BucketType.user)
@@ -314,21 +278,17 @@ class economy:
         """Coinflip!"""
         await self.__check_level_account(ctx.author.id)
 
-        if not await self.__has_account(ctx.author.id):
-            return await ctx.send("You don't have an account, you can make one with `register`")
-
-        if await self.__is_frozen(ctx.author.id):
-            return await ctx.send("This account is frozen")
-
         if amount <= 0:
             return await ctx.send("Your amount must be higher than 0")
         elif amount > 100000:
             return await ctx.send("You can't bet past 100,000")
 
-        balance = await self.__get_balance(ctx.author.id)
-
-        if (balance - amount) < 0:
-            return await ctx.send("You don't have that much to spend")
+        # Take the stake up front so it can't be spent again while flipping
+        try:
+            await self.bot.ledger.debit(ctx.author.id, amount, bet=True)
+        except LedgerError as e:
+            return await ctx.send(self.__ledger_error(e, "You don't have an account, you can make one with `register`",
+                                                      "You don't have that much to spend"))
 
         msg = await ctx.send("Flipping...")
         await asyncio.sleep(random.randint(1, 5))
@@ -336,39 +296,53 @@ class economy:
         choice = random.randint(0, 1)
 
         em = discord.Embed(color=0xDEADBF)
-        await self.__add_bettime(ctx.author.id)
 
         if choice == 1:
             em.title = "You Won!"
             em.description = "You won `%s`!" % int(amount * .5)
             await self.__post_to_hook("Coinflip Win", ctx.author, int(amount * .5))
-            await self.__update_balance(ctx.author.id, balance + int(amount * .5))
+            await self.bot.ledger.credit(ctx.author.id, amount + int(amount * .5))
         else:
             em.title = "You Lost"
             em.description = "You lost `%s`" % amount
             await self.__post_to_hook("Coinflip Loss", ctx.author, amount)
-            await self.__update_balance(ctx.author.id, balance - amount)
 
         await msg.edit(content=None, embed=em)
 
     @commands.command()
     @commands.guild_only()
     @commands.cooldown(1, 10, commands.BucketType.user)
-    async def top(self, ctx):
+    async def top(self, ctx, page:int=1):
         """Get top economy users."""
+        await self.__send_leaderboard(ctx, "balance", "Balance", page, "${:,}")
+
+    @commands.command(aliases=["xptop"])
+    @commands.guild_only()
+    @commands.cooldown(1, 10, commands.BucketType.user)
+    async def leveltop(self, ctx, page:int=1):
+        """Get top levelled users."""
+        await self.__send_leaderboard(ctx, "xp", "XP", page, "{:,}")
+
+    async def __send_leaderboard(self, ctx, board:str, name:str, page:int, fmt:str):
         await self.__check_level_account(ctx.author.id)
         await ctx.trigger_typing()
 
-        table = PrettyTable()
-        table.field_names = ["Username", "Balance"]
+        if page < 1 or page > 100:
+            return await ctx.send("Invalid page.")
 
-        top_users = await r.table("economy").order_by(r.desc("balance")).limit(10).run(self.bot.r_conn)
+        entries, (rank, score) = await asyncio.gather(self.bot.leaderboard.page(board, page - 1),
+                                                      self.bot.leaderboard.rank(board, ctx.author.id))
+        if not entries:
+            return await ctx.send("Nobody is on this page.")
+        names = await self.bot.leaderboard.names([user for _, user, _ in entries])
 
-        for i, user in enumerate(top_users):
-            username = (await self.bot.redis.get("top%s" % i)).decode("utf8")
-            table.add_row([username, "${:,}".format(user["balance"])])
+        table = PrettyTable()
+        table.field_names = ["#", "Username", name]
+        for position, user, value in entries:
+            table.add_row([position, names[user], fmt.format(value)])
 
-        await ctx.send("```\n%s\n```" % table)
+        footer = "You are #%s with %s" % (rank, fmt.format(score)) if rank else "You aren't ranked yet"
+        await ctx.send("```\n%s\n```Page %s | %s" % (table, page, footer))
 
     @commands.command()
     @commands.guild_only()
@@ -378,16 +352,6 @@ class economy:
 
         await self.__check_level_account(ctx.author.id)
 
-        if not await self.__has_account(ctx.author.id):
-            return await ctx.send("You don't have an account, you can create one with `register`")
-        elif not await self.__has_account(user.id):
-            return await ctx.send("`%s` doesn't have an account, they can create one with `register`" % user.name)
-
-        if await self.__is_frozen(ctx.author.id):
-            return await ctx.send("This account is frozen")
-        if await self.__is_frozen(user.id):
-            return await ctx.send("The user you are sending to has a frozen account.")
-
         if amount < 10:
             return await ctx.send("The amount must be higher than 10")
         elif amount > 10000000:
@@ -397,14 +361,14 @@ class economy:
         elif user == ctx.author:
             return await ctx.send("You can't send yourself money")
 
-        author_balance = await self.__get_balance(ctx.author.id)
-        user_balance = await self.__get_balance(user.id)
-
-        if (author_balance - amount) < 0:
-            return await ctx.send("You don't have that much to spend.")
+        try:
+            await self.bot.ledger.transfer(ctx.author.id, user.id, amount)
+        except LedgerError as e:
+            if e.reason == "receiver_no_account":
+                return await ctx.send("`%s` doesn't have an account, they can create one with `register`" % user.name)
+            return await ctx.send(self.__ledger_error(e, "You don't have an account, you can create one with `register`",
+                                                      "You don't have that much to spend."))
 
-        await self.__update_balance(user.id, user_balance + amount)
-        await self.__update_balance(ctx.author.id, author_balance - amount)
         await self.__post_to_hook("Transfer", ctx.author, "%s to %s (%s)" % (amount, str(user), user.id))
 
         await ctx.send("Successfully sent %s $%s" % (user.name, amount,))
@@ -416,18 +380,8 @@ class economy:
 
         await self.__check_level_account(ctx.author.id)
 
-        if not await self.__has_account(ctx.author.id):
-            return await ctx.send("You don't have a bank account...")
-
-        if await self.__is_frozen(ctx.author.id):
-            return await ctx.send("This account is frozen")
-
-        author_balance = await self.__get_balance(ctx.author.id)
-
         if amount <= 0:
             return await ctx.send("You can't bet that low...")
-        if (author_balance - amount) < 0:
-            return await ctx.send("You don't have that much to bet...")
         if amount > 75000:
             return await ctx.send("You can't bet past 75k")
 
@@ -435,8 +389,11 @@ class economy:
         if color not in ["red", "green", "black"]:
             return await ctx.send("Invalid color, available colors: `red`, `black`, `green`")
 
-        await self.__update_balance(ctx.author.id, author_balance - amount)
-        await self.__add_bettime(ctx.author.id)
+        try:
+            await self.bot.ledger.debit(ctx.author.id, amount, bet=True)
+        except LedgerError as e:
+            return await ctx.send(self.__ledger_error(e, "You don't have a bank account...",
+                                                      "You don't have that much to bet..."))
 
         choice = random.randint(0, 36)
 
@@ -453,10 +410,10 @@ class economy:
         else:
             if chosen_color == "green":
                 await self.__post_to_hook("Roulette Won (green)", ctx.author, int(amount*36))
-                await self.__update_balance(ctx.author.id, author_balance + int(amount * 36))
+                await self.bot.ledger.credit(ctx.author.id, amount + int(amount * 36))
                 return await ctx.send("You hit green!")
             await self.__post_to_hook("Roulette Won (%s)" % color, ctx.author, int(amount*.75))
-            await self.__update_balance(ctx.author.id, author_balance + int(amount * .75))
+            await self.bot.ledger.credit(ctx.author.id, amount + int(amount * .75))
             return await ctx.send(f"It landed on `{chosen_color}` and you won!")
 
     async def delmsg(self, msg: discord.Message):
@@ -474,26 +431,18 @@ class economy:
 
         await self.__check_level_account(author.id)
 
-        if not await self.__has_account(ctx.author.id):
-            return await ctx.send("You don't have a bank account...")
-
-        if await self.__is_frozen(ctx.author.id):
-            return await ctx.send("This account is frozen")
-
-        author_balance = await self.__get_balance(ctx.author.id)
-
         if amount <= 0:
             await ctx.send("You can't bet that low...")
             return
-        if (author_balance - amount) < 0:
-            await ctx.send("You don't have that much to bet...")
-            return
         if amount > 50000:
             await ctx.send("You can't bet past 50k")
             return
 
-        await self.__update_balance(ctx.author.id, author_balance - amount)
-        await self.__add_bettime(ctx.author.id)
+        try:
+            await self.bot.ledger.debit(ctx.author.id, amount, bet=True)
+        except LedgerError as e:
+            return await ctx.send(self.__ledger_error(e, "You don't have a bank account...",
+                                                      "You don't have that much to bet..."))
 
         card_list = {
             "2": "<:2C:424587135463456778>",
@@ -608,7 +557,7 @@ class economy:
                 await self.__post_to_hook("Blackjack Won", ctx.author, amount)
                 em.add_field(name="Your Cards (%s)" % author_total, value=author_value, inline=True)
                 em.add_field(name="My Cards (%s)" % bot_total, value=bot_value, inline=True)
-                await self.__update_balance(ctx.author.id, author_balance + int(amount * .5))
+                await self.bot.ledger.credit(ctx.author.id, amount + int(amount * .5))
             else:
                 em.description = "I beat you >:3"
                 await self.__post_to_hook("Blackjack Loss", ctx.author, amount)
@@ -636,7 +585,7 @@ class economy:
             else:
                 em.description = "I went over 21 and you won ;w;"
                 await self.__post_to_hook("Blackjack Won", ctx.author, amount)
-                await self.__update_balance(ctx.author.id, author_balance + int(amount * 1.5))
+                await self.bot.ledger.credit(ctx.author.id, amount + int(amount * 1.5))
 
             bot_value = f"%s %s | %s %s | %s %s" % (card_list[bot_deck[0]], bot_deck_n[0],
                                                     card_list[bot_deck[1]], bot_deck_n[1],
@@ -676,7 +625,7 @@ class economy:
                 await self.__post_to_hook("Blackjack Won", ctx.author, amount)
                 em.add_field(name="Your Cards (%s)" % author_total, value=author_value, inline=True)
                 em.add_field(name="My Cards (%s)" % bot_total, value=bot_value, inline=True)
-                await self.__update_balance(ctx.author.id, author_balance + int(amount * .75))
+                await self.bot.ledger.credit(ctx.author.id, amount + int(amount * .75))
             else:
                 em.description = "I beat you >:3"
                 await self.__post_to_hook("Blackjack Loss", ctx.author, amount)
@@ -704,7 +653,7 @@ class economy:
             else:
                 em.description = "I went over 21 and you won ;w;"
                 await self.__post_to_hook("Blackjack Won", ctx.author, amount)
-                await self.__update_balance(ctx.author.id, author_balance + int(amount * 1.5))
+                await self.bot.ledger.credit(ctx.author.id, amount + int(amount * 1.5))
 
             bot_value = f"%s %s | %s %s | %s %s | %s %s" % (card_list[bot_deck[0]], bot_deck_n[0],
                                                             card_list[bot_deck[1]], bot_deck_n[1],
@@ -745,7 +694,7 @@ class economy:
                 await self.__post_to_hook("Blackjack Won", ctx.author, amount)
                 em.add_field(name="Your Cards (%s)" % author_total, value=author_value, inline=True)
                 em.add_field(name="My Cards (%s)" % bot_total, value=bot_value, inline=True)
-                await self.__update_balance(ctx.author.id, author_balance + int(amount * .75))
+                await self.bot.ledger.credit(ctx.author.id, amount + int(amount * .75))
             else:
                 em.description = "I beat you >:3"
                 await self.__post_to_hook("Blackjack Loss", ctx.author, amount)
@@ -776,7 +725,7 @@ class economy:
             else:
                 em.description = "I went over 21 and you won ;w;"
                 await self.__post_to_hook("Blackjack Won", ctx.author, amount)
-                await self.__update_balance(ctx.author.id, author_balance + int(amount * 1.5))
+                await self.bot.ledger.credit(ctx.author.id, amount + int(amount * 1.5))
 
             bot_value = f"%s %s | %s %s | %s %s | %s %s | %s %s" % (card_list[bot_deck[0]], bot_deck_n[0],
                                                                     card_list[bot_deck[1]], bot_deck_n[1],
@@ -795,7 +744,7 @@ class economy:
         if author_total > bot_total:
             em.description = "You beat me ;w;"
             await self.__post_to_hook("Blackjack Won", ctx.author, amount)
-            await self.__update_balance(ctx.author.id, author_balance + int(amount * 1.5))
+            await self.bot.ledger.credit(ctx.author.id, amount + int(amount * 1.5))
         else:
             em.description = "I beat you >:3"
             await self.__post_to_hook("Blackjack Loss", ctx.author, amount)
@@ -844,30 +793,7 @@ class economy:
         choice = random.randint(1, 15)
         author = message.author
         if choice == 1:
-            user_data = await r.table("levelSystem").get(str(author.id)).run(self.bot.r_conn)
-            if not user_data:
-                data = {
-                    "id": str(author.id),
-                    "xp": 0,
-                    "lastxp": "0",
-                    "blacklisted": False,
-                    "lastxptimes": []
-                }
-                await r.table("levelSystem").insert(data).run(self.bot.r_conn)
-            if user_data["blacklisted"]:
-                return
-            if (int(time.time()) - int(user_data["lastxp"])) >= 120:
-                lastxptimes = user_data["lastxptimes"]
-                lastxptimes.append(str(int(time.time())))
-
-                newxp = random.randint(1, 30)
-                xp = user_data["xp"] + newxp
-                data = {
-                    "xp": xp,
-                    "lastxp": str(int(time.time())),
-                    "lastxptimes": lastxptimes
-                }
-                await r.table("levelSystem").get(str(author.id)).update(data).run(self.bot.r_conn)
+            await self.bot.xp.add(author.id)
         # elif choice == 2:
         #     await self.__handle_guild_xp(message.guild.id, author.id)
 
@@ -28,12 +28,10 @@ class error_handler:
         elif isinstance(error, discord.Forbidden):
             return
         elif isinstance(error, discord.HTTPException) or isinstance(error, aiohttp.ClientConnectionError):
-            async with aiohttp.ClientSession() as cs:
-                webhook = discord.Webhook.from_url(self.webhook_url, adapter=discord.AsyncWebhookAdapter(cs))
-                em = discord.Embed(color=16740159)
-                em.title = "Error in command %s, Instance %s" % (ctx.command.qualified_name, self.bot.instance)
-                em.description = "HTTPException"
-                await webhook.send(embed=em)
+            em = discord.Embed(color=16740159)
+            em.title = "Error in command %s, Instance %s" % (ctx.command.qualified_name, self.bot.instance)
+            em.description = "HTTPException"
+            self.bot.webhooks.send(self.webhook_url, embed=em)
             return await ctx.send("Failed to get data.")
 
         if isinstance(exception, commands.NoPrivateMessage):
@@ -45,18 +43,11 @@ class error_handler:
                                title="Error",
                                description=f"Error in command {ctx.command.qualified_name}, "
                                            f"[Support Server](https://discord.gg/q98qeYN).\n`{exception}`")
-            payload = {
-                "embeds": [
-                    {
-                        "title": f"Command: {ctx.command.qualified_name}, Instance: {self.bot.instance}",
-                        "description": f"```py\n{exception}\n```\n By `{ctx.author}` (`{ctx.author.id}`)",
-                        "color": 16740159
-                    }
-                ]
-            }
-            async with aiohttp.ClientSession() as cs:
-                async with cs.post(self.webhook_url, json=payload) as r:
-                    await r.read()
+            self.bot.webhooks.send(self.webhook_url, embed={
+                "title": f"Command: {ctx.command.qualified_name}, Instance: {self.bot.instance}",
+                "description": f"```py\n{exception}\n```\n By `{ctx.author}` (`{ctx.author.id}`)",
+                "color": 16740159
+            })
             await ctx.send(embed=em)
             log.warning('In {}:'.format(ctx.command.qualified_name))
             log.warning('{}: {}'.format(exception.original.__class__.__name__, exception.original))
@@ -1,7 +1,5 @@
 from discord.ext import commands
 import discord
-import aiohttp
-from PIL import Image
 
 import config
 from io import BytesIO
@@ -52,38 +50,10 @@ class Fun:
     async def emojisplit(self, ctx, emoji: discord.Emoji):
         """Split an emote into 4"""
 
-        async with aiohttp.ClientSession() as cs:
-            async with cs.get(emoji.url) as r:
-                res = await r.read()
-
-        img = Image.open(BytesIO(res))
-        x, y = img.size
-
-        part1 = img.crop((0, 0, x / 2, y / 2))
-        part2 = img.crop((x / 2, 0, x, y / 2))
-        part3 = img.crop((0, y / 2, x / 2, y))
-        part4 = img.crop((x / 2, y / 2, x, y))
-
-        tmp_1 = BytesIO()
-        tmp_2 = BytesIO()
-        tmp_3 = BytesIO()
-        tmp_4 = BytesIO()
-
-        part1.save(tmp_1, format="png")
-        tmp_1.seek(0)
-        part2.save(tmp_2, format="png")
-        tmp_2.seek(0)
-        part3.save(tmp_3, format="png")
-        tmp_3.seek(0)
-        part4.save(tmp_4, format="png")
-        tmp_4.seek(0)
-
-        files = [
-            discord.File(tmp_1, "part1.png"),
-            discord.File(tmp_2, "part2.png"),
-            discord.File(tmp_3, "part3.png"),
-            discord.File(tmp_4, "part4.png")
-        ]
+        res = await self.bot.http_client.get_bytes(emoji.url)
+
+        parts = await self.bot.render.render("emojisplit", res)
+        files = [discord.File(BytesIO(part), "part%s.png" % i) for i, part in enumerate(parts, 1)]
 
         await ctx.send(files=files)
 
@@ -103,9 +73,7 @@ class Fun:
         }
         url = "https://captionbot.azurewebsites.net/api/messages"
         try:
-            async with aiohttp.ClientSession() as cs:
-                async with cs.post(url, headers=headers, json=payload) as r:
-                    data = await r.text()
+            data = await self.bot.http_client.request("POST", url, headers=headers, json=payload, read="text")
             em = discord.Embed(color=0xDEADBF, title=str(data))
             em.set_image(url=img)
             await ctx.send(embed=em)
@@ -120,9 +88,7 @@ class Fun:
         if not isinstance(img, str):
             return img
 
-        async with aiohttp.ClientSession() as cs:
-            async with cs.get("https://nekobot.xyz/api/imagegen?type=blurpify&image=%s" % img) as r:
-                res = await r.json()
+        res = await self.bot.http_client.get_json("https://nekobot.xyz/api/imagegen?type=blurpify&image=%s" % img)
 
         await ctx.send(embed=self.__embed_json(res))
 
@@ -131,11 +97,9 @@ class Fun:
     async def phcomment(self, ctx, *, comment: str):
         """PronHub Comment Image"""
         await ctx.trigger_typing()
-        async with aiohttp.ClientSession() as cs:
-            async with cs.get(f"https://nekobot.xyz/api/imagegen?type=phcomment"
-                              f"&image={ctx.author.avatar_url_as(format='png')}"
-                              f"&text={comment}&username={ctx.author.name}") as r:
-                res = await r.json()
+        res = await self.bot.http_client.get_json(f"https://nekobot.xyz/api/imagegen?type=phcomment"
+                                                  f"&image={ctx.author.avatar_url_as(format='png')}"
+                                                  f"&text={comment}&username={ctx.author.name}")
         if not res["success"]:
             return await ctx.send("**Failed to successfully get image.**")
         await ctx.send(embed=self.__embed_json(res))
@@ -157,9 +121,7 @@ class Fun:
                                         'INFLAMMATORY': {},
                                         'INCOHERENT': {}}
             }
-            async with aiohttp.ClientSession() as cs:
-                async with cs.post(url, json=analyze_request) as r:
-                    response = await r.json()
+            response = await self.bot.http_client.post_json(url, json=analyze_request)
             em = discord.Embed(color=0xDEADBF, title="Toxicity Levels")
             em.add_field(name="Toxicity",
                          value=f"{round(float(response['attributeScores']['TOXICITY']['summaryScore']['value'])*100)}%")
@@ -187,9 +149,7 @@ class Fun:
         """Weebify Text"""
         try:
             key = config.idiotic_api
-            async with aiohttp.ClientSession(headers={"Authorization": key}) as cs:
-                async with cs.get(f'https://dev.anidiots.guide/text/owoify?text={text}') as r:
-                    res = await r.json()
+            res = await self.bot.http_client.get_json(f'https://dev.anidiots.guide/text/owoify?text={text}', headers={"Authorization": key})
             await ctx.send(res['text'].replace("@", "@\u200B"))
         except:
             await ctx.send("Failed to connect.")
@@ -201,9 +161,7 @@ class Fun:
         await ctx.trigger_typing()
         try:
             url = f"https://dev.anidiots.guide/generators/achievement?avatar={ctx.message.author.avatar_url_as(format='png')}&text={achievement}"
-            async with aiohttp.ClientSession() as cs:
-                async with cs.get(url, headers={"Authorization": config.idiotic_api}) as r:
-                    res = await r.json()
+            res = await self.bot.http_client.get_json(url, headers={"Authorization": config.idiotic_api})
             file = discord.File(BytesIO(bytes(res["data"])), filename="image.png")
             em = discord.Embed(color=0xDEADBF)
             await ctx.send(file=file, embed=em.set_image(url="attachment://image.png"))
@@ -219,11 +177,9 @@ class Fun:
     async def tweet(self, ctx, username: str, *, text: str):
         """Tweet as someone."""
         await ctx.trigger_typing()
-        async with aiohttp.ClientSession() as cs:
-            async with cs.get("https://nekobot.xyz/api/imagegen?type=tweet"
-                              "&username=%s"
-                              "&text=%s" % (username, text,)) as r:
-                res = await r.json()
+        res = await self.bot.http_client.get_json("https://nekobot.xyz/api/imagegen?type=tweet"
+                                                  "&username=%s"
+                                                  "&text=%s" % (username, text,))
 
         await ctx.send(embed=self.__embed_json(res))
 
@@ -233,9 +189,7 @@ class Fun:
         if len(text) > 22:
             return await ctx.send("Text too long ;w;")
         await ctx.trigger_typing()
-        async with aiohttp.ClientSession() as cs:
-            async with cs.get("https://i.ode.bz/auto/nichijou?text=%s" % text) as r:
-                res = await r.read()
+        res = await self.bot.http_client.get_bytes("https://i.ode.bz/auto/nichijou?text=%s" % text)
 
         file = discord.File(fp=BytesIO(res), filename="nichijou.gif")
         await ctx.send(file=file)
@@ -247,9 +201,7 @@ class Fun:
         if not isinstance(img, str):
             return img
 
-        async with aiohttp.ClientSession() as cs:
-            async with cs.get("https://nekobot.xyz/api/imagegen?type=threats&url=%s" % img) as r:
-                res = await r.json()
+        res = await self.bot.http_client.get_json("https://nekobot.xyz/api/imagegen?type=threats&url=%s" % img)
 
         await ctx.send(embed=self.__embed_json(res))
 
@@ -260,9 +212,7 @@ class Fun:
         img = await self.__get_image(ctx, user)
         if not isinstance(img, str):
             return img
-        async with aiohttp.ClientSession() as cs:
-            async with cs.get("https://nekobot.xyz/api/imagegen?type=bodypillow&url=%s" % img) as r:
-                res = await r.json()
+        res = await self.bot.http_client.get_json("https://nekobot.xyz/api/imagegen?type=bodypillow&url=%s" % img)
 
         await ctx.send(embed=self.__embed_json(res))
 
@@ -272,9 +222,7 @@ class Fun:
         """:^)"""
         await ctx.trigger_typing()
         avatar = user.avatar_url_as(format="png")
-        async with aiohttp.ClientSession() as cs:
-            async with cs.get("https://nekobot.xyz/api/imagegen?type=baguette&url=%s" % avatar) as r:
-                res = await r.json()
+        res = await self.bot.http_client.get_json("https://nekobot.xyz/api/imagegen?type=baguette&url=%s" % avatar)
 
         await ctx.send(embed=self.__embed_json(res))
 
@@ -286,9 +234,7 @@ class Fun:
         if not isinstance(img, str):
             return img
 
-        async with aiohttp.ClientSession() as cs:
-            async with cs.get("https://nekobot.xyz/api/imagegen?type=deepfry&image=%s" % img) as r:
-                res = await r.json()
+        res = await self.bot.http_client.get_json("https://nekobot.xyz/api/imagegen?type=deepfry&image=%s" % img)
 
         await ctx.send(embed=self.__embed_json(res))
 
@@ -296,9 +242,7 @@ class Fun:
     @commands.cooldown(1, 5, commands.BucketType.user)
     async def clyde(self, ctx, *, text: str):
         await ctx.trigger_typing()
-        async with aiohttp.ClientSession() as cs:
-            async with cs.get("https://nekobot.xyz/api/imagegen?type=clyde&text=%s" % text) as r:
-                res = await r.json()
+        res = await self.bot.http_client.get_json("https://nekobot.xyz/api/imagegen?type=clyde&text=%s" % text)
 
         await ctx.send(embed=self.__embed_json(res))
 
@@ -307,9 +251,7 @@ class Fun:
     async def joke(self, ctx):
         """Sends a Joke OwO"""
         await ctx.trigger_typing()
-        async with aiohttp.ClientSession(headers={"Accept": "application/json"}) as cs:
-            async with cs.get('https://icanhazdadjoke.com/') as r:
-                res = await r.json()
+        res = await self.bot.http_client.get_json('https://icanhazdadjoke.com/', headers={"Accept": "application/json"})
         await ctx.send(f"**{res['joke']}**")
 
     @commands.command()
@@ -319,9 +261,7 @@ class Fun:
         await ctx.trigger_typing()
         if len(text) >= 500:
             return await ctx.send("Text is too long ;w;")
-        async with aiohttp.ClientSession() as cs:
-            async with cs.get("http://nekobot.xyz/api/text?type=bigletter&text=" + text) as r:
-                res = await r.json()
+        res = await self.bot.http_client.get_json("http://nekobot.xyz/api/text?type=bigletter&text=" + text)
         await ctx.send(res["message"])
 
     @commands.command()
@@ -353,9 +293,7 @@ class Fun:
         filled_progbar = round(score / 100 * 10)
         counter_ = '█' * filled_progbar + '‍ ‍' * (10 - filled_progbar)
 
-        async with aiohttp.ClientSession() as cs:
-            async with cs.get("https://nekobot.xyz/api/imagegen?type=ship&user1=%s&user2=%s" % (user1url, user2url,)) as r:
-                res = await r.json()
+        res = await self.bot.http_client.get_json("https://nekobot.xyz/api/imagegen?type=ship&user1=%s&user2=%s" % (user1url, user2url,))
 
         em = discord.Embed(color=0xDEADBF)
         em.title = "%s ❤ %s" % (user1.name, user2.name,)
@@ -375,9 +313,7 @@ class Fun:
 
         await ctx.trigger_typing()
         try:
-            async with aiohttp.ClientSession() as cs:
-                async with cs.get("https://www.reddit.com/r/copypasta/hot.json?sort=hot") as r:
-                    res = await r.json()
+            res = await self.bot.http_client.get_json("https://www.reddit.com/r/copypasta/hot.json?sort=hot")
 
             data = random.choice(res["data"]["children"])["data"]
             em = discord.Embed(color=0xDEADBF, title=data["title"], description=data["selftext"], url=data["url"])
@@ -393,9 +329,7 @@ class Fun:
         """Captcha a User OWO"""
         await ctx.trigger_typing()
         url = user.avatar_url_as(format="png")
-        async with aiohttp.ClientSession() as cs:
-            async with cs.get("https://nekobot.xyz/api/imagegen?type=captcha&url=%s&username=%s" % (url, user.name,)) as r:
-                res = await r.json()
+        res = await self.bot.http_client.get_json("https://nekobot.xyz/api/imagegen?type=captcha&url=%s&username=%s" % (url, user.name,))
         await ctx.send(embed=self.__embed_json(res))
 
     @commands.command()
@@ -408,9 +342,7 @@ class Fun:
         user1url = user1.avatar_url
         user2url = user2.avatar_url
 
-        async with aiohttp.ClientSession() as cs:
-            async with cs.get("https://nekobot.xyz/api/imagegen?type=whowouldwin&user1=%s&user2=%s" % (user1url, user2url,)) as r:
-                res = await r.json()
+        res = await self.bot.http_client.get_json("https://nekobot.xyz/api/imagegen?type=whowouldwin&user1=%s&user2=%s" % (user1url, user2url,))
 
         await ctx.send(embed=self.__embed_json(res))
 
@@ -422,9 +354,7 @@ class Fun:
         if not isinstance(img, str):
             return img
 
-        async with aiohttp.ClientSession() as cs:
-            async with cs.get("https://nekobot.xyz/api/imagegen?type=awooify&url=%s" % img) as r:
-                res = await r.json()
+        res = await self.bot.http_client.get_json("https://nekobot.xyz/api/imagegen?type=awooify&url=%s" % img)
 
         await ctx.send(embed=self.__embed_json(res))
 
@@ -432,9 +362,7 @@ class Fun:
     @commands.cooldown(1, 10, commands.BucketType.user)
     async def changemymind(self, ctx, *, text: str):
         await ctx.trigger_typing()
-        async with aiohttp.ClientSession() as cs:
-            async with cs.get("https://nekobot.xyz/api/imagegen?type=changemymind&text=%s" % text) as r:
-                res = await r.json()
+        res = await self.bot.http_client.get_json("https://nekobot.xyz/api/imagegen?type=changemymind&text=%s" % text)
 
         await ctx.send(embed=self.__embed_json(res))
 
@@ -446,9 +374,7 @@ class Fun:
         if not isinstance(img, str):
             return img
 
-        async with aiohttp.ClientSession() as cs:
-            async with cs.get("https://nekobot.xyz/api/imagegen?type=magik&image=%s" % img) as r:
-                res = await r.json()
+        res = await self.bot.http_client.get_json("https://nekobot.xyz/api/imagegen?type=magik&image=%s" % img)
 
         await ctx.send(embed=self.__embed_json(res))
 
@@ -459,9 +385,7 @@ class Fun:
         sub = ["dankmemes", "animemes"]  # Add more?
         url = f'https://api.imgur.com/3/gallery/r/{random.choice(sub)}/hot/{random.randint(1, 5)}'
         headers = {"Authorization": f"Client-ID {config.imgur}"}
-        async with aiohttp.ClientSession() as cs:
-            async with cs.get(url, headers=headers) as r:
-                res = await r.json()
+        res = await self.bot.http_client.get_json(url, headers=headers)
         if res["status"] == 429:
             return await ctx.send("**Ratelimited, try again later.**")
         js = random.choice(res['data'])
@@ -497,9 +421,7 @@ class Fun:
         if not isinstance(img, str):
             return img
 
-        async with aiohttp.ClientSession() as cs:
-            async with cs.get("https://nekobot.xyz/api/imagegen?type=jpeg&url=%s" % img) as r:
-                res = await r.json()
+        res = await self.bot.http_client.get_json("https://nekobot.xyz/api/imagegen?type=jpeg&url=%s" % img)
 
         await ctx.send(embed=self.__embed_json(res))
 
@@ -511,33 +433,27 @@ class Fun:
         url = ("http://api.giphy.com/v1/gifs/search?&api_key={}&q={}&rating=g"
                "".format(config.giphy_key, keywords))
 
-        async with aiohttp.ClientSession() as cs:
-            async with cs.get(url) as r:
-                res = await r.json()
-                if res["data"]:
-                    await ctx.send(res["data"][0]["url"])
-                else:
-                    await ctx.send("No results found.")
+        res = await self.bot.http_client.get_json(url)
+        if res["data"]:
+            await ctx.send(res["data"][0]["url"])
+        else:
+            await ctx.send("No results found.")
 
     @commands.command()
     @commands.cooldown(1, 5, commands.BucketType.user)
     async def cat(self, ctx):
-        async with aiohttp.ClientSession(headers=auth) as cs:
-            async with cs.get('https://api.weeb.sh/images/random?type=animal_cat') as r:
-                res = await r.json()
-                em = discord.Embed(color=0xDEADBF)
-                em.set_image(url=res['url'])
-                await ctx.send(embed=em)
+        res = await self.bot.http_client.get_json('https://api.weeb.sh/images/random?type=animal_cat', headers=auth)
+        em = discord.Embed(color=0xDEADBF)
+        em.set_image(url=res['url'])
+        await ctx.send(embed=em)
 
     @commands.command()
     @commands.cooldown(1, 5, commands.BucketType.user)
     async def dog(self, ctx):
-        async with aiohttp.ClientSession(headers=auth) as cs:
-            async with cs.get('https://api.weeb.sh/images/random?type=animal_dog') as r:
-                res = await r.json()
-                em = discord.Embed(color=0xDEADBF)
-                em.set_image(url=res['url'])
-                await ctx.send(embed=em)
+        res = await self.bot.http_client.get_json('https://api.weeb.sh/images/random?type=animal_dog', headers=auth)
+        em = discord.Embed(color=0xDEADBF)
+        em.set_image(url=res['url'])
+        await ctx.send(embed=em)
 
     @commands.command()
     @commands.cooldown(1, 5, commands.BucketType.user)
@@ -547,9 +463,7 @@ class Fun:
         if not isinstance(img, str):
             return img
         await ctx.trigger_typing()
-        async with aiohttp.ClientSession() as cs:
-            async with cs.get(f"https://nekobot.xyz/api/imagegen?type=iphonex&url={img}") as r:
-                res = await r.json()
+        res = await self.bot.http_client.get_json(f"https://nekobot.xyz/api/imagegen?type=iphonex&url={img}")
         await ctx.send(embed=self.__embed_json(res))
 
     @commands.command()
@@ -558,9 +472,7 @@ class Fun:
         """Generate Kanna"""
         await ctx.trigger_typing()
         url = f"https://nekobot.xyz/api/imagegen?type=kannagen&text={text}"
-        async with aiohttp.ClientSession() as cs:
-            async with cs.get(url) as r:
-                res = await r.json()
+        res = await self.bot.http_client.get_json(url)
 
         await ctx.send(embed=self.__embed_json(res))
 
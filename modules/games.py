@@ -1,5 +1,5 @@
 from discord.ext import commands
-import discord, config, aiohttp
+import discord, config
 import base64, json
 import os
 
@@ -15,9 +15,7 @@ class Games:
         try:
             await ctx.trigger_typing()
             url = "https://osu.ppy.sh/api/get_user?k=%s&u=%s" % (config.osu_key, username,)
-            async with aiohttp.ClientSession() as cs:
-                async with cs.get(url) as r:
-                    data = await r.json()
+            data = await self.bot.http_client.get_json(url)
             if data == []:
                 return await ctx.send("User not found.")
 
@@ -71,22 +69,20 @@ class Games:
             base = f"https://api.playbattlegrounds.com/shards/pc-{region}"
             headers = {"Authorization": f"Bearer {config.pubg}",
                        "Accept": "application/vnd.api+json"}
-            async with aiohttp.ClientSession() as cs:
-                async with cs.get(f"{base}/players?filter[playerNames]={username}", headers=headers) as r:
-                    res = await r.read()
-                    if r.status == 404:
-                        em = discord.Embed(color=0xDEADBF, title="Error", description="User not found.")
-                        return await ctx.send(embed=em)
-                res = json.loads(res)
-                lastmatch = res["data"][0]["relationships"]["matches"]["data"][0]["id"]
-                if not os.path.exists(f"data/pubg-cache/{lastmatch}.json"):
-                    async with cs.get(f"{base}/matches/{lastmatch}", headers=headers) as m:
-                        matchdata = await m.read()
-                        matchdata = json.loads(matchdata)
-                        with open(f"data/pubg-cache/{lastmatch}.json", "w") as outfile:
-                            json.dump(matchdata, outfile)
-                else:
-                    matchdata = json.load(open(f"data/pubg-cache/{lastmatch}.json"))
+            res = await self.bot.http_client.request("GET", f"{base}/players?filter[playerNames]={username}",
+                                                     headers=headers, read="response")
+            if res.status == 404:
+                em = discord.Embed(color=0xDEADBF, title="Error", description="User not found.")
+                return await ctx.send(embed=em)
+            res = json.loads(res.body)
+            lastmatch = res["data"][0]["relationships"]["matches"]["data"][0]["id"]
+            if not os.path.exists(f"data/pubg-cache/{lastmatch}.json"):
+                matchdata = await self.bot.http_client.get_bytes(f"{base}/matches/{lastmatch}", headers=headers)
+                matchdata = json.loads(matchdata)
+                with open(f"data/pubg-cache/{lastmatch}.json", "w") as outfile:
+                    json.dump(matchdata, outfile)
+            else:
+                matchdata = json.load(open(f"data/pubg-cache/{lastmatch}.json"))
             for player in matchdata["included"]:
                 if player["type"] == "participant":
                     if player["attributes"]["stats"]["playerId"] == res["data"][0]["id"]:
@@ -115,13 +111,9 @@ class Games:
     @commands.cooldown(1, 25, commands.BucketType.user)
     async def minecraft(self, ctx, username:str):
         try:
-            async with aiohttp.ClientSession() as cs:
-                async with cs.get(f"https://api.mojang.com/users/profiles/minecraft/{username}") as r:
-                    res = await r.json()
+            res = await self.bot.http_client.get_json(f"https://api.mojang.com/users/profiles/minecraft/{username}")
             user_id = res['id']
-            async with aiohttp.ClientSession() as cs:
-                async with cs.get(f"https://sessionserver.mojang.com/session/minecraft/profile/{user_id}") as r:
-                    res = await r.json()
+            res = await self.bot.http_client.get_json(f"https://sessionserver.mojang.com/session/minecraft/profile/{user_id}")
             data = base64.b64decode(res['properties'][0]['value'])
             data = json.loads(data)
             skin = data['textures']['SKIN']['url']
@@ -1,22 +1,19 @@
 from discord.ext import commands
 import discord
-import datetime, random, config, math, aiohttp, psutil
+import datetime, random, config, math, psutil
 from collections import Counter
 from .utils.chat_formatting import pagify
 from urllib.parse import quote_plus
-import string, ujson
+import string
 from .utils.paginator import EmbedPages, Pages, HelpPaginator
-from scipy import stats
-import numpy
-from colorthief import ColorThief
 from io import BytesIO
-from .utils import instance_tools
-import qrcode, os, uuid
+from .utils import instance_tools, activity
+from .utils.ledger import LedgerError
+from .utils.i18n import catalog, LANGUAGES
+import os, uuid
 import logging
 import base64
-from PIL import Image
 import rethinkdb as r
-import magic as pymagic
 
 log = logging.getLogger()
 
@@ -49,16 +46,6 @@ def millify(n):
 
     return '{:.0f}{}'.format(n / 10 ** (3 * millidx), millnames[millidx])
 
-# Languages
-languages = ["english", "weeb", "tsundere", "polish", "spanish", "french"]
-lang = {}
-
-for l in languages:
-    with open("lang/%s.json" % l, encoding="utf-8") as f:
-        lang[l] = ujson.load(f)
-
-def getlang(la:str):
-    return lang.get(la, None)
 
 class General:
     """General Commands"""
@@ -95,34 +82,27 @@ class General:
 
             img = x.attachments[0].url
 
-        async with aiohttp.ClientSession() as cs:
-            async with cs.get(img) as r:
-                res = await r.read()
+        res = await self.bot.http_client.get_bytes(img)
 
+        import magic as pymagic
         magic = pymagic.Magic(mime=True)
         filetype = magic.from_buffer(res)
 
         if not filetype.startswith("image/"):
             return await ctx.send("Not a valid image.")
 
-        with Image.open(BytesIO(res)) as img:
-            img.convert("RGB")
-            img.seek(0)
-            img.resize((512, 288))
-            i = BytesIO()
-            img.save(i, format="PNG")
-            i.seek(0)
+        i = BytesIO(await self.bot.render.render("first_frame", res))
 
         try:
             await ctx.trigger_typing()
-            async with aiohttp.ClientSession() as cs:
-                async with cs.post("https://whatanime.ga/api/search?token=%s" % config.whatanime,
-                                   data={"image": str(base64.b64encode(i.read()).decode("utf8"))},
-                                   headers={"Content-Type": "application/x-www-form-urlencoded"}) as r:
-                    try:
-                        res = await r.json()
-                    except:
-                        return await ctx.send("File too large.")
+            resp = await self.bot.http_client.request("POST", "https://whatanime.ga/api/search?token=%s" % config.whatanime,
+                                                      data={"image": str(base64.b64encode(i.read()).decode("utf8"))},
+                                                      headers={"Content-Type": "application/x-www-form-urlencoded"},
+                                                      read="response")
+            try:
+                res = resp.json()
+            except ValueError:
+                return await ctx.send("File too large.")
 
             if res["docs"] == []:
                 return await ctx.send("Nothing found.")
@@ -146,9 +126,7 @@ class General:
                           f"&file={doc['filename']}" \
                           f"&t={doc['at']}" \
                           f"&token={doc['tokenthumb']}"
-                async with aiohttp.ClientSession() as cs:
-                    async with cs.get(preview) as r:
-                        res = await r.read()
+                res = await self.bot.http_client.get_bytes(preview)
                 filetype = magic.from_buffer(res).rpartition("/")[2]
                 file = discord.File(res, filename="file.%s" % filetype)
                 em.set_image(url="attachment://file.%s" % filetype)
@@ -176,8 +154,8 @@ class General:
                                            "`spanish` - ΛTLΛS Dinoseto & Luketten\n"
                                            "`french` - ShiroNeko#7379 & Anderson")
             return await ctx.send(embed=em)
-        if lang.lower() in languages:
-            await self.bot.redis.set(f"{ctx.message.author.id}-lang", lang.lower())
+        if lang.lower() in LANGUAGES:
+            await self.bot.prefs.set(ctx.message.author.id, "lang", lang.lower())
             await ctx.send(f"Set language to {lang.title()}!")
         else:
             await ctx.send("Invalid language.")
@@ -191,12 +169,8 @@ class General:
     @commands.command(pass_context=True)
     async def cookie(self, ctx, user: discord.Member):
         """Give somebody a cookie :3"""
-        lang = await self.bot.redis.get(f"{ctx.message.author.id}-lang")
-        if lang:
-            lang = lang.decode('utf8')
-        else:
-            lang = "english"
-        await ctx.send(getlang(lang)["general"]["cookie"].format(ctx.message.author.name, user.mention))
+        lang = await self.bot.prefs.get_lang(ctx.message.author.id)
+        await ctx.send(catalog.format(lang, "general.cookie", ctx.message.author.name, user.mention))
 
     @commands.command()
     @commands.cooldown(1, 3, commands.BucketType.user)
@@ -235,17 +209,14 @@ class General:
         await ctx.trigger_typing()
 
         i = instance_tools.InstanceTools(self.bot.instances, self.bot.redis)
-        servers = await i.get_all_guilds()
-        members = await i.get_all_users()
-        channels = await i.get_all_channels()
-        messages = await i.get_all_messages()
-        command_count = await i.get_all_commands()
-
-        lang = await self.bot.redis.get(f"{ctx.message.author.id}-lang")
-        if lang:
-            lang = lang.decode('utf8')
-        else:
-            lang = "english"
+        stats = await i.get_all_stats()
+        servers = stats["guilds"]
+        members = stats["users"]
+        channels = stats["channels"]
+        messages = stats["messages"]
+        command_count = stats["commands"]
+
+        lang = await self.bot.prefs.get_lang(ctx.message.author.id)
 
         if isinstance(ctx.channel, discord.TextChannel):
             thisShard = ctx.guild.shard_id
@@ -253,8 +224,8 @@ class General:
             thisShard = 0
 
         info = discord.Embed(color=0xDEADBF,
-                             title=getlang(lang)["general"]["info"]["info"],
-                             description=getlang(lang)["general"]["info"]["stats"].format(millify(servers),
+                             title=catalog.get(lang, "general.info.info"),
+                             description=catalog.format(lang, "general.info.stats", millify(servers),
                                                                                           servers,
                                                                                           millify(members),
                                                                                           str(len(self.bot.commands)),
@@ -268,8 +239,8 @@ class General:
                                                                                           str(self.bot.command_usage.most_common(1)[0][0]),
                                                                                           command_count,
                                                                                           thisShard))
-        info.add_field(name=getlang(lang)["general"]["info"]["links"]["name"],
-                       value=getlang(lang)["general"]["info"]["links"]["links"])
+        info.add_field(name=catalog.get(lang, "general.info.links.name"),
+                       value=catalog.get(lang, "general.info.links.links"))
         info.set_thumbnail(url=self.bot.user.avatar_url_as(format='png'))
         await ctx.send(embed=info)
 
@@ -284,6 +255,126 @@ class General:
                            description=f'{total} socket events observed ({cpm:.2f}/minute):\n{self.bot.socket_stats}')
         await ctx.send(embed=em)
 
+    @commands.command(hidden=True)
+    @commands.is_owner()
+    async def httpstats(self, ctx):
+        """Shared HTTP pool stats"""
+        stats = self.bot.http_client.stats()
+        em = discord.Embed(color=0xDEADBF, title="HTTP Pool Stats",
+                           description=f"**{stats['active']}** active, **{stats['idle']}** idle connections\n"
+                                       f"**{stats['requests']}** requests, **{stats['errors']}** errors\n"
+                                       f"Reuse ratio: **{stats['reuse_ratio'] * 100:.1f}%** "
+                                       f"({stats['connections_reused']} reused / {stats['connections_created']} created)\n"
+                                       f"DNS cache: **{stats['dns_hits']}** hits, **{stats['dns_misses']}** misses")
+        hosts = sorted(stats["hosts"].items(), key=lambda x: x[1]["count"], reverse=True)[:10]
+        for host, host_stats in hosts:
+            em.add_field(name=host,
+                         value=f"{host_stats['count']} reqs\navg {host_stats['avg']}ms\n"
+                               f"p50 {host_stats['p50']}ms / p95 {host_stats['p95']}ms")
+        await ctx.send(embed=em)
+
+    @commands.command(hidden=True)
+    @commands.is_owner()
+    async def upstreams(self, ctx):
+        """Upstream API health"""
+        stats = self.bot.http_client.upstream_stats()
+        em = discord.Embed(color=0xDEADBF, title="Upstream Health")
+        for host, host_stats in sorted(stats.items(), key=lambda x: x[1]["ok"] + x[1]["failed"], reverse=True)[:24]:
+            state = host_stats["state"]
+            if state != "closed":
+                state += " (%ss)" % host_stats["retry_in"]
+            em.add_field(name=host,
+                         value=f"**{state}**\n{host_stats['ok']} ok / {host_stats['failed']} failed\n"
+                               f"{host_stats['rejected']} rejected, {host_stats['limited']} limited, "
+                               f"{host_stats['hedged']} hedged\n"
+                               f"p50 {host_stats['p50']}ms / p95 {host_stats['p95']}ms\n"
+                               f"timeout {host_stats['timeout']}s")
+        await ctx.send(embed=em)
+
+    @commands.command(hidden=True)
+    @commands.is_owner()
+    async def cmdstats(self, ctx, minutes: int = 5):
+        """Command latency across all instances"""
+        minutes = max(1, min(minutes, 120))
+        rows = await self.bot.latency.summary(minutes)
+        em = discord.Embed(color=0xDEADBF, title="Command Latency",
+                           description=f"Last **{minutes}** minutes, slowest p95 first")
+        for row in rows[:24]:
+            em.add_field(name=row["command"],
+                         value=f"{row['count']} runs\n{row['ok']} ok / {row['err']} err / {row['rejected']} rejected\n"
+                               f"p50 {row['p50']}ms / p95 {row['p95']}ms\np99 {row['p99']}ms")
+        await ctx.send(embed=em)
+
+    @commands.command(hidden=True)
+    @commands.is_owner()
+    async def looplag(self, ctx, stack: str = None):
+        """Event loop lag and what blocked it"""
+        report = self.bot.looplag.report()
+        if stack is not None:
+            offender = next((x for x in report["offenders"] if x["name"] == stack), None)
+            if offender is None:
+                return await ctx.send("No stalls recorded for that.")
+            return await ctx.send("```\n%s\n```" % offender["stack"][-1900:])
+        em = discord.Embed(color=0xDEADBF, title="Event Loop Lag",
+                           description=f"p50 **{report['p50']}ms**, p99 **{report['p99']}ms**, max **{report['max']}ms**")
+        for offender in report["offenders"]:
+            em.add_field(name=offender["name"],
+                         value=f"{offender['stalls']} stalls\n{offender['blocked']}s blocked")
+        await ctx.send(embed=em)
+
+    @commands.command(hidden=True)
+    @commands.is_owner()
+    async def memory(self, ctx):
+        """Cache memory breakdown"""
+        await ctx.trigger_typing()
+        data = self.bot.memory.snapshot()
+        em = discord.Embed(color=0xDEADBF, title="Memory",
+                           description=f"RSS **{data['rss'] >> 20}MB**" + (", slim cache" if self.bot.slim else ""))
+        for name, estimated in data["estimated"].items():
+            em.add_field(name=name.title(), value=f"{estimated['count']} cached\n~{estimated['bytes'] >> 10}KB")
+        shards = "\n".join("%s: %s guilds, %s members, %s channels, %s messages" % (
+            shard, x.get("guilds", 0), x.get("members", 0), x.get("channels", 0), x.get("messages", 0))
+                           for shard, x in sorted(data["shards"].items()))
+        em.add_field(name="Shards", value=shards[:1024] or "None", inline=False)
+        if data["allocations"]:
+            em.add_field(name="Top allocations", inline=False,
+                         value="\n".join("%s %+dKB" % (x["where"][-40:], x["diff"] >> 10)
+                                         for x in data["allocations"])[:1024])
+        await ctx.send(embed=em)
+
+    @commands.command(hidden=True)
+    @commands.is_owner()
+    async def startup(self, ctx):
+        """Startup timings"""
+        for page in pagify(self.bot.startup.report(), shorten_by=12):
+            await ctx.send("```\n%s\n```" % page)
+
+    @commands.command(hidden=True)
+    @commands.is_owner()
+    async def prefstats(self, ctx):
+        """Preference cache stats"""
+        stats = self.bot.prefs.stats()
+        em = discord.Embed(color=0xDEADBF, title="Preference Cache Stats",
+                           description=f"**{stats['size']}** cached entries\n"
+                                       f"**{stats['hits']}** hits, **{stats['misses']}** misses "
+                                       f"({stats['hit_ratio'] * 100:.1f}% hit ratio)\n"
+                                       f"**{stats['evictions']}** evicted, **{stats['expired']}** expired, "
+                                       f"**{stats['invalidations']}** invalidated")
+        await ctx.send(embed=em)
+
+    @commands.command(hidden=True)
+    @commands.is_owner()
+    async def renderstats(self, ctx):
+        """Render pool stats"""
+        stats = self.bot.render.stats()
+        em = discord.Embed(color=0xDEADBF, title="Render Pool Stats",
+                           description=f"**{stats['workers']}** workers, **{stats['running']}** running, "
+                                       f"**{stats['queued']}** queued\n"
+                                       f"**{stats['timeouts']}** timeouts, **{stats['errors']}** errors")
+        for job, job_stats in sorted(stats["jobs"].items()):
+            em.add_field(name=job, value=f"{job_stats['count']} jobs\navg {job_stats['avg']}ms")
+        await ctx.send(embed=em)
+
     @commands.command(aliases=["emojiinfo", "emote", "emoji"])
     @commands.cooldown(1, 3, commands.BucketType.user)
     async def emoteinfo(self, ctx, emote:discord.Emoji):
@@ -301,11 +392,7 @@ class General:
     @commands.guild_only()
     async def userinfo(self, ctx, user: discord.Member = None):
         """Get a users info."""
-        lang = await self.bot.redis.get(f"{ctx.message.author.id}-lang")
-        if lang:
-            lang = lang.decode('utf8')
-        else:
-            lang = "english"
+        lang = await self.bot.prefs.get_lang(ctx.message.author.id)
 
         if user == None:
             user = ctx.message.author
@@ -317,15 +404,15 @@ class General:
         embed = discord.Embed(color=0xDEADBF)
         embed.set_author(name=user.name,
                          icon_url=user.avatar_url)
-        embed.add_field(name=getlang(lang)["general"]["userinfo"]["id"], value=user.id)
-        embed.add_field(name=getlang(lang)["general"]["userinfo"]["discrim"], value=user.discriminator)
-        embed.add_field(name=getlang(lang)["general"]["userinfo"]["bot"], value=str(user.bot))
-        embed.add_field(name=getlang(lang)["general"]["userinfo"]["created"], value=user.created_at.strftime("%d %b %Y %H:%M"))
-        embed.add_field(name=getlang(lang)["general"]["userinfo"]["joined"], value=user.joined_at.strftime("%d %b %Y %H:%M"))
-        embed.add_field(name=getlang(lang)["general"]["userinfo"]["animated_avatar"], value=str(user.is_avatar_animated()))
-        embed.add_field(name=getlang(lang)["general"]["userinfo"]["playing"], value=playinggame)
-        embed.add_field(name=getlang(lang)["general"]["userinfo"]["status"], value=user.status)
-        embed.add_field(name=getlang(lang)["general"]["userinfo"]["color"], value=user.color)
+        embed.add_field(name=catalog.get(lang, "general.userinfo.id"), value=user.id)
+        embed.add_field(name=catalog.get(lang, "general.userinfo.discrim"), value=user.discriminator)
+        embed.add_field(name=catalog.get(lang, "general.userinfo.bot"), value=str(user.bot))
+        embed.add_field(name=catalog.get(lang, "general.userinfo.created"), value=user.created_at.strftime("%d %b %Y %H:%M"))
+        embed.add_field(name=catalog.get(lang, "general.userinfo.joined"), value=user.joined_at.strftime("%d %b %Y %H:%M"))
+        embed.add_field(name=catalog.get(lang, "general.userinfo.animated_avatar"), value=str(user.is_avatar_animated()))
+        embed.add_field(name=catalog.get(lang, "general.userinfo.playing"), value=playinggame)
+        embed.add_field(name=catalog.get(lang, "general.userinfo.status"), value=user.status)
+        embed.add_field(name=catalog.get(lang, "general.userinfo.color"), value=user.color)
 
         try:
             roles = [x.name for x in user.roles if x.name != "@everyone"]
@@ -346,11 +433,7 @@ class General:
     @commands.guild_only()
     async def serverinfo(self, ctx):
         """Display Server Info"""
-        lang = await self.bot.redis.get(f"{ctx.message.author.id}-lang")
-        if lang:
-            lang = lang.decode('utf8')
-        else:
-            lang = "english"
+        lang = await self.bot.prefs.get_lang(ctx.message.author.id)
 
         server = ctx.message.guild
 
@@ -361,18 +444,18 @@ class General:
                       m.status == discord.Status.idle])
 
         embed = discord.Embed(color=0xDEADBF)
-        embed.add_field(name=getlang(lang)["general"]["serverinfo"]["name"], value=f"**{server.name}**\n({server.id})")
-        embed.add_field(name=getlang(lang)["general"]["serverinfo"]["owner"], value=server.owner)
-        embed.add_field(name=getlang(lang)["general"]["serverinfo"]["online"], value=f"**{online}/{len(server.members)}**")
-        embed.add_field(name=getlang(lang)["general"]["serverinfo"]["created_at"], value=server.created_at.strftime("%d %b %Y %H:%M"))
-        embed.add_field(name=getlang(lang)["general"]["serverinfo"]["channels"], value=f"Text Channels: **{len(server.text_channels)}**\n"
+        embed.add_field(name=catalog.get(lang, "general.serverinfo.name"), value=f"**{server.name}**\n({server.id})")
+        embed.add_field(name=catalog.get(lang, "general.serverinfo.owner"), value=server.owner)
+        embed.add_field(name=catalog.get(lang, "general.serverinfo.online"), value=f"**{online}/{len(server.members)}**")
+        embed.add_field(name=catalog.get(lang, "general.serverinfo.created_at"), value=server.created_at.strftime("%d %b %Y %H:%M"))
+        embed.add_field(name=catalog.get(lang, "general.serverinfo.channels"), value=f"Text Channels: **{len(server.text_channels)}**\n"
                                                f"Voice Channels: **{len(server.voice_channels)}**\n"
                                                f"Categories: **{len(server.categories)}**\n"
                                                f"AFK Channel: **{server.afk_channel}**")
-        embed.add_field(name=getlang(lang)["general"]["serverinfo"]["roles"], value=len(server.roles))
-        embed.add_field(name=getlang(lang)["general"]["serverinfo"]["emojis"], value=f"{len(server.emojis)}/100")
-        embed.add_field(name=getlang(lang)["general"]["serverinfo"]["region"], value=str(server.region).title())
-        embed.add_field(name=getlang(lang)["general"]["serverinfo"]["security"], value=f"Verification Level: **{verif}**\n"
+        embed.add_field(name=catalog.get(lang, "general.serverinfo.roles"), value=len(server.roles))
+        embed.add_field(name=catalog.get(lang, "general.serverinfo.emojis"), value=f"{len(server.emojis)}/100")
+        embed.add_field(name=catalog.get(lang, "general.serverinfo.region"), value=str(server.region).title())
+        embed.add_field(name=catalog.get(lang, "general.serverinfo.security"), value=f"Verification Level: **{verif}**\n"
                                                f"Content Filter: **{server.explicit_content_filter}**")
 
         try:
@@ -386,26 +469,22 @@ class General:
     @commands.guild_only()
     async def channelinfo(self, ctx, channel: discord.TextChannel = None):
         """Get Channel Info"""
-        lang = await self.bot.redis.get(f"{ctx.message.author.id}-lang")
-        if lang:
-            lang = lang.decode('utf8')
-        else:
-            lang = "english"
+        lang = await self.bot.prefs.get_lang(ctx.message.author.id)
 
         if channel is None:
             channel = ctx.message.channel
 
         embed = discord.Embed(color=0xDEADBF,
                               description=channel.mention)
-        embed.add_field(name=getlang(lang)["general"]["channelinfo"]["name"], value=channel.name)
-        embed.add_field(name=getlang(lang)["general"]["channelinfo"]["guild"], value=channel.guild)
-        embed.add_field(name=getlang(lang)["general"]["channelinfo"]["id"], value=channel.id)
-        embed.add_field(name=getlang(lang)["general"]["channelinfo"]["category_id"], value=channel.category_id)
-        embed.add_field(name=getlang(lang)["general"]["channelinfo"]["position"], value=channel.position)
-        embed.add_field(name=getlang(lang)["general"]["channelinfo"]["nsfw"], value=str(channel.is_nsfw()))
-        embed.add_field(name=getlang(lang)["general"]["channelinfo"]["members"], value=len(channel.members))
-        embed.add_field(name=getlang(lang)["general"]["channelinfo"]["category"], value=channel.category)
-        embed.add_field(name=getlang(lang)["general"]["channelinfo"]["created_at"], value=channel.created_at.strftime("%d %b %Y %H:%M"))
+        embed.add_field(name=catalog.get(lang, "general.channelinfo.name"), value=channel.name)
+        embed.add_field(name=catalog.get(lang, "general.channelinfo.guild"), value=channel.guild)
+        embed.add_field(name=catalog.get(lang, "general.channelinfo.id"), value=channel.id)
+        embed.add_field(name=catalog.get(lang, "general.channelinfo.category_id"), value=channel.category_id)
+        embed.add_field(name=catalog.get(lang, "general.channelinfo.position"), value=channel.position)
+        embed.add_field(name=catalog.get(lang, "general.channelinfo.nsfw"), value=str(channel.is_nsfw()))
+        embed.add_field(name=catalog.get(lang, "general.channelinfo.members"), value=len(channel.members))
+        embed.add_field(name=catalog.get(lang, "general.channelinfo.category"), value=channel.category)
+        embed.add_field(name=catalog.get(lang, "general.channelinfo.created_at"), value=channel.created_at.strftime("%d %b %Y %H:%M"))
 
         await ctx.send(embed=embed)
 
@@ -435,9 +514,7 @@ class General:
         search_terms = "+".join([encode(s) for s in search_terms])
         url = "http://api.urbandictionary.com/v0/define?term=" + search_terms
         try:
-            async with aiohttp.ClientSession() as cs:
-                async with cs.get(url) as r:
-                    result = await r.json()
+            result = await self.bot.http_client.get_json(url)
             if result["list"]:
                 definition = result['list'][pos]['definition']
                 example = result['list'][pos]['example']
@@ -464,12 +541,9 @@ class General:
 
         await ctx.trigger_typing()
 
-        async with aiohttp.ClientSession() as cs:
-            async with cs.get(ctx.message.attachments[0].url) as r:
-                res = await r.read()
+        res = await self.bot.http_client.get_bytes(ctx.message.attachments[0].url)
 
-        color_thief = ColorThief(BytesIO(res))
-        rgb = color_thief.get_color()
+        rgb = await self.bot.render.render("dominant_color", res)
         hexx = int(triplet(rgb), 16)
 
         em = discord.Embed(color=hexx)
@@ -487,11 +561,8 @@ class General:
         await ctx.channel.trigger_typing()
         if user is None:
             user = ctx.message.author
-        async with aiohttp.ClientSession() as cs:
-            async with cs.get(user.avatar_url_as(format='png')) as r:
-                res = await r.read()
-        color_thief = ColorThief(BytesIO(res))
-        hexx = int(triplet(color_thief.get_color()), 16)
+        hexx = await self.bot.colors.get(user.avatar_url_as(format='png', size=128),
+                                         key="avatar:%s" % (user.avatar or user.default_avatar.value))
         em = discord.Embed(color=hexx, title=f"{user.name}'s Avatar")
         if type is None or type not in ['jpeg', 'jpg', 'png']:
             await ctx.send(embed=em.set_image(url=user.avatar_url))
@@ -502,25 +573,16 @@ class General:
     @commands.cooldown(1, 5, commands.BucketType.user)
     async def coffee(self, ctx):
         """Coffee owo"""
-        lang = await self.bot.redis.get(f"{ctx.message.author.id}-lang")
-        if lang:
-            lang = lang.decode('utf8')
-        else:
-            lang = "english"
+        lang = await self.bot.prefs.get_lang(ctx.message.author.id)
 
         url = "https://coffee.alexflipnote.xyz/random.json"
         await ctx.channel.trigger_typing()
-        async with aiohttp.ClientSession() as cs:
-            async with cs.get(url) as r:
-                res = await r.json()
-            em = discord.Embed()
-            msg = await ctx.send(getlang(lang)["general"]["coffee"], embed=em.set_image(url=res['file']))
-            async with cs.get(res['file']) as r:
-                data = await r.read()
-            color_thief = ColorThief(BytesIO(data))
-            hexx = int(triplet(color_thief.get_color()), 16)
-            em = discord.Embed(color=hexx)
-            await msg.edit(embed=em.set_image(url=res['file']))
+        res = await self.bot.http_client.get_json(url)
+        em = discord.Embed()
+        msg = await ctx.send(catalog.get(lang, "general.coffee"), embed=em.set_image(url=res['file']))
+        hexx = await self.bot.colors.get(res['file'])
+        em = discord.Embed(color=hexx)
+        await msg.edit(embed=em.set_image(url=res['file']))
 
     # @commands.command()
     # @commands.cooldown(1, 5, commands.BucketType.user)
@@ -543,6 +605,8 @@ class General:
     @commands.cooldown(1, 5, commands.BucketType.user)
     async def qr(self, ctx, *, message: str):
         """Generate a QR Code"""
+        import qrcode
+
         name = str(uuid.uuid4())
         qrcode.make(message).save(f"{name}.png")
         await ctx.send(file=discord.File(f"{name}.png"))
@@ -550,13 +614,9 @@ class General:
 
     @commands.command()
     async def vote(self, ctx):
-        lang = await self.bot.redis.get(f"{ctx.message.author.id}-lang")
-        if lang:
-            lang = lang.decode('utf8')
-        else:
-            lang = "english"
+        lang = await self.bot.prefs.get_lang(ctx.message.author.id)
         embed = discord.Embed(color=0xDEADBF,
-                              title=getlang(lang)["general"]["voting_link"],
+                              title=catalog.get(lang, "general.voting_link"),
                               description="https://discordbots.org/bot/310039170792030211/vote")
         await ctx.send(embed=embed)
 
@@ -617,9 +677,7 @@ class General:
             bot_user = self.bot.user
         await ctx.trigger_typing()
         url = f"https://discordbots.org/api/bots/{bot_user.id}"
-        async with aiohttp.ClientSession() as cs:
-            async with cs.get(url) as r:
-                bot = await r.json()
+        bot = await self.bot.http_client.get_json(url)
         try:
             em = discord.Embed(color=0xDEADBF)
             em.title = bot['username'] + "#" + bot['discriminator']
@@ -641,6 +699,9 @@ class General:
     @commands.cooldown(1, 15, commands.BucketType.user)
     async def discriminfo(self, ctx):
         """Get some stats about the servers discrims"""
+        import numpy
+        from scipy import stats
+
         discrim_list = [int(u.discriminator) for u in ctx.guild.members]
 
         # The range is so we can get any discrims that no one has.
@@ -750,12 +811,10 @@ class General:
     @commands.is_owner()
     async def conf_add_balance(self, ctx, userid:int, amount:int):
         """Add balance to a user"""
-        if not await r.table("economy").get(str(userid)).run(self.bot.r_conn):
+        try:
+            newbalance = await self.bot.ledger.credit(userid, amount)
+        except LedgerError:
             return await ctx.send("This user has no account.")
-        u = await r.table("economy").get(str(userid)).run(self.bot.r_conn)
-        balance = u["balance"]
-        newbalance = balance + amount
-        await r.table("economy").get(str(userid)).update({"balance": newbalance}).run(self.bot.r_conn)
         await ctx.send("Updated balance, user now has `%s`" % newbalance)
 
     @config.command(name="createaccount", hidden=True)
@@ -768,7 +827,7 @@ class General:
             "id": str(userid),
             "balance": 0,
             "lastpayday": "0",
-            "bettimes": [],
+            "betactivity": activity.empty(),
             "frozen": False
         }
         await r.table("economy").insert(data).run(self.bot.r_conn)
@@ -778,9 +837,7 @@ class General:
     @commands.is_owner()
     async def conf_avatar(self, ctx, *, avatar_url: str):
         """Change bots avatar"""
-        async with aiohttp.ClientSession() as cs:
-            async with cs.get(avatar_url) as r:
-                res = await r.read()
+        res = await self.bot.http_client.get_bytes(avatar_url)
         await self.bot.user.edit(avatar=res)
         try:
             emoji = self.bot.get_emoji(408672929379909632)
@@ -810,12 +867,14 @@ class General:
         else:
             await r.table("levelSystem").get(str(userid)).update({"blacklisted": True}).run(self.bot.r_conn)
             await ctx.send("Added to blacklist")
+        self.bot.xp.invalidate(userid)
 
     @config.command(hidden=True, name="reset")
     @commands.is_owner()
     async def conf_reset(self, ctx, userid:int):
         """Reset user"""
-        await r.table("levelSystem").get(str(userid)).update({"xp": 0, "lastxptimes": [], "lastxp": "0"}).run(self.bot.r_conn)
+        self.bot.xp.invalidate(userid)
+        await r.table("levelSystem").get(str(userid)).update({"xp": 0, "xpactivity": activity.empty(), "lastxp": "0"}).run(self.bot.r_conn)
         await ctx.send("Reset user.")
 
     @config.command(hidden=True, name="freeze")
@@ -874,9 +933,7 @@ class General:
     async def shorten(self, ctx, *, url:str):
         """Shorten a URL"""
         url = f"https://api-ssl.bitly.com/v3/shorten?access_token={config.bitly}&longUrl={url}"
-        async with aiohttp.ClientSession() as cs:
-            async with cs.get(url) as r:
-                res = await r.json()
+        res = await self.bot.http_client.get_json(url)
         if res["status_code"] != 200:
             em = discord.Embed(color=0xDEADBF, title="Error",
                                description=f"Error: {res['status_txt']}\nMake sure the URL starts with http(s)://")
@@ -914,9 +971,8 @@ class General:
     @commands.cooldown(1, 3, commands.BucketType.user)
     async def prefix(self, ctx):
         """Get the bots current prefix."""
-        currprefix = await self.bot.redis.get(f"{ctx.author.id}-prefix")
+        currprefix = await self.bot.prefs.get_prefix(ctx.author.id)
         if currprefix:
-            currprefix = currprefix.decode("utf8")
             await ctx.send(f"Your custom prefix is set to `{currprefix}`")
         else:
             await ctx.send("My prefix is `n!` or `N!`")
@@ -927,14 +983,14 @@ class General:
         """Set your custom prefix, use quotation marks like "baka " for spaces."""
         if len(prefix) >= 12:
             return await ctx.send("Your prefix is over 12 characters.")
-        await self.bot.redis.set(f"{ctx.author.id}-prefix", prefix)
+        await self.bot.prefs.set(ctx.author.id, "prefix", prefix)
         await ctx.send(f"Set **your** custom prefix to `{prefix}`, you can remove it by pinging me and using delprefix.")
 
     @commands.command(aliases=["deleteprefix", "resetprefix"])
     @commands.cooldown(1, 3, commands.BucketType.user)
     async def delprefix(self, ctx):
         """Delete or reset your prefix"""
-        await self.bot.redis.delete(f"{ctx.author.id}-prefix")
+        await self.bot.prefs.delete(ctx.author.id, "prefix")
         await ctx.send("Deleted your prefix and reset it back to the default `n!`")
 
     @commands.command()
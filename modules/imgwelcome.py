@@ -1,16 +1,26 @@
 from discord.ext import commands
-from PIL import Image, ImageDraw, ImageFont, ImageOps
-import discord, os, aiohttp, string
+import discord, os, string
+import asyncio
+import logging
 from io import BytesIO
-import textwrap
 import rethinkdb as r
-import rethinkdb as rethonk
 import base64
+import config
+from .utils.joinqueue import JoinQueue
+
+log = logging.getLogger()
 
 class IMGWelcome:
 
     def __init__(self, bot):
         self.bot = bot
+        self.burst = getattr(config, "join_burst", 5)
+        self.joins = JoinQueue(bot.loop, self.__welcome,
+                               window=getattr(config, "join_window", 2),
+                               stale_after=getattr(config, "join_stale_after", 60))
+
+    def __unload(self):
+        self.joins.close()
 
     async def __is_enabled(self, guild:int):
         if await r.table("imgwelcome").get(str(guild)).run(self.bot.r_conn):
@@ -66,13 +76,10 @@ class IMGWelcome:
             if os.path.exists(f"data/imgwelcome/{ctx.guild.id}.png"):
                 os.remove(f"data/imgwelcome/{ctx.guild.id}.png")
             try:
-                async with aiohttp.ClientSession() as cs:
-                    async with cs.get(msg.attachments[0].url) as r:
-                        imgdata = await r.read()
-                img = Image.open(BytesIO(imgdata)).convert("RGBA").resize((500, 150))
-                bg = Image.new("RGBA", (500, 150), (0, 0, 0, 0))
-                bg.alpha_composite(img, (0, 0))
-                bg.save(f"data/imgwelcome/{ctx.guild.id}.png")
+                imgdata = await self.bot.http_client.get_bytes(msg.attachments[0].url)
+                background = await self.bot.render.render("welcome_background", imgdata)
+                with open(f"data/imgwelcome/{ctx.guild.id}.png", "wb") as f:
+                    f.write(background)
                 await ctx.send("Set image!")
             except Exception as e:
                 await ctx.send(f"Failed to set image... {e}")
@@ -115,118 +122,44 @@ class IMGWelcome:
     async def imggen(self, ctx, member: discord.Member = None):
         if member is None:
             member = ctx.message.author
-        await self.on_member_join(member)
+        await self.__welcome(member.guild, [member])
 
-    def _circle_border(self, circle_img_size: tuple):
-        border_size = []
-        for i in range(len(circle_img_size)):
-            border_size.append(circle_img_size[0] + 8)
-        return tuple(border_size)
+    def __content(self, data, guild, name: str):
+        return ((base64.b64decode(str(data["content"]).encode("utf8"))).decode("utf8")).replace("user", name.replace("@", "@\u200B")).replace("server", guild.name)
 
-    async def on_member_join(self, member):
-        guild = member.guild
-        if not await self.__is_enabled(guild.id):
+    async def __welcome(self, guild, members: list):
+        data = await r.table("imgwelcome").get(str(guild.id)).run(self.bot.r_conn)
+        if not data:
             return
 
-        data = await rethonk.table("imgwelcome").get(str(guild.id)).run(self.bot.r_conn)
-
         channel = self.bot.get_channel(int(data["channel"]))
         if not channel:
             return
+
+        if len(members) > self.burst:
+            # Join burst, one message for everyone instead of a render per member
+            names = ", ".join(m.name for m in members[:20])
+            if len(members) > 20:
+                names += " and %s others" % (len(members) - 20)
+            return await channel.send(self.__content(data, guild, names)[:2000])
+
         await channel.trigger_typing()
+        for member in members:
+            # One failed avatar or render shouldn't cost the rest of the batch their welcome
+            try:
+                imgdata = await self.bot.http_client.get_bytes(member.avatar_url_as(format="png"))
+                image = await self.bot.render.render("welcome", f"data/imgwelcome/{guild.id}.png", imgdata,
+                                                     str(member.name) + "#" + str(member.discriminator), guild.name)
+
+                file = discord.File(BytesIO(image), filename="welcome.png")
+                await channel.send(file=file, content=self.__content(data, guild, member.name))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.warning("Failed to welcome %s in %s: %s" % (member.id, guild.id, e))
 
-        if os.path.exists(f"data/imgwelcome/{guild.id}.png"):
-            background = Image.open(f"data/imgwelcome/{guild.id}.png").convert("RGBA")
-        else:
-            background = Image.open("data/imgwelcome/transparent.png")
-
-        async with aiohttp.ClientSession() as cs:
-            async with cs.get(member.avatar_url_as(format="png")) as r:
-                imgdata = await r.read()
-
-        welcome_picture = ImageOps.fit(background, (500, 150), centering=(0.5, 0.5))
-        welcome_picture.paste(background)
-        welcome_picture = welcome_picture.resize((500, 150), Image.NEAREST)
-
-        profile_area = Image.new("L", (512, 512), 0)
-        draw = ImageDraw.Draw(profile_area)
-        draw.ellipse(((0, 0), (512, 512)), fill=255)
-        profile_area = profile_area.resize((128, 128), Image.ANTIALIAS)
-        profile_picture = Image.open(BytesIO(imgdata))
-        profile_area_output = ImageOps.fit(profile_picture, (128, 128), centering=(0, 0))
-        profile_area_output.putalpha(profile_area)
-
-        mask = Image.new('L', (512, 512), 0)
-        draw_thumb = ImageDraw.Draw(mask)
-        draw_thumb.ellipse((0, 0) + (512, 512), fill=255, outline=0)
-        circle = Image.new("RGBA", (512, 512))
-        draw_circle = ImageDraw.Draw(circle)
-        draw_circle.ellipse([0, 0, 512, 512], fill=(255, 255, 255, 180), outline=(255, 255, 255, 250))
-        circle_border_size = self._circle_border((128, 128))
-        circle = circle.resize((circle_border_size), Image.ANTIALIAS)
-        circle_mask = mask.resize((circle_border_size), Image.ANTIALIAS)
-        circle_pos = (7 + int((136 - circle_border_size[0]) / 2))
-        border_pos = (11 + int((136 - circle_border_size[0]) / 2))
-        drawtwo = ImageDraw.Draw(welcome_picture)
-        welcome_picture.paste(circle, (circle_pos, circle_pos), circle_mask)
-        welcome_picture.paste(profile_area_output, (border_pos, border_pos), profile_area_output)
-
-        uname = (str(member.name) + "#" + str(member.discriminator))
-
-        def _outline(original_position: tuple, text: str, pixel_displacement: int, font, textoutline):
-            op = original_position
-            pd = pixel_displacement
-
-            left = (op[0] - pd, op[1])
-            right = (op[0] + pd, op[1])
-            up = (op[0], op[1] - pd)
-            down = (op[0], op[1] + pd)
-
-            drawtwo.text(left, text, font=font, fill=(textoutline))
-            drawtwo.text(right, text, font=font, fill=(textoutline))
-            drawtwo.text(up, text, font=font, fill=(textoutline))
-            drawtwo.text(down, text, font=font, fill=(textoutline))
-
-            drawtwo.text(op, text, font=font, fill=(textoutline))
-
-        welcome_font = ImageFont.truetype("data/fonts/UniSansHeavy.otf", 50)
-
-        _outline((150, 16), "Welcome", 1, welcome_font, (0, 0, 0, 255))
-        drawtwo.text((150, 16), "Welcome", font=welcome_font, fill=(255, 255, 255, 230))
-        name_font = ImageFont.truetype("data/fonts/UniSansHeavy.otf", 30)
-        name_font_medium = ImageFont.truetype("data/fonts/UniSansHeavy.otf", 22)
-        name_font_small = ImageFont.truetype("data/fonts/UniSansHeavy.otf", 18)
-        name_font_smallest = ImageFont.truetype("data/fonts/UniSansHeavy.otf", 12)
-        server_font = ImageFont.truetype("data/fonts/UniSansHeavy.otf", 22)
-
-        if len(uname) <= 17:
-            _outline((152, 63), uname, 1, name_font, (0, 0, 0, 255))
-            drawtwo.text((152, 63), uname, font=name_font, fill=(255, 255, 255, 230))
-
-        if len(uname) > 17:
-            if len(uname) <= 23:
-                _outline((152, 66), uname, 1, name_font_medium, (0, 0, 0, 255))
-                drawtwo.text((152, 66), uname, font=name_font_medium, fill=(255, 255, 255, 230))
-
-        if len(uname) >= 24:
-            if len(uname) <= 32:
-                _outline((152, 70), uname, 1, name_font_small, (0, 0, 0, 255))
-                drawtwo.text((152, 70), uname, font=name_font_small, fill=(255, 255, 255, 230))
-
-        if len(uname) >= 33:
-            drawtwo.text((152, 73), uname, 1, name_font_smallest, (0, 0, 0, 255))
-            drawtwo.text((152, 73), uname, font=name_font_smallest, fill=(255, 255, 255, 230))
-
-        server_text = "\n".join(textwrap.wrap(f"Welcome to {guild.name}!", 25))
-        _outline((152, 100), server_text, 1, server_font, (0, 0, 0, 255))
-        drawtwo.text((152, 100), server_text, font=server_font, fill=(255, 255, 255, 230))
-
-        welcome_picture.save("data/welcome.png")
-
-        content = ((base64.b64decode(str(data["content"]).encode("utf8"))).decode("utf8")).replace("user", member.name.replace("@", "@\u200B")).replace("server", guild.name)
-
-        file = discord.File("data/welcome.png", filename="welcome.png")
-        await channel.send(file=file, content=content)
+    async def on_member_join(self, member):
+        self.joins.push(member)
 
 def setup(bot):
-    bot.add_cog(IMGWelcome(bot))
\ No newline at end of file
+    bot.add_cog(IMGWelcome(bot))
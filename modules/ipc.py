@@ -1,80 +1,103 @@
-import asyncio, aiohttp
-import discord
+import asyncio
 from discord.ext import commands
 from hooks import ipc as ipchook
+from .utils.i18n import catalog
 
 class IPC:
 
     def __init__(self, bot):
         self.bot = bot
-        self.has_started = False
         self.webhook = ipchook
 
+        self.bot.bus.register("ping", self.__handle_ping)
+        self.bot.bus.register("reload", self.__handle_reload)
+        self.bot.bus.register("shutdown", self.__handle_shutdown)
+        self.bot.bus.register("stats", self.__handle_stats)
+        self.bot.bus.register("reloadlang", self.__handle_reloadlang)
+
+    def __unload(self):
+        for name in ("ping", "reload", "shutdown", "stats", "reloadlang"):
+            self.bot.bus.unregister(name)
+
     async def __post_hook(self, action:str):
-        async with aiohttp.ClientSession() as cs:
-            webhook = discord.Webhook.from_url(self.webhook, adapter=discord.AsyncWebhookAdapter(cs))
-            await webhook.send("Action: %s\nInstance: %s" % (action, self.bot.instance))
-
-    async def __ipc_loop(self):
-        if not self.has_started:
-            self.has_started = True
-        while self.has_started:
-            try:
-                [(await self.bot.redis.set(f"shard:{x[0]}", str(round(x[1] * 1000, 2)))) for x in self.bot.latencies]
-            except:
-                print("Failed to update latencies")
-            data = (await self.bot.redis.get("ipc:%s" % self.bot.instance)).decode("utf-8")
-            if not data == "":
-                if data == "ping":
-                    await self.__post_hook("Ping - %s" % self.bot.instance)
-                if data == "shutdown":
-                    await self.bot.redis.set("ipc:%s" % self.bot.instance, "")
-                    await self.__post_hook("Shutting down... bai")
-                    await self.bot.close()
-                else:
-                    await self.__post_hook("Reloaded " + data)
-                    try:
-                        self.bot.unload_extension("modules.%s" % data)
-                        self.bot.load_extension("modules.%s" % data)
-                    except:
-                        print("Failed to reload")
-                        pass
-                await self.bot.redis.set("ipc:%s" % self.bot.instance, "")
-            await asyncio.sleep(30)
+        self.bot.webhooks.send(self.webhook, "Action: %s\nInstance: %s" % (action, self.bot.instance))
+
+    async def __handle_ping(self):
+        return {"latency": round(self.bot.latency * 1000, 2), "guilds": len(self.bot.guilds)}
+
+    async def __handle_reload(self, module:str):
+        self.bot.unload_extension("modules.%s" % module)
+        self.bot.load_extension("modules.%s" % module)
+        await self.__post_hook("Reloaded " + module)
+        return module
+
+    async def __handle_shutdown(self):
+        await self.__post_hook("Shutting down... bai")
+
+        async def _close():
+            # Give the reply a moment to go out before the bus closes
+            await asyncio.sleep(1)
+            await self.bot.close()
+
+        self.bot.loop.create_task(_close())
+        return "bai"
+
+    async def __handle_stats(self):
+        return self.bot.stats.snapshot()
+
+    async def __handle_reloadlang(self, language:str=None):
+        catalog.reload(language)
+        return language or "all"
+
+    def __format(self, replies:dict, fmt):
+        if not replies:
+            return "No instances replied."
+        lines = []
+        for instance in sorted(replies):
+            reply = replies[instance]
+            if reply["ok"]:
+                lines.append("Instance %s: %s" % (instance, fmt(reply["data"])))
+            else:
+                lines.append("Instance %s: failed, %s" % (instance, reply["error"]))
+        return "```\n%s\n```" % "\n".join(lines)
 
     @commands.group(hidden=True)
     @commands.is_owner()
     async def ipc(self, ctx):
         if ctx.invoked_subcommand is None:
-            await ctx.send("```\nHeccin ipc finally /shrug\n\nreload - reload shit\nforce - force loop\nshutdown - bai```")
+            await ctx.send("```\nHeccin ipc finally /shrug\n\nreload - reload shit\nping - ping instances\n"
+                           "stats - instance stats\nreloadlang - reload language files\nshutdown - bai```")
 
     @ipc.command(name="shutdown")
-    async def ipc_shutdown(self, ctx):
+    async def ipc_shutdown(self, ctx, instance:int=None):
         """bai"""
-        for x in range(self.bot.instances):
-            await self.bot.redis.set("ipc:%s" % self.bot.instance, "shutdown")
+        replies = await self.bot.bus.request("shutdown", target=instance)
+        await ctx.send(self.__format(replies, str))
 
     @ipc.command(name="reload")
     async def ipc_reload(self, ctx, module:str):
         """reload shit"""
-        for x in range(self.bot.instances):
-            await self.bot.redis.set("ipc:%s" % self.bot.instance, module)
-        await ctx.send("Added to queue")
+        replies = await self.bot.bus.request("reload", module=module)
+        await ctx.send(self.__format(replies, lambda x: "reloaded %s" % x))
+
+    @ipc.command(name="reloadlang")
+    async def ipc_reloadlang(self, ctx, language:str=None):
+        """Reload language files"""
+        replies = await self.bot.bus.request("reloadlang", language=language)
+        await ctx.send(self.__format(replies, lambda x: "reloaded %s" % x))
 
     @ipc.command(name="ping")
     async def ipc_ping(self, ctx):
         """Ping ipc"""
-        await ctx.send("Sending ping")
-        for x in range(self.bot.instances):
-            await self.bot.redis.set("ipc:%s" % self.bot.instance, "ping")
-
-    @ipc.command(name="force")
-    async def ipc_force(self, ctx):
-        await ctx.send("Forcing loop")
-        await self.__ipc_loop()
+        replies = await self.bot.bus.request("ping")
+        await ctx.send(self.__format(replies, lambda x: "%sms, %s guilds" % (x["latency"], x["guilds"])))
 
-    async def on_ready(self):
-        await self.__ipc_loop()
+    @ipc.command(name="stats")
+    async def ipc_stats(self, ctx):
+        """Stats from every instance"""
+        replies = await self.bot.bus.request("stats")
+        await ctx.send(self.__format(replies, lambda x: "%s guilds, %s users, %s messages, %s commands" % (
+            x["guilds"], x["users"], x["messages"], x["commands"])))
 
 def setup(bot):
-    bot.add_cog(IPC(bot))
\ No newline at end of file
+    bot.add_cog(IPC(bot))
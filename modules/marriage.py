@@ -1,19 +1,9 @@
 from discord.ext import commands
 import discord, asyncio
-import ujson
 import rethinkdb as r
 from .utils import chat_formatting
+from .utils.i18n import catalog
 
-# Languages
-languages = ["english", "weeb", "tsundere", "polish", "spanish", "french"]
-lang = {}
-
-for l in languages:
-    with open("lang/%s.json" % l, encoding="utf-8") as f:
-        lang[l] = ujson.load(f)
-
-def getlang(la:str):
-    return lang.get(la, None)
 
 class Marriage:
 
@@ -26,20 +16,16 @@ class Marriage:
         """Marry someone OwO"""
         author = ctx.author
 
-        lang = await self.bot.redis.get(f"{ctx.author.id}-lang")
-        if lang:
-            lang = lang.decode("utf8")
-        else:
-            lang = "english"
+        lang = await self.bot.prefs.get_lang(ctx.author.id)
 
         if user == author:
-            return await ctx.send(chat_formatting.bold(getlang(lang)["marriage"]["marry_self"]))
+            return await ctx.send(chat_formatting.bold(catalog.get(lang, "marriage.marry_self")))
         if await r.table("marriage").get(str(author.id)).run(self.bot.r_conn):
-            return await ctx.send(chat_formatting.bold(getlang(lang)["marriage"]["author_married"]))
+            return await ctx.send(chat_formatting.bold(catalog.get(lang, "marriage.author_married")))
         elif await r.table("marriage").get(str(user.id)).run(self.bot.r_conn):
-            return await ctx.send(chat_formatting.bold(getlang(lang)["marriage"]["user_married"]))
+            return await ctx.send(chat_formatting.bold(catalog.get(lang, "marriage.user_married")))
         else:
-            await ctx.send(getlang(lang)["marriage"]["marry_msg"].format(author, user))
+            await ctx.send(catalog.format(lang, "marriage.marry_msg", author, user))
 
             def check(m):
                 return m.channel == ctx.message.channel and m.author == user
@@ -47,9 +33,9 @@ class Marriage:
             try:
                 msg = await self.bot.wait_for("message", check=check, timeout=15.0)
                 if msg.content.lower() != "yes":
-                    return await ctx.send(embed=discord.Embed(color=0xff5630, description=getlang(lang)["marriage"]["cancelled"]))
+                    return await ctx.send(embed=discord.Embed(color=0xff5630, description=catalog.get(lang, "marriage.cancelled")))
             except asyncio.TimeoutError:
-                await ctx.send(embed=discord.Embed(color=0xff5630, description=getlang(lang)["marriage"]["cancelled"]))
+                await ctx.send(embed=discord.Embed(color=0xff5630, description=catalog.get(lang, "marriage.cancelled")))
                 return
 
             await ctx.send(f"🎉 {author.mention} ❤ {user.mention} 🎉")
@@ -62,14 +48,10 @@ class Marriage:
         """Divorce ;-;"""
         author = ctx.message.author
 
-        lang = await self.bot.redis.get(f"{ctx.author.id}-lang")
-        if lang:
-            lang = lang.decode("utf8")
-        else:
-            lang = "english"
+        lang = await self.bot.prefs.get_lang(ctx.author.id)
 
         if not await r.table("marriage").get(str(author.id)).run(self.bot.r_conn):
-            return await ctx.send(chat_formatting.bold(getlang(lang)["marriage"]["not_married"]))
+            return await ctx.send(chat_formatting.bold(catalog.get(lang, "marriage.not_married")))
         x = await r.table("marriage").get(str(author.id)).run(self.bot.r_conn)
         user_married_to = int(x["marriedTo"])
         married_to_name = await self.bot.get_user_info(user_married_to)
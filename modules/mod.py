@@ -1,15 +1,16 @@
 from discord.ext import commands
 import discord, argparse, os, shlex, traceback, io, textwrap, asyncio, re
-from .utils import checks, chat_formatting
+from .utils import checks, chat_formatting, instance_tools
 from contextlib import redirect_stdout
 from collections import Counter
 from .utils.hastebin import post as hastebin
+from .utils.joinqueue import JoinQueue
+from .utils.i18n import catalog
 import math
 import string
 import time
 import config
-import aiohttp
-import re, ujson, inspect, datetime, collections
+import re, inspect, datetime, collections
 import logging
 import rethinkdb as r
 
@@ -39,16 +40,6 @@ async def run_cmd(cmd: str) -> str:
     results = await process.communicate()
     return "".join(x.decode("utf-8") for x in results)
 
-# Languages
-languages = ["english", "weeb", "tsundere", "polish", "spanish", "french"]
-lang = {}
-
-for l in languages:
-    with open("lang/%s.json" % l, encoding="utf-8") as f:
-        lang[l] = ujson.load(f)
-
-def getlang(la:str):
-    return lang.get(la, None)
 
 class Moderation:
     """Moderation Tools"""
@@ -61,6 +52,13 @@ class Moderation:
         self.repl_sessions = {}
         self.repl_embeds = {}
 
+        self.autoroles = JoinQueue(bot.loop, self.__autorole,
+                                   window=getattr(config, "join_window", 2),
+                                   stale_after=getattr(config, "join_stale_after", 60))
+
+    def __unload(self):
+        self.autoroles.close()
+
     def cleanup_code(self, content):
         """Automatically removes code blocks from the code."""
         # remove ```py\n```
@@ -120,15 +118,11 @@ class Moderation:
     @checks.is_admin()
     async def dehoist(self, ctx):
         """Dehoister"""
-        lang = await self.bot.redis.get(f"{ctx.message.author.id}-lang")
-        if lang:
-            lang = lang.decode('utf8')
-        else:
-            lang = "english"
+        lang = await self.bot.prefs.get_lang(ctx.message.author.id)
         users_dehoisted = []
         users_failed = []
         starttime = int(time.time())
-        await ctx.send(getlang(lang)["mod"]["dehoist"]["start"])
+        await ctx.send(catalog.get(lang, "mod.dehoist.start"))
         for user in ctx.message.guild.members:
             try:
                 if not user.display_name[0] in list(str(string.ascii_letters)):
@@ -137,8 +131,8 @@ class Moderation:
             except:
                 users_failed.append(user.id)
                 pass
-        hastepaste = await hastebin("\n".join(users_dehoisted))
-        await ctx.send(getlang(lang)["mod"]["dehoist"]["end"].format(len(users_dehoisted),
+        hastepaste = await hastebin("\n".join(users_dehoisted), self.bot.http_client)
+        await ctx.send(catalog.format(lang, "mod.dehoist.end", len(users_dehoisted),
                                                                      int(time.time() - starttime),
                                                                      len(users_failed),
                                                                      hastepaste))
@@ -161,7 +155,7 @@ class Moderation:
             except:
                 users_failed.append(user.id)
                 pass
-        hastepaste = await hastebin("\n".join(users_undehoisted))
+        hastepaste = await hastebin("\n".join(users_undehoisted), self.bot.http_client)
         await ctx.send(f"{len(users_undehoisted)} users undehoisted in {int(time.time() - starttime)}s, {len(users_failed)} failed. {hastepaste}")
 
     @commands.command()
@@ -169,18 +163,14 @@ class Moderation:
     @checks.has_permissions(kick_members=True)
     async def kick(self, ctx, member: discord.Member, *, reason: ActionReason = None):
         """Kicks a member from the server."""
-        lang = await self.bot.redis.get(f"{ctx.message.author.id}-lang")
-        if lang:
-            lang = lang.decode('utf8')
-        else:
-            lang = "english"
+        lang = await self.bot.prefs.get_lang(ctx.message.author.id)
         try:
             if reason is None:
                 reason = f'Action done by {ctx.author} (ID: {ctx.author.id})'
             await member.kick(reason=reason)
-            await ctx.send(embed=discord.Embed(color=0x87ff8f, description=getlang(lang)["mod"]["kicked"].format(member)))
+            await ctx.send(embed=discord.Embed(color=0x87ff8f, description=catalog.format(lang, "mod.kicked", member)))
         except:
-            await ctx.send(getlang(lang)["mod"]["permission_error"])
+            await ctx.send(catalog.get(lang, "mod.permission_error"))
 
     @commands.command()
     @commands.guild_only()
@@ -202,19 +192,15 @@ class Moderation:
     @checks.has_permissions(ban_members=True)
     async def ban(self, ctx, member: discord.Member, *, reason: ActionReason = None):
         """Bans a member from the server."""
-        lang = await self.bot.redis.get(f"{ctx.message.author.id}-lang")
-        if lang:
-            lang = lang.decode('utf8')
-        else:
-            lang = "english"
+        lang = await self.bot.prefs.get_lang(ctx.message.author.id)
         try:
             if reason is None:
                 reason = f'Action done by {ctx.author} (ID: {ctx.author.id})'
 
             await ctx.guild.ban(member, reason=reason)
-            await ctx.send(embed=discord.Embed(color=0x87ff8f, description=getlang(lang)["mod"]["banned"].format(member)))
+            await ctx.send(embed=discord.Embed(color=0x87ff8f, description=catalog.format(lang, "mod.banned", member)))
         except:
-            await ctx.send(getlang(lang)["mod"]["permission_error"])
+            await ctx.send(catalog.get(lang, "mod.permission_error"))
 
     @commands.command()
     @commands.guild_only()
@@ -222,75 +208,59 @@ class Moderation:
     async def softban(self, ctx, user:discord.Member):
         """Softban a user, bans a user to delete all their messages and unbans after."""
 
-        lang = await self.bot.redis.get(f"{ctx.message.author.id}-lang")
-        if lang:
-            lang = lang.decode('utf8')
-        else:
-            lang = "english"
+        lang = await self.bot.prefs.get_lang(ctx.message.author.id)
 
         try:
             await ctx.guild.ban(user, reason=f"Softbanned by {ctx.author.name}", delete_message_days=7)
             await ctx.guild.unban(user)
             await ctx.send("I have successfully softbanned that user.")
         except:
-            await ctx.send(getlang(lang)["mod"]["permission_error"])
+            await ctx.send(catalog.get(lang, "mod.permission_error"))
 
     @commands.command()
     @commands.guild_only()
     @checks.has_permissions(ban_members=True)
     async def massban(self, ctx, reason: ActionReason, *members: MemberID):
         """Ban multiple people at once."""
-        lang = await self.bot.redis.get(f"{ctx.message.author.id}-lang")
-        if lang:
-            lang = lang.decode('utf8')
-        else:
-            lang = "english"
+        lang = await self.bot.prefs.get_lang(ctx.message.author.id)
         try:
             for member_id in members:
                 await ctx.guild.ban(discord.Object(id=member_id), reason=reason)
 
             await ctx.send('\N{OK HAND SIGN}')
         except:
-            await ctx.send(getlang(lang)["mod"]["permission_error"])
+            await ctx.send(catalog.get(lang, "mod.permission_error"))
 
     @commands.command()
     @commands.guild_only()
     @checks.has_permissions(ban_members=True)
     async def unban(self, ctx, member: BannedMember, *, reason: ActionReason = None):
         """Unbans a member from the server."""
-        lang = await self.bot.redis.get(f"{ctx.message.author.id}-lang")
-        if lang:
-            lang = lang.decode('utf8')
-        else:
-            lang = "english"
+        lang = await self.bot.prefs.get_lang(ctx.message.author.id)
         if reason is None:
             reason = f'Action done by {ctx.author} (ID: {ctx.author.id})'
 
         await ctx.guild.unban(member.user, reason=reason)
         if member.reason:
-            await ctx.send(getlang(lang)["mod"]["unbanned_reason"].format(member))
+            await ctx.send(catalog.format(lang, "mod.unbanned_reason", member))
         else:
-            await ctx.send(getlang(lang)["mod"]["unbanned"].format(member))
+            await ctx.send(catalog.format(lang, "mod.unbanned", member))
 
     @commands.command()
     @commands.guild_only()
     @checks.admin_or_permissions(manage_nicknames=True)
     async def rename(self, ctx, user : discord.Member, *, nickname =""):
         """Rename a user"""
-        lang = await self.bot.redis.get(f"{ctx.message.author.id}-lang")
-        if lang:
-            lang = lang.decode('utf8')
-        else:
-            lang = "english"
+        lang = await self.bot.prefs.get_lang(ctx.message.author.id)
         nickname = nickname.strip()
         if nickname == "":
             nickname = None
         try:
             await user.edit(nick=nickname)
-            await ctx.send(embed=discord.Embed(color=0x87ff8f, description=getlang(lang)["mod"]["renamed"].format(user)))
+            await ctx.send(embed=discord.Embed(color=0x87ff8f, description=catalog.format(lang, "mod.renamed", user)))
         except:
             e = discord.Embed(color=0xff5630, title="⚠ Error",
-                              description=getlang(lang)["mod"]["permission_error"])
+                              description=catalog.get(lang, "mod.permission_error"))
             await ctx.send(embed=e)
 
     @commands.command()
@@ -388,9 +358,9 @@ class Moderation:
     async def latency(self, ctx):
         """Get bot latency across all shards"""
         msg = ""
-        for x in range(self.bot.shard_count):
-            ping = await self.bot.redis.get(f"shard:{x}")
-            msg += f"Shard {x+1}: {ping.decode('utf8')}\n"
+        i = instance_tools.InstanceTools(self.bot.instances, self.bot.redis)
+        for shard, ping in await i.get_latencies():
+            msg += f"Shard {shard+1}: {ping}\n"
 
         for i in chat_formatting.pagify(msg, page_length=1750):
             await ctx.send(i)
@@ -403,7 +373,7 @@ class Moderation:
             command = self.cleanup_code(command)
             result = await run_cmd(command)
             if len(result) >= 1500:
-                pa = await hastebin(result)
+                pa = await hastebin(result, self.bot.http_client)
                 await ctx.send(f'`{command}`: {pa}')
             else:
                 await ctx.send(f"`{command}`: ```{result}```\n")
@@ -779,10 +749,8 @@ class Moderation:
                 embed.set_thumbnail(url=guild.icon_url)
             except:
                 pass
-            async with aiohttp.ClientSession() as cs:
-                webhook = discord.Webhook.from_url(f"https://discordapp.com/api/webhooks/{config.webhook_id}/{config.webhook_token}",
-                                                   adapter=discord.AsyncWebhookAdapter(cs))
-                await webhook.send(embed=embed)
+            self.bot.webhooks.send(f"https://discordapp.com/api/webhooks/{config.webhook_id}/{config.webhook_token}",
+                                   embed=embed)
         except:
             pass
 
@@ -877,7 +845,7 @@ class Moderation:
                         item,
                         history[item])
 
-                haste_url = await hastebin(history_string)
+                haste_url = await hastebin(history_string, self.bot.http_client)
                 return_msg = f"[`Leaving shell session. History hosted on " \
                              f"hastebin.`]({haste_url}) "
 
@@ -916,7 +884,7 @@ class Moderation:
                     if len(cleaned) > 800:
                         cleaned = "<Too big to be printed>"
                     if len(return_msg) > 800:
-                        haste_url = await hastebin(return_msg)
+                        haste_url = await hastebin(return_msg, self.bot.http_client)
                         return_msg = f'[`SyntaxError too big to be printed. ' \
                                      f'Hosted on hastebin.`]({haste_url}) '
 
@@ -970,7 +938,7 @@ class Moderation:
             try:
                 if fmt is not None:
                     if len(fmt) >= 800:
-                        haste_url = await hastebin(fmt)
+                        haste_url = await hastebin(fmt, self.bot.http_client)
                         self.repl_embeds[shell].add_field(
                             name="`>>> {}`".format(cleaned),
                             value=f"[`Content too big to be printed. Hosted "
@@ -1031,16 +999,28 @@ class Moderation:
             await r.table("autorole").insert(data).run(self.bot.r_conn)
             return await ctx.send(f"Updated Autorole to {role.name}")
 
-    async def on_member_join(self, member):
-        server = member.guild
-        try:
-            if await r.table("autorole").get(str(server.id)).run(self.bot.r_conn):
-                data = await r.table("autorole").get(str(server.id)).run(self.bot.r_conn)
-                role = discord.utils.get(server.roles, id=int(data["role"]))
+    async def __autorole(self, server, members: list):
+        """Give a batch of joined members the autorole, one request at a time so discord.py's
+        per-route rate limiter paces them instead of a burst of concurrent 429s."""
+        data = await r.table("autorole").get(str(server.id)).run(self.bot.r_conn)
+        if not data:
+            return
+        role = discord.utils.get(server.roles, id=int(data["role"]))
+        if role is None:
+            return
+        for member in members:
+            if role in member.roles:
+                continue
+            try:
                 await member.add_roles(role, reason="Autorole")
-        except Exception as e:
-            log.warning(e)
-            pass
+            except discord.Forbidden:
+                # Missing permissions or role hierarchy, the rest of the batch would fail too
+                return log.warning("Autorole forbidden in %s" % server.id)
+            except discord.HTTPException as e:
+                log.warning(e)
+
+    async def on_member_join(self, member):
+        self.autoroles.push(member)
 
     # async def on_member_update(self, before, after):
     #     try:
@@ -1072,10 +1052,8 @@ class Moderation:
                 embed.set_thumbnail(url=guild.icon_url)
             except:
                 pass
-            async with aiohttp.ClientSession() as cs:
-                webhook = discord.Webhook.from_url(f"https://discordapp.com/api/webhooks/{config.webhook_id}/{config.webhook_token}",
-                                                   adapter=discord.AsyncWebhookAdapter(cs))
-                await webhook.send(embed=embed)
+            self.bot.webhooks.send(f"https://discordapp.com/api/webhooks/{config.webhook_id}/{config.webhook_token}",
+                                   embed=embed)
         except:
             pass
 
@@ -1,8 +1,8 @@
 from discord.ext import commands
 import discord, random, os, math, logging
-from PIL import Image, ImageFont, ImageDraw
 import rethinkdb as r
 from io import BytesIO
+from .utils.ledger import LedgerError
 
 log = logging.getLogger()
 
@@ -23,18 +23,13 @@ class NekoPet:
         else:
             return False
 
-    async def __can_purchase(self, user:int, amount:int):
-        data = await r.table("economy").get(str(user)).run(self.bot.r_conn)
-        balance = data["balance"]
-        if (balance - amount) < 0:
-            return False
-        else:
-            return True
-
     async def __remove_amount(self, user:int, amount:int):
-        data = await r.table("economy").get(str(user)).run(self.bot.r_conn)
-        balance = data["balance"]
-        await r.table("economy").get(str(user)).update({"balance": balance - amount}).run(self.bot.r_conn)
+        """Take amount from the user if they can afford it, returns False if they can't."""
+        try:
+            await self.bot.ledger.debit(user, amount)
+        except LedgerError:
+            return False
+        return True
 
     @commands.group()
     @commands.guild_only()
@@ -93,31 +88,12 @@ class NekoPet:
         play = pet_data["play"]
         type = pet_data["type"]
 
-        data_folder = "data/nekopet/"
-        background = Image.open(data_folder + pet_data.get("background", "background.png")).convert("RGBA")
-        font = ImageFont.truetype("data/fonts/Neko.ttf", 30)
-
-        types = {
-            1: "neko1.png",
-            2: "neko2.png",
-            3: "neko3.png"
-        }
-
-        draw = ImageDraw.Draw(background)
-        neko = Image.open(data_folder + types[int(type)]).resize((250, background.size[1]))
-
-        background.alpha_composite(neko)
-        draw.text((225, 5), f"{food}% Food", (255, 255, 255), font)
-        draw.text((225, 45), f"{play}% Play", (255, 255, 255), font)
-        draw.text((225, 85), f"Level {self._find_level(int(level))}", (255, 255, 255), font)
-
-        temp = BytesIO()
-        background.save(temp, format="png")
-        temp.seek(0)
+        image = await self.bot.render.render("neko", pet_data.get("background", "background.png"), int(type),
+                                             food, play, self._find_level(int(level)))
 
         em = discord.Embed(color=0xDEADBF, title=f"{ctx.message.author.name}'s Neko")
         em.set_footer(text=f"Level: {self._find_level(int(level))}, XP: {level}")
-        await ctx.send(file=discord.File(fp=temp, filename="neko.png"),
+        await ctx.send(file=discord.File(fp=BytesIO(image), filename="neko.png"),
                        embed=em.set_image(url=f"attachment://neko.png"))
 
     @pet.command(name="shop")
@@ -155,9 +131,8 @@ class NekoPet:
             except:
                 return await strt.edit(content="❌ | **Timed out...**", embed=None)
             if msg.content.lower() == "yes":
-                if not await self.__can_purchase(ctx.author.id, 75000):
+                if not await self.__remove_amount(ctx.author.id, 75000):
                     return await strt.edit(content="❌ | **You don't have enough $ ;c**")
-                await self.__remove_amount(ctx.author.id, 75000)
                 data = {
                     "id": str(ctx.author.id),
                     "background": "background.png",
@@ -214,10 +189,9 @@ class NekoPet:
                 except:
                     return await strt.edit(content="❌ | **Timed out...**", embed=None)
                 if msg.content.lower() == "yes":
-                    if not await self.__can_purchase(ctx.author.id, 250000):
+                    if not await self.__remove_amount(ctx.author.id, 250000):
                         return await ctx.send(content="❌ | **You don't have enough $ ;c**", embed=None)
                     else:
-                        await self.__remove_amount(ctx.author.id, 250000)
                         await r.table("nekopet").get(str(ctx.author.id)).update({"background": "background2.png"}).run(self.bot.r_conn)
                         return await ctx.send("<a:rainbowNekoDance:462373594555613214> | Successfully bought the background!")
                 else:
@@ -237,10 +211,9 @@ class NekoPet:
         if food >= 90:
             return await ctx.send("❌ | **Your neko already has enough food!**")
         payamount = random.randint(250, 5000)
-        if not await self.__can_purchase(ctx.author.id, payamount):
+        if not await self.__remove_amount(ctx.author.id, payamount):
             return await ctx.send("❌ | **You don't have enough money for food ;c*")
         try:
-            await self.__remove_amount(ctx.author.id, payamount)
             await r.table("nekopet").get(str(ctx.author.id)).update({"food": 100}).run(self.bot.r_conn)
             await ctx.send(f"<a:rainbowNekoDance:462373594555613214> | **Paid {payamount} for your nekos food!**")
         except Exception as e:
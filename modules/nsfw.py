@@ -1,6 +1,5 @@
 from discord.ext import commands
-import discord, random, aiohttp
-from bs4 import BeautifulSoup as bs
+import discord, random
 from .utils import checks, chat_formatting, hastebin
 import config
 import json
@@ -12,7 +11,6 @@ class NSFW:
 
     def __init__(self, bot):
         self.bot = bot
-        self.session = aiohttp.ClientSession(loop=self.bot.loop)
         self.nekobot = nekobot.Client(loop=self.bot.loop)
 
     async def __has_voted(self, user:int):
@@ -23,37 +21,30 @@ class NSFW:
 
     async def log_error(self, error:str):
         webhook_url = f"https://discordapp.com/api/webhooks/{config.webhook_id}/{config.webhook_token}"
-        webhook = discord.Webhook.from_url(webhook_url, adapter=discord.AsyncWebhookAdapter(self.session))
 
         em = discord.Embed(color=0xff6f3f)
         em.title = "Error"
         em.description = chat_formatting.box(error, "python")
         em.set_footer(text="Instance %s" % self.bot.instance)
 
-        await webhook.send(embed=em)
+        self.bot.webhooks.send(webhook_url, embed=em)
 
     async def boobbot(self, imgtype:str):
         url = config.boobbot["base"] + imgtype
         auth = {"key": config.boobbot["key"]}
-        data = await self.session.get(url, headers=auth)
+        data = await self.bot.http_client.request("GET", url, headers=auth, read="response")
 
-        try:
-            x = await data.json()
-        except aiohttp.ContentTypeError:
+        if "json" not in data.headers.get("Content-Type", ""):
             if imgtype == "boobs":
                 try:
-                    async with aiohttp.ClientSession() as cs:
-                        async with cs.get("http://api.oboobs.ru/boobs/" % random.randint(0, 12058)) as r:
-                            res = await r.json()
+                    res = await self.bot.http_client.get_json("http://api.oboobs.ru/boobs/" % random.randint(0, 12058))
                     return res["preview"]
                 except:
                     pass
-            content = await data.text()
-            status = data.status
-            content = await hastebin.post(str(content))
-            await self.log_error(f"Content Type Error:\n({status}) {content}")
+            content = await hastebin.post(data.text(), self.bot.http_client)
+            await self.log_error(f"Content Type Error:\n({data.status}) {content}")
             return "https://nekobot.xyz/placeholder.png"
-        return x.get("url")
+        return data.json().get("url")
 
     @commands.command()
     @commands.guild_only()
@@ -127,9 +118,7 @@ class NSFW:
         else:
             try:
                 query = ("https://yande.re/post.json?limit=100&tags=" + tag)
-                async with aiohttp.ClientSession() as cs:
-                    async with cs.get(query) as r:
-                        res = await r.json()
+                res = await self.bot.http_client.get_json(query)
                 if res != []:
                     img = random.choice(res)
                     if "loli" in img["tags"] or "shota" in img["tags"]:
@@ -165,9 +154,7 @@ class NSFW:
             return
         headers = {"Authorization": f"Client-ID {config.imgur}"}
         url = f'https://api.imgur.com/3/gallery/r/bodyperfection/hot/{random.randint(1, 5)}'
-        async with aiohttp.ClientSession() as cs:
-            async with cs.get(url, headers=headers) as r:
-                res =  await r.json()
+        res = await self.bot.http_client.get_json(url, headers=headers)
         if res["status"] == 429:
             return await ctx.send("**Ratelimited, try again later.**")
         data = res['data']
@@ -189,9 +176,7 @@ class NSFW:
         sub = random.choice(["bigboobs", "BigBoobsGW"])
         headers = {"Authorization": f"Client-ID {config.imgur}"}
         url = f'https://api.imgur.com/3/gallery/r/{sub}/hot/{random.randint(1, 5)}'
-        async with aiohttp.ClientSession() as cs:
-            async with cs.get(url, headers=headers) as r:
-                res = await r.json()
+        res = await self.bot.http_client.get_json(url, headers=headers)
         if res["status"] == 429:
             return await ctx.send("**Ratelimited, try again later.**")
         x = random.choice(res['data'])
@@ -234,9 +219,7 @@ class NSFW:
             await ctx.send("This is not a NSFW Channel <:deadStare:417437129501835279>")
             return
         em = discord.Embed(color=0xDEADBF)
-        async with aiohttp.ClientSession() as cs:
-            async with cs.get("https://nekobot.xyz/api/v2/image/thighs") as r:
-                res = await r.json()
+        res = await self.bot.http_client.get_json("https://nekobot.xyz/api/v2/image/thighs")
         em.set_image(url=res["message"])
         await ctx.send(embed=em)
 
@@ -276,7 +259,7 @@ class NSFW:
             return
         else:
             url = "http://nhentai.net/random/"
-            res = await self.session.get(url)
+            res = await self.bot.http_client.request("GET", url, read="response")
             url = res.url
             await ctx.send(embed=discord.Embed(color=0xDEADBF,
                                                title="Random Doujin",
@@ -321,9 +304,7 @@ class NSFW:
         if not ctx.message.channel.is_nsfw():
             return await ctx.send("This is not an NSFW channel...", delete_after=5)
         try:
-            async with aiohttp.ClientSession() as cs:
-                async with cs.get(f"https://rule34.xxx/index.php?page=dapi&s=post&q=index&json=1&tags={tag}") as r:
-                    data = json.loads(await r.text())
+            data = json.loads(await self.bot.http_client.get_text(f"https://rule34.xxx/index.php?page=dapi&s=post&q=index&json=1&tags={tag}"))
             non_loli = list(filter(lambda x: 'loli' not in x['tags'] and 'shota' not in x['tags'], data))
             if len(non_loli) == 0:
                 em = discord.Embed(color=0xff6f3f, title="Warning", description="Loli/Shota in search.")
@@ -377,10 +358,8 @@ class NSFW:
         try:
             ua = "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:62.0) Gecko/20100101 Firefox/62.0"
             async with ctx.typing():
-                async with aiohttp.ClientSession() as cs:
-                    async with cs.get(f"https://e621.net/post/index.json?limit=15&tags={tag}",
-                                      headers={"User-Agent": ua}) as r:
-                        res = await r.json()
+                res = await self.bot.http_client.get_json(f"https://e621.net/post/index.json?limit=15&tags={tag}",
+                                                          headers={"User-Agent": ua})
                 data = random.choice(res)
                 if data == []:
                     return await ctx.send("**No images found**")
@@ -2,7 +2,6 @@ from discord.ext import commands
 import discord
 from .utils.weeb import Weeb
 import config
-import aiohttp
 from random import choice as randchoice
 
 class Reactions:
@@ -10,10 +9,25 @@ class Reactions:
     def __init__(self, bot):
         self.bot = bot
         self.weeb = Weeb(config.weeb, bot)
+        bot.loop.create_task(self.weeb.start())
+
+    def __unload(self):
+        self.weeb.close()
 
     async def __local_check(self, ctx):
         return True if ctx.guild else False
 
+    @commands.command(hidden=True)
+    @commands.is_owner()
+    async def poolstats(self, ctx):
+        """Reaction image pool stats"""
+        stats = self.weeb.pool.stats()
+        em = discord.Embed(color=0xDEADBF, title="Image Pool Stats",
+                           description=f"**{stats['ready']}** ready images across **{stats['types']}** types\n"
+                                       f"**{stats['hits']}** served from pool, **{stats['misses']}** live fetches\n"
+                                       f"**{stats['fetched']}** prefetched, **{stats['errors']}** errors")
+        await ctx.send(embed=em)
+
     @commands.command()
     @commands.cooldown(1, 3, commands.BucketType.user)
     async def awoo(self, ctx):
@@ -368,12 +382,7 @@ class Reactions:
             em = discord.Embed(color=color).set_image(url=url)
             await ctx.send(embed=em)
         else:
-            url = randchoice(['https://nekos.life/api/v2/img/nsfw_neko_gif', 'https://nekos.life/api/v2/img/lewd'])
-            async with aiohttp.ClientSession() as cs:
-                async with cs.get(url) as r:
-                    res = await r.json()
-            url = res["url"]
-            color = await self.weeb.get_dominant_color(url)
+            color, url = await self.weeb.nekos(randchoice(['nsfw_neko_gif', 'lewd']))
             em = discord.Embed(color=color).set_image(url=url)
             await ctx.send(embed=em)
 
@@ -381,11 +390,7 @@ class Reactions:
     @commands.command(pass_context=True, aliases=['foxgirls'])
     async def foxgirl(self, ctx):
         """Fox Girls OwO"""
-        async with aiohttp.ClientSession() as cs:
-            async with cs.get('https://nekos.life/api/v2/img/fox_girl') as r:
-                res = await r.json()
-        url = res["url"]
-        color = await self.weeb.get_dominant_color(url)
+        color, url = await self.weeb.nekos('fox_girl')
         em = discord.Embed(color=color).set_image(url=url)
         await ctx.send(embed=em)
 
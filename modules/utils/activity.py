@@ -0,0 +1,70 @@
+import math
+
+import rethinkdb as r
+
+# Compact, fixed-size activity history used in place of the old unbounded
+# lastxptimes/bettimes arrays.
+#
+#   count  - events ever recorded
+#   first  - unix time of the first event
+#   last   - unix time of the latest event
+#   gapsq  - sum of squared seconds between consecutive events
+#   mingap - smallest gap seen between two events
+#   recent - ring of the latest RECENT timestamps, oldest first
+#
+# The mean gap is (last - first) / (count - 1), so together with gapsq that keeps
+# the average/stddev signal the abuse checks read, while every write stays the
+# same size no matter how active the user is.
+
+RECENT = 50
+
+def empty():
+    return {"count": 0, "first": 0, "last": 0, "gapsq": 0, "mingap": 0, "recent": []}
+
+def push(activity: dict, timestamp: int):
+    """Record one event into a plain dict, used by the tools and migration."""
+    timestamp = int(timestamp)
+    if activity["count"]:
+        gap = timestamp - activity["last"]
+        activity["gapsq"] += gap * gap
+        activity["mingap"] = gap if activity["count"] == 1 else min(activity["mingap"], gap)
+    else:
+        activity["first"] = timestamp
+    activity["count"] += 1
+    activity["last"] = timestamp
+    activity["recent"] = (activity["recent"] + [timestamp])[-RECENT:]
+    return activity
+
+def from_times(times):
+    activity = empty()
+    for timestamp in times:
+        push(activity, timestamp)
+    return activity
+
+def record(current, times):
+    """ReQL expression folding `times` into the `current` activity expression."""
+    def step(acc, timestamp):
+        gap = timestamp.sub(acc["last"])
+        return r.branch(
+            acc["count"].eq(0),
+            {"count": 1, "first": timestamp, "last": timestamp, "gapsq": 0, "mingap": 0,
+             "recent": [timestamp]},
+            {"count": acc["count"].add(1),
+             "first": acc["first"],
+             "last": timestamp,
+             "gapsq": acc["gapsq"].add(gap.mul(gap)),
+             "mingap": r.branch(acc["count"].eq(1), gap, r.expr([acc["mingap"], gap]).min()),
+             "recent": acc["recent"].append(timestamp).slice(-RECENT)}
+        )
+    return r.expr(times).fold(current.default(empty()), step)
+
+def summarize(activity: dict):
+    """Mean/stddev/min of the seconds between events."""
+    count = activity["count"]
+    if count < 2:
+        return {"count": count, "mean": 0.0, "stddev": 0.0, "min": 0, "last": activity["last"]}
+    gaps = count - 1
+    mean = (activity["last"] - activity["first"]) / gaps
+    variance = max(0.0, activity["gapsq"] / gaps - mean * mean)
+    return {"count": count, "mean": mean, "stddev": math.sqrt(variance),
+            "min": activity["mingap"], "last": activity["last"]}
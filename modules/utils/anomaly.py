@@ -0,0 +1,96 @@
+import time
+from collections import Counter, deque
+
+class Window:
+    """One user's events inside the last `span` seconds, with running totals."""
+
+    __slots__ = ("events", "net", "received", "last")
+
+    def __init__(self):
+        self.events = deque()
+        self.net = 0
+        self.received = 0
+        self.last = 0
+
+    def push(self, now: float, delta: int, span: float, transfer: bool = False):
+        self.events.append((now, delta, transfer))
+        self.__add(delta, transfer, 1)
+        self.last = now
+        self.expire(now, span)
+
+    def __add(self, delta: int, transfer: bool, sign: int):
+        if not transfer:
+            self.net += sign * delta
+        elif delta > 0:
+            self.received += sign * delta
+
+    def expire(self, now: float, span: float):
+        events = self.events
+        while events and events[0][0] <= now - span:
+            _, delta, transfer = events.popleft()
+            self.__add(delta, transfer, -1)
+
+class Detector:
+    """Sliding window thresholds over a stream of per-user changes.
+
+    observe() is O(1) amortised per change: each user has a Window of the
+    changes in the last `span` seconds and a user is flagged when the window
+    holds more than `max_events` changes, its net change is over `max_net`
+    (net rather than the sum of credits, a won bet debits the stake and
+    then credits it back with the winnings) or it received more than
+    `max_received` through transfers. Transfers are kept out of net so one
+    large legitimate transfer doesn't look like winnings, but coins
+    funnelled in from alts still add up in received. A flagged user
+    isn't flagged again until `span` has passed, and sweep() drops users
+    that have been idle for a whole span, so memory follows the number of
+    active users rather than the table size."""
+
+    def __init__(self, *, span: float = 60, max_events: int = 30, max_net: int = 0, max_received: int = 0):
+        self.span = span
+        self.max_events = max_events
+        self.max_net = max_net
+        self.max_received = max_received
+        self.counter = Counter()
+        self.__windows = {}
+        self.__flagged = {}
+
+    def observe(self, user: str, delta: int, now: float = None, transfer: bool = False):
+        """Add a change, returns a reason string if it puts the user over a threshold."""
+        now = now or time.monotonic()
+        window = self.__windows.get(user)
+        if window is None:
+            window = self.__windows[user] = Window()
+        window.push(now, delta, self.span, transfer)
+        self.counter["changes"] += 1
+
+        reason = None
+        if self.max_events and len(window.events) > self.max_events:
+            reason = "%s changes in %ss" % (len(window.events), self.span)
+        elif self.max_net and window.net > self.max_net:
+            reason = "gained %s in %ss" % (window.net, self.span)
+        elif self.max_received and window.received > self.max_received:
+            reason = "received %s in transfers in %ss" % (window.received, self.span)
+        if reason is None:
+            return None
+
+        flagged = self.__flagged.get(user)
+        if flagged is not None and now - flagged < self.span:
+            return None
+        self.__flagged[user] = now
+        self.counter["flagged"] += 1
+        return reason
+
+    def sweep(self, now: float = None):
+        now = now or time.monotonic()
+        idle = [user for user, window in self.__windows.items() if now - window.last > self.span]
+        for user in idle:
+            del self.__windows[user]
+        self.__flagged = {k: v for k, v in self.__flagged.items() if now - v < self.span}
+        return len(idle)
+
+    def stats(self):
+        return {
+            "users": len(self.__windows),
+            "changes": self.counter["changes"],
+            "flagged": self.counter["flagged"]
+        }
@@ -0,0 +1,83 @@
+import hashlib
+import logging
+import os
+from collections import OrderedDict, Counter
+
+log = logging.getLogger()
+
+DESCRIPTIONS = {
+    "kanna": "Be sure to keep this loli charged. Very thicc thighs.",
+    "yaya": "She'll be your puppet if you promise to marry her.",
+    "yoshino": "She must be a happy loli. Word of the wise never have her lose Yoshinon.",
+    "toujou_koneko": "A Neko Loli who will not kindly treat perverted actions.",
+    "terminus_est": "A sword who can transform into a loli. For some reason is just fine wearing only knee socks but not being fully naked.",
+    "azuki_azusa": "A hard working loli who pretends to be rich. Likes animals and works a lot of jobs to afford the act.",
+    "itsuka_kotori": "A bipolar loli. The color of the ribbon determines her personally as weak for white and strong for black.",
+    "tachibana_kanade": "An \"Angel\" who develops her own body to defend.",
+    "nyaruko": "An obessive otaku loli who will kill anyone that dares attempt to harm what she loves. ",
+    "cirno": "A ice fairy who never backs down from a challenge. She is very weak in respect to others but won't stop trying.",
+    "flandre_scarlet": "She respects her sister so much that she never leaves the mansion due to her orders. Is nice, quiet, and a tad nuts. ",
+    "shiro": "Genius gamer who is excellent at both strategy and in first person shooters. She will quickly master languages.",
+    "aihara_enju": "A rabbit type girl who will protect her friends. Can get jealous even to friends and tries to marry her partner at every chance.",
+    "takanashi_rikka": "A loli suffering from \"8th grade syndrome\" who believes she has the power of the tyrants's eye an will always walk around with an umbrella.",
+    "tsutsukakushi_tsukiko": "A gluttonous loli who will eat numerous snacks and cannot show emotion. Thinks of herself as childish.",
+    "aisaka_taiga": "Kind to those she trusts while aggressive to others. She hates he height pointed out or being called the palm top tiger.",
+    "hasegawa_kobato": "A very shy loli who enjoys cosplaying. She is almost always dressed up in a cosplay of her favorite gothic vampire.",
+    "sprout_tina": "A noctural loli. She will be sleepy during the day; however, when night falls she becomes an excellent sniper Who follows every order.",
+    "konjiki_no_yami": "Attacks those that talk about something she doesn't like and hates perverted people.",
+    "yukihira_furano": "A quiet girl that will insert sexual or vulgar words or phrases into sentences. Is also a part of the \"Reject Five\"",
+    "tatsumaki": "Arrogant and overconfident. She considers her job as a duty and also can get bored while not fighting monsters.",
+    "victorique_de_blois": "Bored by a normal life so she wants cases or other things to entertain her. She dislikes most strangers. She is also very intelligent.",
+    "hibiki": "Qtiest qt of all qts"
+}
+
+class CardCache:
+    """Content-addressed cache of rendered cards, an in-memory LRU in front of an optional disk directory.
+
+    Misses are rendered by the bot's RenderService with the "card" job."""
+
+    def __init__(self, render, *, maxsize: int = 256, disk_dir: str = None):
+        self.render = render
+        self.maxsize = maxsize
+        self.disk_dir = disk_dir
+        self.counter = Counter()
+        self.__cache = OrderedDict()
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    @staticmethod
+    def key(character: str, attack: int, defense: int, description: bool = True):
+        return hashlib.sha1(f"{character}:{attack}:{defense}:{int(description)}".encode("utf8")).hexdigest()
+
+    def __remember(self, key: str, data: bytes):
+        self.__cache[key] = data
+        self.__cache.move_to_end(key)
+        while len(self.__cache) > self.maxsize:
+            self.__cache.popitem(last=False)
+
+    async def get(self, character: str, attack: int, defense: int, description: bool = True):
+        """Rendered card PNG bytes, from memory, then disk, then a fresh render."""
+        key = self.key(character, attack, defense, description)
+        data = self.__cache.get(key)
+        if data is not None:
+            self.__cache.move_to_end(key)
+            self.counter["memory_hits"] += 1
+            return data
+
+        path = os.path.join(self.disk_dir, "%s.png" % key) if self.disk_dir else None
+        if path and os.path.isfile(path):
+            with open(path, "rb") as f:
+                data = f.read()
+            self.counter["disk_hits"] += 1
+        else:
+            data = await self.render.render("card", character, attack, defense, description)
+            self.counter["renders"] += 1
+            if path:
+                try:
+                    with open(path, "wb") as f:
+                        f.write(data)
+                except OSError as e:
+                    log.warning("Failed to write card cache %s: %s" % (path, e))
+
+        self.__remember(key, data)
+        return data
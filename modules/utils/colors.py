@@ -0,0 +1,83 @@
+import asyncio
+import logging
+import time
+from collections import Counter
+
+log = logging.getLogger()
+
+HASH = "dominant_colors"
+AGES = "dominant_colors:age"
+
+class DominantColors:
+    """Dominant colour of remote images, as embed colour ints.
+
+    Colours live in the dominant_colors Redis hash, with the time each was
+    stored in the dominant_colors:age sorted set so entries can expire after
+    `ttl` and the hash is trimmed to `maxsize` oldest-first. Misses download
+    the image and run the "dominant_color" job in the render pool, and
+    concurrent misses for the same key share one download and render."""
+
+    def __init__(self, bot, *, maxsize: int = 50000, ttl: int = 604800, trim_every: int = 100):
+        self.bot = bot
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.trim_every = trim_every
+        self.counter = Counter()
+        self.__inflight = {}
+
+    async def get(self, url: str, key: str = None):
+        """Colour for url, cached under key (defaults to the url)."""
+        key = key or url
+        color = await self.__cached(key)
+        if color is not None:
+            self.counter["hits"] += 1
+            return color
+
+        task = self.__inflight.get(key)
+        if task is None:
+            self.counter["misses"] += 1
+            task = self.bot.loop.create_task(self.__fetch(url, key))
+            self.__inflight[key] = task
+            task.add_done_callback(lambda t: self.__inflight.pop(key, None))
+        else:
+            self.counter["coalesced"] += 1
+        return await asyncio.shield(task)
+
+    async def __cached(self, key: str):
+        tr = self.bot.redis.pipeline()
+        tr.hget(HASH, key)
+        tr.zscore(AGES, key)
+        value, stored = await tr.execute()
+        if value is None or stored is None or time.time() - stored > self.ttl:
+            return None
+        return int(value)
+
+    async def __fetch(self, url: str, key: str):
+        data = await self.bot.http_client.get_bytes(url)
+        r, g, b = await self.bot.render.render("dominant_color", data)
+        color = r << 16 | g << 8 | b
+
+        tr = self.bot.redis.pipeline()
+        tr.hset(HASH, key, color)
+        tr.zadd(AGES, time.time(), key)
+        await tr.execute()
+        self.counter["stored"] += 1
+        if self.counter["stored"] % self.trim_every == 0:
+            try:
+                await self.trim()
+            except Exception as e:
+                log.warning("Failed to trim dominant colors: %s" % e)
+        return color
+
+    async def trim(self):
+        """Drop expired entries and the oldest ones past maxsize."""
+        keys = set(await self.bot.redis.zrangebyscore(AGES, max=time.time() - self.ttl))
+        size = await self.bot.redis.zcard(AGES)
+        if size - len(keys) > self.maxsize:
+            keys.update(await self.bot.redis.zrange(AGES, 0, size - self.maxsize - 1))
+        if keys:
+            tr = self.bot.redis.pipeline()
+            tr.hdel(HASH, *keys)
+            tr.zrem(AGES, *keys)
+            await tr.execute()
+            self.counter["trimmed"] += len(keys)
@@ -0,0 +1,136 @@
+import asyncio
+import logging
+import time
+import uuid
+
+import aioredis
+import ujson
+
+log = logging.getLogger()
+
+COMMANDS = "ipc:commands"
+REPLIES = "ipc:replies"
+
+class CommandBus:
+    """Redis pub/sub command bus between instances.
+
+    request() publishes a command with a request id to every instance (or
+    one target), each instance acks it as soon as it's received and replies
+    once the handler finishes. The caller gets a dict of replies keyed by
+    instance. PUBLISH returns how many instances are subscribed, so we know
+    how many replies to wait for."""
+
+    def __init__(self, bot, *, address=("localhost", 6379)):
+        self.bot = bot
+        self.address = address
+        self.handlers = {}
+        self.__pending = {}
+        self.__task = bot.loop.create_task(self.__listen())
+
+    def register(self, name: str, handler):
+        """Register a coroutine handler(**args) for a command name, its return value is the reply."""
+        self.handlers[name] = handler
+
+    def unregister(self, name: str):
+        self.handlers.pop(name, None)
+
+    async def request(self, command: str, *, target: int = None, timeout: float = 10.0, **args):
+        """Send a command and gather replies, returns {instance: reply}.
+
+        Each reply is a dict with ok plus data or error; instances that acked
+        but didn't reply in time get {"ok": False, "error": "timeout"}."""
+        request_id = uuid.uuid4().hex
+        pending = {
+            "acks": set(),
+            "replies": {},
+            "expected": None,
+            "done": asyncio.Event(loop=self.bot.loop)
+        }
+        self.__pending[request_id] = pending
+        try:
+            receivers = await self.bot.redis.publish(COMMANDS, ujson.dumps({
+                "id": request_id,
+                "command": command,
+                "args": args,
+                "target": target,
+                "origin": self.bot.instance,
+                "sent": time.time()
+            }))
+            pending["expected"] = 1 if target is not None else receivers
+            self.__check_done(pending)
+            try:
+                await asyncio.wait_for(pending["done"].wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                for instance in pending["acks"] - set(pending["replies"]):
+                    pending["replies"][instance] = {"ok": False, "error": "timeout"}
+            return pending["replies"]
+        finally:
+            self.__pending.pop(request_id, None)
+
+    def __check_done(self, pending):
+        if pending["expected"] is not None and len(pending["replies"]) >= pending["expected"]:
+            pending["done"].set()
+
+    async def __publish_reply(self, request_id: str, kind: str, **data):
+        data.update({"id": request_id, "type": kind, "instance": self.bot.instance})
+        await self.bot.redis.publish(REPLIES, ujson.dumps(data))
+
+    async def __handle_command(self, message: dict):
+        if message.get("target") is not None and message["target"] != self.bot.instance:
+            return
+        request_id = message["id"]
+        await self.__publish_reply(request_id, "ack")
+
+        handler = self.handlers.get(message["command"])
+        if handler is None:
+            return await self.__publish_reply(request_id, "reply", ok=False,
+                                              error="Unknown command %s" % message["command"])
+        try:
+            data = await handler(**message.get("args", {}))
+        except Exception as e:
+            log.warning("IPC command %s failed: %s" % (message["command"], e))
+            return await self.__publish_reply(request_id, "reply", ok=False, error="%s: %s" % (type(e).__name__, e))
+        await self.__publish_reply(request_id, "reply", ok=True, data=data)
+
+    def __handle_reply(self, message: dict):
+        pending = self.__pending.get(message["id"])
+        if pending is None:
+            return
+        if message["type"] == "ack":
+            pending["acks"].add(message["instance"])
+        else:
+            pending["acks"].add(message["instance"])
+            pending["replies"][message["instance"]] = {k: v for k, v in message.items()
+                                                       if k not in ("id", "type", "instance")}
+            self.__check_done(pending)
+
+    async def __read_commands(self, channel):
+        while await channel.wait_message():
+            message = await channel.get_json()
+            self.bot.loop.create_task(self.__handle_command(message))
+
+    async def __read_replies(self, channel):
+        while await channel.wait_message():
+            self.__handle_reply(await channel.get_json())
+
+    async def __listen(self):
+        retry = 1
+        while True:
+            sub = None
+            try:
+                sub = await aioredis.create_redis(address=self.address, loop=self.bot.loop)
+                commands, replies = await sub.subscribe(COMMANDS, REPLIES)
+                retry = 1
+                await asyncio.gather(self.__read_commands(commands), self.__read_replies(replies), loop=self.bot.loop)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.warning("Command bus listener failed, retrying in %ss: %s" % (retry, e))
+            finally:
+                if sub is not None:
+                    sub.close()
+            await asyncio.sleep(retry)
+            retry = min(retry * 2, 60)
+
+    def close(self):
+        self.__task.cancel()
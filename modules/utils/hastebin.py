@@ -1,8 +1,15 @@
 import aiohttp
 
-async def post(content):
-    async with aiohttp.ClientSession() as session:
-        async with session.post("https://haste.nekobot.xyz/documents",
-                                data=content.encode('utf-8')) as response:
-            res = await response.json()
-            return f"https://haste.nekobot.xyz/{res['key']}"
\ No newline at end of file
+HASTE = "https://haste.nekobot.xyz"
+
+async def post(content, client=None):
+    """Upload content and return its url, client is the bot's http_client (or an aiohttp session for old callers)."""
+    if hasattr(client, "request") and hasattr(client, "upstreams"):
+        res = await client.request("POST", HASTE + "/documents", data=content.encode('utf-8'))
+        return f"{HASTE}/{res['key']}"
+    if client is None:
+        async with aiohttp.ClientSession() as session:
+            return await post(content, session)
+    async with client.post(HASTE + "/documents", data=content.encode('utf-8')) as response:
+        res = await response.json()
+        return f"{HASTE}/{res['key']}"
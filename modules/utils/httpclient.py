@@ -0,0 +1,205 @@
+import aiohttp
+import asyncio
+import logging
+import time
+from collections import Counter, defaultdict, deque, namedtuple
+from yarl import URL
+
+import ujson
+
+from .upstream import Upstreams
+
+log = logging.getLogger()
+
+class Response(namedtuple("Response", "status headers url body")):
+    """What request(read="response") returns, for callers that need more than the body."""
+
+    def text(self):
+        return self.body.decode("utf-8", errors="replace")
+
+    def json(self):
+        return ujson.loads(self.body)
+
+class HTTPClient:
+    """Shared, pooled aiohttp client used by every cog.
+
+    One connector per process so TCP/TLS connections and DNS lookups get reused
+    across commands instead of being rebuilt for every ClientSession.
+
+    request() also goes through the upstream gateway: a per-host token bucket,
+    a circuit breaker that fails fast once a host keeps failing, a timeout
+    adapted from the host's observed p95 and, for GETs with hedge=True, a
+    second attempt when the first one is slower than that p95."""
+
+    def __init__(self, loop, *, limit: int = 200, limit_per_host: int = 30, dns_ttl: int = 300,
+                 keepalive: float = 30.0, timeout: float = 30.0, user_agent: str = "NekoBot/4.2.0",
+                 upstream_limits: dict = None):
+        self.loop = loop
+        self.counter = Counter()
+        self.latencies = defaultdict(lambda: deque(maxlen=250))
+        self.upstreams = Upstreams(limits=upstream_limits, timeout=timeout, max_timeout=timeout)
+
+        self.connector = aiohttp.TCPConnector(loop=loop,
+                                              limit=limit,
+                                              limit_per_host=limit_per_host,
+                                              use_dns_cache=True,
+                                              ttl_dns_cache=dns_ttl,
+                                              keepalive_timeout=keepalive,
+                                              enable_cleanup_closed=True)
+
+        trace = aiohttp.TraceConfig()
+        trace.on_request_start.append(self.__on_request_start)
+        trace.on_request_end.append(self.__on_request_end)
+        trace.on_request_exception.append(self.__on_request_exception)
+        trace.on_connection_create_end.append(self.__on_connection_create)
+        trace.on_connection_reuseconn.append(self.__on_connection_reuse)
+        trace.on_dns_cache_hit.append(self.__on_dns_hit)
+        trace.on_dns_cache_miss.append(self.__on_dns_miss)
+
+        self.session = aiohttp.ClientSession(loop=loop,
+                                             connector=self.connector,
+                                             headers={"User-Agent": user_agent},
+                                             timeout=aiohttp.ClientTimeout(total=timeout),
+                                             trace_configs=[trace])
+
+    # Tracing
+
+    async def __on_request_start(self, session, ctx, params):
+        ctx.start = time.perf_counter()
+        self.counter["requests"] += 1
+
+    async def __on_request_end(self, session, ctx, params):
+        host = params.url.host
+        self.latencies[host].append((time.perf_counter() - ctx.start) * 1000)
+        self.counter["responses"] += 1
+
+    async def __on_request_exception(self, session, ctx, params):
+        self.counter["errors"] += 1
+
+    async def __on_connection_create(self, session, ctx, params):
+        self.counter["connections_created"] += 1
+
+    async def __on_connection_reuse(self, session, ctx, params):
+        self.counter["connections_reused"] += 1
+
+    async def __on_dns_hit(self, session, ctx, params):
+        self.counter["dns_hits"] += 1
+
+    async def __on_dns_miss(self, session, ctx, params):
+        self.counter["dns_misses"] += 1
+
+    # Requests
+
+    async def __attempt(self, method: str, url: str, read: str, kwargs: dict):
+        async with self.session.request(method, url, **kwargs) as r:
+            if read == "json":
+                body = await r.json()
+            elif read == "bytes":
+                body = await r.read()
+            elif read == "response":
+                body = Response(r.status, r.headers, r.url, await r.read())
+            else:
+                body = await r.text()
+            return r.status, body
+
+    async def __hedged(self, upstream, method: str, url: str, read: str, kwargs: dict):
+        first = self.loop.create_task(self.__attempt(method, url, read, kwargs))
+        done, _ = await asyncio.wait([first], timeout=upstream.hedge_delay(), loop=self.loop)
+        if done or not upstream.bucket.try_acquire():
+            return await first
+
+        upstream.counter["hedged"] += 1
+        pending = {first, self.loop.create_task(self.__attempt(method, url, read, kwargs))}
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED, loop=self.loop)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def request(self, method: str, url: str, *, read: str = "json", hedge: bool = False, **kwargs):
+        """Make a request on the shared pool and return the body, read as json, bytes or text.
+
+        read="response" returns a Response with the status, headers and final url as well.
+
+        Raises CircuitOpen or RateLimited from the gateway without touching the network."""
+        upstream = await self.upstreams.admit(URL(url).host)
+        kwargs.setdefault("timeout", aiohttp.ClientTimeout(total=upstream.timeout()))
+        start = time.perf_counter()
+        try:
+            if hedge and method == "GET":
+                status, body = await self.__hedged(upstream, method, url, read, kwargs)
+            else:
+                status, body = await self.__attempt(method, url, read, kwargs)
+        except asyncio.CancelledError:
+            upstream.breaker.cancelled()
+            raise
+        except Exception:
+            upstream.failure()
+            raise
+        if status >= 500 or status == 429:
+            upstream.failure()
+        else:
+            upstream.success(time.perf_counter() - start)
+        return body
+
+    def upstream_stats(self):
+        return self.upstreams.stats()
+
+    async def get_json(self, url: str, **kwargs):
+        return await self.request("GET", url, read="json", **kwargs)
+
+    async def get_bytes(self, url: str, **kwargs):
+        return await self.request("GET", url, read="bytes", **kwargs)
+
+    async def get_text(self, url: str, **kwargs):
+        return await self.request("GET", url, read="text", **kwargs)
+
+    async def post_json(self, url: str, **kwargs):
+        return await self.request("POST", url, read="json", **kwargs)
+
+    # Metrics
+
+    def open_connections(self):
+        acquired = len(getattr(self.connector, "_acquired", ()))
+        idle = sum(len(x) for x in getattr(self.connector, "_conns", {}).values())
+        return acquired, idle
+
+    def stats(self):
+        acquired, idle = self.open_connections()
+        created = self.counter["connections_created"]
+        reused = self.counter["connections_reused"]
+        hosts = {}
+        for host, samples in self.latencies.items():
+            if not samples:
+                continue
+            ordered = sorted(samples)
+            hosts[host] = {
+                "count": len(ordered),
+                "avg": round(sum(ordered) / len(ordered), 2),
+                "p50": round(ordered[len(ordered) // 2], 2),
+                "p95": round(ordered[min(len(ordered) - 1, int(len(ordered) * .95))], 2)
+            }
+        return {
+            "active": acquired,
+            "idle": idle,
+            "requests": self.counter["requests"],
+            "errors": self.counter["errors"],
+            "connections_created": created,
+            "connections_reused": reused,
+            "reuse_ratio": round(reused / (created + reused), 3) if (created + reused) else 0.0,
+            "dns_hits": self.counter["dns_hits"],
+            "dns_misses": self.counter["dns_misses"],
+            "hosts": hosts
+        }
+
+    async def close(self):
+        if not self.session.closed:
+            await self.session.close()
+        log.info("Closed HTTP pool, %s requests served" % self.counter["requests"])
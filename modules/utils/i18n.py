@@ -0,0 +1,90 @@
+import logging
+import os
+
+import ujson
+
+log = logging.getLogger()
+
+LANGUAGES = ["english", "weeb", "tsundere", "polish", "spanish", "french"]
+DEFAULT = "english"
+
+def flatten(data: dict, prefix: str = ""):
+    """{"a": {"b": "x"}} -> {"a.b": "x"}"""
+    flat = {}
+    for key, value in data.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, prefix + key + "."))
+        else:
+            flat[prefix + key] = value
+    return flat
+
+class Catalog:
+    """Process-wide translation strings, loaded from lang/{language}.json on first use.
+
+    Nested keys are flattened to dotted keys ("general.info.stats") and each
+    string's bound str.format is kept so format() is one dict lookup and a
+    call. Only strings that differ from English are stored for the other
+    languages, anything missing falls back to English."""
+
+    def __init__(self, path: str = "lang"):
+        self.path = path
+        self.__strings = {}
+        self.__formats = {}
+
+    def __load(self, language: str):
+        with open(os.path.join(self.path, "%s.json" % language), encoding="utf-8") as f:
+            strings = flatten(ujson.load(f))
+        if language != DEFAULT:
+            english = self.__catalog(DEFAULT)
+            strings = {k: v for k, v in strings.items() if english.get(k) != v}
+        self.__strings[language] = strings
+        self.__formats[language] = {k: v.format for k, v in strings.items()}
+        return strings
+
+    def __catalog(self, language: str):
+        strings = self.__strings.get(language)
+        if strings is None:
+            strings = self.__load(language)
+        return strings
+
+    def __resolve(self, language: str):
+        return language if language in LANGUAGES else DEFAULT
+
+    def get(self, language: str, key: str):
+        """The string for key, falling back to English, then to the key itself."""
+        language = self.__resolve(language)
+        value = self.__catalog(language).get(key)
+        if value is None and language != DEFAULT:
+            value = self.__catalog(DEFAULT).get(key)
+        if value is None:
+            log.warning("Missing translation %s" % key)
+            return key
+        return value
+
+    def format(self, language: str, key: str, *args, **kwargs):
+        language = self.__resolve(language)
+        self.__catalog(language)
+        fmt = self.__formats[language].get(key)
+        if fmt is None and language != DEFAULT:
+            self.__catalog(DEFAULT)
+            fmt = self.__formats[DEFAULT].get(key)
+        if fmt is None:
+            log.warning("Missing translation %s" % key)
+            return key
+        return fmt(*args, **kwargs)
+
+    def reload(self, language: str = None):
+        """Drop loaded strings so they're read from disk again on next use.
+
+        Reloading English drops everything since the others are stored as diffs against it."""
+        if language is None or language == DEFAULT:
+            self.__strings.clear()
+            self.__formats.clear()
+        else:
+            self.__strings.pop(language, None)
+            self.__formats.pop(language, None)
+
+    def loaded(self):
+        return {language: len(strings) for language, strings in self.__strings.items()}
+
+catalog = Catalog()
@@ -0,0 +1,110 @@
+import asyncio
+import logging
+import math
+from collections import Counter, deque
+
+log = logging.getLogger()
+
+class ImagePool:
+    """Background-filled pools of ready (color, url) pairs, one per image type.
+
+    Every `interval` seconds each type's usage rate is folded into an
+    exponential moving average and its target size becomes enough images for
+    `horizon` seconds at that rate (between min_size and max_size). A pool is
+    topped back up to its target once it drops to half of it, so busy types
+    keep a deep pool and unused ones only hold a couple. get() pops from the
+    pool and only falls back to a live fetch when it's empty."""
+
+    def __init__(self, loop, *, interval: float = 10.0, horizon: float = 60.0, min_size: int = 2,
+                 max_size: int = 50, concurrency: int = 4, alpha: float = 0.3):
+        self.loop = loop
+        self.interval = interval
+        self.horizon = horizon
+        self.min_size = min_size
+        self.max_size = max_size
+        self.alpha = alpha
+        self.counter = Counter()
+        self.__fetchers = {}
+        self.__pools = {}
+        self.__uses = Counter()
+        self.__rates = {}
+        self.__refilling = set()
+        self.__slots = asyncio.Semaphore(concurrency, loop=loop)
+        self.__task = None
+
+    def register(self, name: str, fetch):
+        """Add a type, fetch is a coroutine function returning one (color, url) pair."""
+        if name not in self.__fetchers:
+            self.__fetchers[name] = fetch
+            self.__pools[name] = deque(maxlen=self.max_size)
+            self.__rates[name] = 0.0
+
+    def target(self, name: str):
+        return max(self.min_size, min(self.max_size, math.ceil(self.__rates.get(name, 0) * self.horizon)))
+
+    async def get(self, name: str):
+        self.__uses[name] += 1
+        pool = self.__pools.get(name)
+        if pool:
+            self.counter["hits"] += 1
+            if len(pool) <= self.target(name) // 2:
+                self.__schedule(name)
+            return pool.popleft()
+        self.counter["misses"] += 1
+        if name in self.__fetchers:
+            self.__schedule(name)
+            return await self.__fetchers[name]()
+        raise KeyError(name)
+
+    def __schedule(self, name: str):
+        if name not in self.__refilling:
+            self.__refilling.add(name)
+            self.loop.create_task(self.__refill(name))
+
+    async def __fetch_one(self, name: str):
+        async with self.__slots:
+            try:
+                self.__pools[name].append(await self.__fetchers[name]())
+                self.counter["fetched"] += 1
+            except Exception as e:
+                self.counter["errors"] += 1
+                log.warning("Failed to prefetch %s: %s" % (name, e))
+
+    async def __refill(self, name: str):
+        try:
+            missing = self.target(name) - len(self.__pools[name])
+            if missing > 0:
+                await asyncio.gather(*[self.__fetch_one(name) for _ in range(missing)], loop=self.loop)
+        finally:
+            self.__refilling.discard(name)
+
+    def __update_rates(self):
+        for name in self.__fetchers:
+            rate = self.__uses.pop(name, 0) / self.interval
+            self.__rates[name] = self.alpha * rate + (1 - self.alpha) * self.__rates[name]
+
+    async def __loop(self):
+        while True:
+            self.__update_rates()
+            for name, pool in self.__pools.items():
+                if len(pool) <= self.target(name) // 2:
+                    self.__schedule(name)
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self.__task is None:
+            self.__task = self.loop.create_task(self.__loop())
+
+    def stats(self):
+        return {
+            "types": len(self.__pools),
+            "ready": sum(len(x) for x in self.__pools.values()),
+            "hits": self.counter["hits"],
+            "misses": self.counter["misses"],
+            "fetched": self.counter["fetched"],
+            "errors": self.counter["errors"]
+        }
+
+    def close(self):
+        if self.__task is not None:
+            self.__task.cancel()
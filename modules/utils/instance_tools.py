@@ -1,55 +1,41 @@
+from .stats import instance_key, LATENCY_KEY
+
 class InstanceTools:
 
     def __init__(self, instances, redis_conn):
         self.instances = instances
         self.redis_conn = redis_conn
 
-    async def get_all_guilds(self):
-
-        guilds = 0
+    async def get_all_stats(self):
+        """Sum every instance's stats hash, read with one pipelined HGETALL per instance."""
 
-        for x in range(self.instances):
-            z = int((await self.redis_conn.get("instance%s-guilds" % x)).decode("utf8"))
-            guilds += z
+        tr = self.redis_conn.pipeline()
+        futures = [tr.hgetall(instance_key(x), encoding="utf8") for x in range(self.instances)]
+        await tr.execute()
 
-        return guilds
+        totals = {"guilds": 0, "users": 0, "channels": 0, "messages": 0, "commands": 0}
+        for future in futures:
+            data = await future
+            for key in totals:
+                totals[key] += int(data.get(key, 0))
 
-    async def get_all_users(self):
+        return totals
 
-        users = 0
+    async def get_latencies(self):
+        data = await self.redis_conn.hgetall(LATENCY_KEY, encoding="utf8")
+        return sorted((int(shard), float(latency)) for shard, latency in data.items())
 
-        for x in range(self.instances):
-            z = int((await self.redis_conn.get("instance%s-users" % x)).decode("utf8"))
-            users += z
+    async def get_all_guilds(self):
+        return (await self.get_all_stats())["guilds"]
 
-        return users
+    async def get_all_users(self):
+        return (await self.get_all_stats())["users"]
 
     async def get_all_messages(self):
-
-        msgs = 0
-
-        for x in range(self.instances):
-            z = int((await self.redis_conn.get("instance%s-messages" % x)).decode("utf8"))
-            msgs += z
-
-        return msgs
+        return (await self.get_all_stats())["messages"]
 
     async def get_all_commands(self):
-
-        commands = 0
-
-        for x in range(self.instances):
-            z = int((await self.redis_conn.get("instance%s-commands" % x)).decode("utf8"))
-            commands += z
-
-        return commands
+        return (await self.get_all_stats())["commands"]
 
     async def get_all_channels(self):
-
-        channels = 0
-
-        for x in range(self.instances):
-            z = int((await self.redis_conn.get("instance%s-channels" % x)).decode("utf8"))
-            channels += z
-
-        return channels
+        return (await self.get_all_stats())["channels"]
@@ -0,0 +1,69 @@
+import asyncio
+import logging
+from collections import Counter
+
+log = logging.getLogger()
+
+class JoinQueue:
+    """Per-guild queue for member join work.
+
+    The first join in a quiet guild is handled right away. After that the
+    guild's worker waits `window` seconds between batches, so during a raid
+    or invite wave every join that arrived in the meantime reaches the
+    handler as one list and the handler can coalesce them. Each guild keeps
+    at most `max_pending` joins (oldest dropped), joins older than
+    `stale_after` or for members that already left are dropped, and at most
+    `concurrency` guilds run the handler at once.
+
+    handler is a coroutine taking (guild, members)."""
+
+    def __init__(self, loop, handler, *, window: float = 2.0, max_pending: int = 100,
+                 stale_after: float = 60.0, concurrency: int = 4):
+        self.loop = loop
+        self.handler = handler
+        self.window = window
+        self.max_pending = max_pending
+        self.stale_after = stale_after
+        self.counter = Counter()
+        self.__pending = {}
+        self.__workers = {}
+        self.__slots = asyncio.Semaphore(concurrency, loop=loop)
+
+    def push(self, member):
+        guild = member.guild
+        pending = self.__pending.setdefault(guild.id, [])
+        pending.append((member, self.loop.time()))
+        self.counter["joins"] += 1
+        if len(pending) > self.max_pending:
+            self.counter["dropped"] += len(pending) - self.max_pending
+            del pending[:len(pending) - self.max_pending]
+        if guild.id not in self.__workers:
+            self.__workers[guild.id] = self.loop.create_task(self.__worker(guild))
+
+    def __fresh(self, guild, batch):
+        now = self.loop.time()
+        members = [member for member, joined in batch
+                   if now - joined <= self.stale_after and guild.get_member(member.id) is not None]
+        self.counter["stale"] += len(batch) - len(members)
+        return members
+
+    async def __worker(self, guild):
+        try:
+            while self.__pending.get(guild.id):
+                members = self.__fresh(guild, self.__pending.pop(guild.id))
+                if members:
+                    async with self.__slots:
+                        self.counter["batches"] += 1
+                        try:
+                            await self.handler(guild, members)
+                        except Exception as e:
+                            log.warning("Join handler failed for %s: %s" % (guild.id, e))
+                await asyncio.sleep(self.window)
+        finally:
+            self.__workers.pop(guild.id, None)
+
+    def close(self):
+        for task in self.__workers.values():
+            task.cancel()
+        self.__workers.clear()
+        self.__pending.clear()
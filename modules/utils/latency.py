@@ -0,0 +1,186 @@
+import asyncio
+import logging
+import time
+from collections import Counter, defaultdict
+
+from discord.ext import commands
+
+log = logging.getLogger()
+
+# Upper bounds in ms, the last bucket catches everything slower
+BUCKETS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, float("inf")]
+RESULTS = ("ok", "err", "rejected")
+
+def minute_key(minute: int):
+    return "latency:%s" % minute
+
+def bucket(ms: float):
+    for i, bound in enumerate(BUCKETS):
+        if ms <= bound:
+            return i
+    return len(BUCKETS) - 1
+
+def percentile(buckets: list, q: float):
+    """Estimate the q quantile in ms from bucket counts, interpolating inside a bucket."""
+    total = sum(buckets)
+    if not total:
+        return 0
+    rank = q * total
+    seen = 0
+    for i, count in enumerate(buckets):
+        if seen + count >= rank and count:
+            low = BUCKETS[i - 1] if i else 0
+            high = BUCKETS[i] if BUCKETS[i] != float("inf") else low * 2
+            return round(low + (high - low) * (rank - seen) / count, 2)
+        seen += count
+    return BUCKETS[-2]
+
+class CommandLatency:
+    """Per command latency histograms, merged across instances in Redis.
+
+    A command is timed from on_command to on_command_completion or
+    on_command_error. Every instance adds its counts to per minute Redis
+    hashes (latency:{minute}, fields "{command}|{bucket}", "{command}|ok",
+    ...) with HINCRBY every `interval` seconds, so a window is just the sum
+    of the last N minute hashes whichever instance reads it. Errors from
+    checks, cooldowns and bad arguments count as rejected, not err.
+
+    With `port` set, instance 0 serves the 5 minute window as Prometheus
+    text on http://127.0.0.1:{port}/metrics."""
+
+    def __init__(self, bot, *, interval: int = 15, retention: int = 7200, port: int = None):
+        self.bot = bot
+        self.interval = interval
+        self.retention = retention
+        self.port = port
+        self.__pending = defaultdict(Counter)
+        self.__task = None
+        self.__runner = None
+
+    def started(self, ctx):
+        ctx._latency_start = time.perf_counter()
+
+    def finished(self, ctx, error: Exception = None):
+        start = getattr(ctx, "_latency_start", None)
+        if start is None or ctx.command is None:
+            return
+        del ctx._latency_start
+        ms = (time.perf_counter() - start) * 1000
+        if error is None:
+            result = "ok"
+        elif isinstance(error, commands.CommandInvokeError):
+            result = "err"
+        else:
+            result = "rejected"
+        name = ctx.command.qualified_name
+        pending = self.__pending[int(time.time() // 60)]
+        pending["%s|%s" % (name, bucket(ms))] += 1
+        pending["%s|%s" % (name, result)] += 1
+        pending["%s|ms" % name] += int(ms)
+
+    async def flush(self):
+        if not self.__pending:
+            return
+        pending, self.__pending = self.__pending, defaultdict(Counter)
+        tr = self.bot.redis.pipeline()
+        for minute, fields in pending.items():
+            key = minute_key(minute)
+            for field, value in fields.items():
+                tr.hincrby(key, field, value)
+            tr.expire(key, self.retention)
+        await tr.execute()
+
+    async def window(self, minutes: int = 5):
+        """{command: {"buckets": [...], "ok", "err", "rejected", "ms"}} over the last `minutes`, all instances."""
+        now = int(time.time() // 60)
+        tr = self.bot.redis.pipeline()
+        futures = [tr.hgetall(minute_key(minute), encoding="utf-8") for minute in range(now - minutes + 1, now + 1)]
+        await tr.execute()
+
+        merged = defaultdict(lambda: {"buckets": [0] * len(BUCKETS), "ok": 0, "err": 0, "rejected": 0, "ms": 0})
+        for future in futures:
+            for field, value in (await future).items():
+                name, _, kind = field.rpartition("|")
+                if kind.isdigit():
+                    merged[name]["buckets"][int(kind)] += int(value)
+                else:
+                    merged[name][kind] += int(value)
+        return dict(merged)
+
+    async def summary(self, minutes: int = 5):
+        """Per command count, result counts and p50/p95/p99 in ms, slowest p95 first."""
+        await self.flush()
+        rows = []
+        for name, data in (await self.window(minutes)).items():
+            count = sum(data["buckets"])
+            rows.append({
+                "command": name,
+                "count": count,
+                "ok": data["ok"],
+                "err": data["err"],
+                "rejected": data["rejected"],
+                "avg": round(data["ms"] / count, 2) if count else 0,
+                "p50": percentile(data["buckets"], 0.5),
+                "p95": percentile(data["buckets"], 0.95),
+                "p99": percentile(data["buckets"], 0.99)
+            })
+        rows.sort(key=lambda x: x["p95"], reverse=True)
+        return rows
+
+    async def prometheus(self, minutes: int = 5):
+        lines = [
+            "# HELP nekobot_command_latency_seconds Command latency over the last %s minutes, all instances" % minutes,
+            "# TYPE nekobot_command_latency_seconds summary"
+        ]
+        results = []
+        for row in await self.summary(minutes):
+            command = row["command"].replace("\\", "\\\\").replace("\"", "\\\"")
+            for q in ("p50", "p95", "p99"):
+                lines.append("nekobot_command_latency_seconds{command=\"%s\",quantile=\"0.%s\"} %s" % (
+                    command, q[1:], row[q] / 1000))
+            lines.append("nekobot_command_latency_seconds_sum{command=\"%s\"} %s" % (
+                command, row["avg"] * row["count"] / 1000))
+            lines.append("nekobot_command_latency_seconds_count{command=\"%s\"} %s" % (command, row["count"]))
+            for result in RESULTS:
+                results.append("nekobot_command_results{command=\"%s\",result=\"%s\"} %s" % (
+                    command, result, row[result]))
+        lines += ["# HELP nekobot_command_results Command results over the last %s minutes, all instances" % minutes,
+                  "# TYPE nekobot_command_results gauge"] + results
+        return "\n".join(lines) + "\n"
+
+    async def __flush_loop(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                log.warning("Failed to flush command latencies: %s" % e)
+
+    async def __serve(self):
+        from aiohttp import web
+
+        async def metrics(request):
+            return web.Response(text=await self.prometheus(), content_type="text/plain")
+
+        app = web.Application()
+        app.router.add_get("/metrics", metrics)
+        self.__runner = web.AppRunner(app)
+        await self.__runner.setup()
+        await web.TCPSite(self.__runner, "127.0.0.1", self.port).start()
+        log.info("Serving command metrics on 127.0.0.1:%s" % self.port)
+
+    def start(self):
+        if self.__task is None:
+            self.__task = self.bot.loop.create_task(self.__flush_loop())
+            if self.port and self.bot.instance == 0:
+                self.bot.loop.create_task(self.__serve())
+
+    async def close(self):
+        if self.__task is not None:
+            self.__task.cancel()
+        if self.__runner is not None:
+            await self.__runner.cleanup()
+        try:
+            await self.flush()
+        except Exception as e:
+            log.warning("Failed to flush command latencies: %s" % e)
@@ -0,0 +1,201 @@
+import asyncio
+import logging
+import time
+
+import rethinkdb as r
+
+log = logging.getLogger()
+
+# board name -> (table, field)
+BOARDS = {
+    "balance": ("economy", "balance"),
+    "xp": ("levelSystem", "xp")
+}
+
+def name_key(user):
+    return "leaderboard:name:%s" % user
+
+# Swaps the rebuilt set in, then puts back the live score of everyone written
+# since the rebuild started, atomically so no write lands in between.
+# KEYS: live, rebuilt, touched   ARGV: rebuild start time
+SWAP_SCRIPT = """
+local users = redis.call('ZRANGEBYSCORE', KEYS[3], ARGV[1], '+inf')
+local live = {}
+for i, user in ipairs(users) do
+    live[i] = redis.call('ZSCORE', KEYS[1], user)
+end
+redis.call('RENAME', KEYS[2], KEYS[1])
+for i, user in ipairs(users) do
+    if live[i] then
+        redis.call('ZADD', KEYS[1], live[i], user)
+    end
+end
+redis.call('ZREMRANGEBYSCORE', KEYS[3], '-inf', '(' .. ARGV[1])
+return #users
+"""
+
+class Leaderboard:
+    """Economy/XP leaderboards kept in Redis sorted sets.
+
+    The ledger and the XP accumulator push new scores as they write them, so
+    top-N, pages and a user's rank are O(log n) Redis reads. One instance
+    rebuilds the sets from RethinkDB on a timer to pick up anything written
+    outside those paths, and until the first build the top page is read off
+    the balance/xp secondary indexes.
+
+    Every write also stamps the user in leaderboard:{board}:touched, so a
+    rebuild keeps scores written while it was scanning instead of replacing
+    them with its older snapshot. Resolved names expire after `name_ttl`."""
+
+    def __init__(self, bot, *, rebuild_interval: int = 3600, name_ttl: int = 86400):
+        self.bot = bot
+        self.rebuild_interval = rebuild_interval
+        self.name_ttl = name_ttl
+        self.__task = None
+
+    def __key(self, board: str):
+        return "leaderboard:%s" % board
+
+    async def update(self, board: str, user, score):
+        await self.update_many(board, {user: score})
+
+    async def update_many(self, board: str, scores: dict):
+        if not scores:
+            return
+        now = time.time()
+        pairs = []
+        touched = []
+        for user, score in scores.items():
+            pairs.extend((score, str(user)))
+            touched.extend((now, str(user)))
+        key = self.__key(board)
+        tr = self.bot.redis.pipeline()
+        tr.zadd(key, *pairs)
+        tr.zadd(key + ":touched", *touched)
+        await tr.execute()
+
+    async def page(self, board: str, page: int = 0, per_page: int = 10):
+        """Returns [(rank, user_id, score)] for a page, ranks start at 1."""
+        start = page * per_page
+        entries = await self.bot.redis.zrevrange(self.__key(board), start, start + per_page - 1, withscores=True)
+        if not entries and page == 0:
+            return await self.__page_from_index(board, per_page)
+        return [(start + i + 1, int(user), int(score)) for i, (user, score) in enumerate(entries)]
+
+    async def top(self, board: str, count: int = 10):
+        return await self.page(board, 0, count)
+
+    async def rank(self, board: str, user):
+        """Returns (rank, score) for a user or (None, 0) if they aren't ranked."""
+        key = self.__key(board)
+        tr = self.bot.redis.multi_exec()
+        tr.zrevrank(key, str(user))
+        tr.zscore(key, str(user))
+        rank, score = await tr.execute()
+        if rank is None:
+            return None, 0
+        return rank + 1, int(score)
+
+    async def size(self, board: str):
+        return await self.bot.redis.zcard(self.__key(board))
+
+    async def __page_from_index(self, board: str, count: int):
+        # Redis hasn't been built yet, read straight off the index instead of sorting the table
+        table, field = BOARDS[board]
+        try:
+            rows = await r.table(table).order_by(index=r.desc(field)).limit(count).pluck("id", field).run(self.bot.r_conn)
+        except r.ReqlOpFailedError:
+            # Only instance 0 creates the index, on a fresh deploy it may not exist yet
+            rows = await r.table(table).has_fields(field).pluck("id", field).order_by(r.desc(field)).limit(count).run(
+                self.bot.r_conn, array_limit=10000000)
+        return [(i + 1, int(row["id"]), int(row[field])) for i, row in enumerate(rows)]
+
+    async def names(self, users):
+        """Resolve user ids to name#discrim, using the client cache, then Redis, then the API."""
+        names = {}
+        missing = []
+        for user in users:
+            cached = self.bot.get_user(int(user))
+            if cached:
+                names[user] = str(cached)
+            else:
+                missing.append(user)
+        if missing:
+            stored = await self.bot.redis.mget(*[name_key(x) for x in missing])
+            fetch = []
+            for user, name in zip(missing, stored):
+                if name:
+                    names[user] = name.decode("utf8")
+                else:
+                    fetch.append(user)
+            if fetch:
+                fetched = await asyncio.gather(*[self.bot.get_user_info(int(x)) for x in fetch], return_exceptions=True)
+                new = {}
+                for user, result in zip(fetch, fetched):
+                    if isinstance(result, Exception):
+                        names[user] = "Unknown User"
+                    else:
+                        names[user] = new[str(user)] = str(result)
+                if new:
+                    tr = self.bot.redis.pipeline()
+                    for user, name in new.items():
+                        tr.setex(name_key(user), self.name_ttl, name)
+                    await tr.execute()
+        return names
+
+    async def ensure_indexes(self):
+        for table, field in BOARDS.values():
+            if field not in await r.table(table).index_list().run(self.bot.r_conn):
+                log.info("Creating %s index on %s" % (field, table))
+                await r.table(table).index_create(field).run(self.bot.r_conn)
+            await r.table(table).index_wait(field).run(self.bot.r_conn)
+
+    async def rebuild(self, board: str, chunk: int = 5000):
+        """Rebuild a board from the table into a temp key and swap it in."""
+        table, field = BOARDS[board]
+        key = self.__key(board)
+        temp = key + ":rebuild"
+        await self.bot.redis.delete(temp)
+        # A little early, so writes racing the start of the scan are kept too
+        started = time.time() - 5
+
+        cursor = await r.table(table).has_fields(field).pluck("id", field).run(self.bot.r_conn)
+        pairs = []
+        total = 0
+        while await cursor.fetch_next():
+            row = await cursor.next()
+            if not row.get(field):
+                continue
+            pairs.extend((int(row[field]), row["id"]))
+            if len(pairs) >= chunk * 2:
+                await self.bot.redis.zadd(temp, *pairs)
+                total += len(pairs) // 2
+                pairs = []
+        if pairs:
+            await self.bot.redis.zadd(temp, *pairs)
+            total += len(pairs) // 2
+
+        if total:
+            kept = await self.bot.redis.eval(SWAP_SCRIPT, keys=[key, temp, key + ":touched"], args=[started])
+            log.info("Rebuilt %s leaderboard with %s users, kept %s newer scores" % (board, total, kept))
+
+    async def __rebuild_loop(self):
+        try:
+            await self.ensure_indexes()
+        except Exception as e:
+            log.warning("Failed to create leaderboard indexes: %s" % e)
+        while True:
+            for board in BOARDS:
+                try:
+                    await self.rebuild(board)
+                except Exception as e:
+                    log.warning("Failed to rebuild %s leaderboard: %s" % (board, e))
+            await asyncio.sleep(self.rebuild_interval)
+
+    def start(self):
+        if self.__task is None:
+            self.__task = self.bot.loop.create_task(self.__rebuild_loop())
+
+    def close(self):
+        if self.__task is not None:
+            self.__task.cancel()
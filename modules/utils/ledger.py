@@ -0,0 +1,150 @@
+import logging
+import time
+import uuid
+
+import rethinkdb as r
+
+from . import activity
+
+log = logging.getLogger()
+
+class LedgerError(Exception):
+    """Raised when a ledger operation is refused.
+
+    reason is one of no_account, frozen, insufficient, cooldown,
+    receiver_no_account or receiver_frozen."""
+
+    def __init__(self, reason: str, remaining: int = 0):
+        super().__init__(reason)
+        self.reason = reason
+        self.remaining = remaining
+
+REASONS = ("receiver_no_account", "receiver_frozen", "no_account", "frozen", "insufficient", "cooldown")
+
+class Ledger:
+    """Economy balance changes as single server-side conditional updates.
+
+    Every check (account exists, frozen, enough balance, daily cooldown) runs
+    inside the update, so a command needs one round-trip and concurrent
+    commands can't spend the same balance twice."""
+
+    def __init__(self, bot, table: str = "economy", leaderboard=None):
+        self.bot = bot
+        self.table = table
+        self.leaderboard = leaderboard
+
+    async def __ranked(self, user, balance):
+        if self.leaderboard is not None:
+            try:
+                await self.leaderboard.update("balance", user, balance)
+            except Exception as e:
+                log.warning("Failed to update balance leaderboard: %s" % e)
+        return balance
+
+    def __result(self, result, prefix: str = ""):
+        if result.get("skipped"):
+            raise LedgerError(prefix + "no_account")
+        if result.get("errors"):
+            error = result.get("first_error", "")
+            for reason in REASONS:
+                if reason in error:
+                    raise LedgerError(reason if reason.startswith(prefix) else prefix + reason)
+            raise LedgerError(error)
+        return result["changes"][0]["new_val"]
+
+    async def balance(self, user:int):
+        return await r.table(self.table).get(str(user))["balance"].default(0).run(self.bot.r_conn)
+
+    async def debit(self, user:int, amount:int, *, bet: bool = False):
+        """Take amount from user if they can afford it, returns the new balance.
+
+        bet also records the time in betactivity."""
+        def update(row):
+            data = {"balance": row["balance"].sub(amount)}
+            if bet:
+                data["betactivity"] = activity.record(row["betactivity"], [int(time.time())])
+            return r.branch(
+                row["frozen"].default(False), r.error("frozen"),
+                row["balance"].lt(amount), r.error("insufficient"),
+                data
+            )
+        result = await r.table(self.table).get(str(user)).update(update, return_changes="always").run(self.bot.r_conn)
+        return await self.__ranked(user, self.__result(result)["balance"])
+
+    async def credit(self, user:int, amount:int):
+        """Give amount to user, returns the new balance."""
+        result = await r.table(self.table).get(str(user)).update(
+            {"balance": r.row["balance"].add(amount)}, return_changes="always"
+        ).run(self.bot.r_conn)
+        return await self.__ranked(user, self.__result(result)["balance"])
+
+    async def claim_daily(self, user:int, amount:int, cooldown: int = 86400):
+        """Credit the daily bonus and reset lastpayday if the cooldown has passed."""
+        now = int(time.time())
+        result = await r.table(self.table).get(str(user)).update(
+            lambda row: r.branch(
+                row["frozen"].default(False), r.error("frozen"),
+                row["lastpayday"].coerce_to("number").gt(now - cooldown), r.error("cooldown"),
+                {"balance": row["balance"].add(amount), "lastpayday": str(now)}
+            ),
+            return_changes="always"
+        ).run(self.bot.r_conn)
+        try:
+            return await self.__ranked(user, self.__result(result)["balance"])
+        except LedgerError as e:
+            if e.reason == "cooldown":
+                old = result["changes"][0].get("old_val") if result.get("changes") else None
+                if old is None:
+                    old = await r.table(self.table).get(str(user)).run(self.bot.r_conn)
+                e.remaining = cooldown - (now - int(old["lastpayday"]))
+            raise
+
+    async def transfer(self, sender:int, receiver:int, amount:int):
+        """Move amount from sender to receiver in one query.
+
+        The sender is debited conditionally first; if the receiver can't be
+        credited the debit is refunded in the same query. Both sides get a
+        new lasttransfer id so changefeed readers can tell transfers from
+        winnings. Returns the new (sender, receiver) balances."""
+        table = r.table(self.table)
+        sender, receiver = str(sender), str(receiver)
+        # Generated here, r.uuid() would make the updates non-deterministic and so non-atomic
+        marker = uuid.uuid4().hex
+
+        debit = table.get(sender).update(
+            lambda row: r.branch(
+                row["frozen"].default(False), r.error("frozen"),
+                row["balance"].lt(amount), r.error("insufficient"),
+                {"balance": row["balance"].sub(amount), "lasttransfer": marker}
+            ),
+            return_changes="always"
+        )
+
+        def credit(debited):
+            return table.get(receiver).update(
+                lambda row: r.branch(
+                    row["frozen"].default(False), r.error("receiver_frozen"),
+                    {"balance": row["balance"].add(amount), "lasttransfer": marker}
+                ),
+                return_changes="always"
+            ).do(lambda credited: r.branch(
+                credited["replaced"].eq(1),
+                {"debit": debited, "credit": credited},
+                table.get(sender).update(lambda row: {"balance": row["balance"].add(amount),
+                                                      "lasttransfer": marker + ":refund"}).do(
+                    lambda refund: {"debit": debited, "credit": credited, "refunded": True}
+                )
+            ))
+
+        result = await debit.do(lambda debited: r.branch(
+            debited["replaced"].eq(1), credit(debited), {"debit": debited}
+        )).run(self.bot.r_conn)
+
+        sender_balance = self.__result(result["debit"])["balance"]
+        if result.get("refunded"):
+            self.__result(result["credit"], "receiver_")
+            raise LedgerError("receiver_no_account")
+        receiver_balance = self.__result(result["credit"], "receiver_")["balance"]
+        await self.__ranked(sender, sender_balance)
+        await self.__ranked(receiver, receiver_balance)
+        return sender_balance, receiver_balance
@@ -0,0 +1,142 @@
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter, defaultdict, deque
+
+import ujson
+
+log = logging.getLogger()
+
+MODULES = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+UTILS = os.path.join(MODULES, "utils")
+ROOT = os.path.dirname(MODULES)
+
+def looplag_key(instance: int):
+    return "looplag:%s" % instance
+
+def attribute(stack: list):
+    """Name the code responsible for a stack: the innermost cog frame, else the innermost frame of ours.
+
+    A cog frame is the command or listener itself, e.g. general.whatanime,
+    even when the blocking call is further down in a util or a library."""
+    for frame in reversed(stack):
+        if frame.filename.startswith(MODULES) and not frame.filename.startswith(UTILS):
+            return "%s.%s" % (os.path.basename(frame.filename)[:-3], frame.name)
+    for frame in reversed(stack):
+        if frame.filename.startswith(ROOT):
+            return "%s.%s" % (os.path.basename(frame.filename)[:-3], frame.name)
+    frame = stack[-1]
+    return "%s:%s" % (os.path.basename(frame.filename), frame.name)
+
+class LoopLagMonitor:
+    """Measures event loop scheduling delay and names whatever blocks it.
+
+    A callback scheduled every `interval` seconds records how late it ran.
+    A watchdog thread checks that callback's heartbeat and, once the loop
+    has been stuck for `threshold` seconds, grabs the loop thread's current
+    stack with sys._current_frames() - that is the blocking call, still
+    running. When the loop comes back the stall is charged to the command
+    or listener on that stack (see attribute()). Costs one callback per
+    interval and one thread wakeup per threshold/2."""
+
+    def __init__(self, bot, *, interval: float = 0.1, threshold: float = 0.25, samples: int = 600,
+                 export_interval: int = 60, top: int = 10):
+        self.bot = bot
+        self.interval = interval
+        self.threshold = threshold
+        self.export_interval = export_interval
+        self.top = top
+        self.lags = deque(maxlen=samples)
+        self.stalls = Counter()
+        self.blocked = defaultdict(float)
+        self.stacks = {}
+        self.__last = None
+        self.__captured = None
+        self.__pending = None
+        self.__handle = None
+        self.__thread = None
+        self.__thread_id = None
+        self.__stopped = threading.Event()
+        self.__task = None
+
+    def __tick(self):
+        now = time.monotonic()
+        last = self.__last
+        self.lags.append(max(now - last - self.interval, 0))
+        self.__last = now
+
+        pending = self.__pending
+        if pending is not None and pending[0] == last:
+            self.__pending = None
+            self.__record(pending[1], now - last)
+        self.__handle = self.bot.loop.call_later(self.interval, self.__tick)
+
+    def __record(self, stack: list, duration: float):
+        name = attribute(stack)
+        self.stalls[name] += 1
+        self.blocked[name] += duration
+        self.stacks[name] = "".join(traceback.format_list(stack[-8:]))
+        log.warning("Event loop blocked for %.2fs by %s" % (duration, name))
+
+    def __watch(self):
+        while not self.__stopped.wait(self.threshold / 2):
+            last = self.__last
+            if time.monotonic() - last < self.threshold or self.__captured == last:
+                continue
+            self.__captured = last
+            frame = sys._current_frames().get(self.__thread_id)
+            if frame is not None:
+                self.__pending = (last, traceback.extract_stack(frame))
+
+    def percentile(self, q: float):
+        if not self.lags:
+            return 0
+        lags = sorted(self.lags)
+        return lags[min(int(q * len(lags)), len(lags) - 1)]
+
+    def report(self):
+        """Lag percentiles in ms and the top offenders by time blocked."""
+        offenders = sorted(self.blocked.items(), key=lambda x: x[1], reverse=True)[:self.top]
+        return {
+            "p50": round(self.percentile(0.5) * 1000, 2),
+            "p99": round(self.percentile(0.99) * 1000, 2),
+            "max": round(max(self.lags, default=0) * 1000, 2),
+            "offenders": [{"name": name,
+                           "stalls": self.stalls[name],
+                           "blocked": round(blocked, 2),
+                           "stack": self.stacks[name]} for name, blocked in offenders]
+        }
+
+    async def export(self):
+        await self.bot.redis.hmset_dict(looplag_key(self.bot.instance),
+                                        {k: ujson.dumps(v) for k, v in self.report().items()})
+
+    async def __export_loop(self):
+        while True:
+            await asyncio.sleep(self.export_interval)
+            try:
+                await self.export()
+            except Exception as e:
+                log.warning("Failed to export loop lag: %s" % e)
+
+    def start(self):
+        """Start monitoring, must be called from the loop's thread."""
+        if self.__thread is not None:
+            return
+        self.__thread_id = threading.get_ident()
+        self.__last = time.monotonic()
+        self.__handle = self.bot.loop.call_later(self.interval, self.__tick)
+        self.__thread = threading.Thread(target=self.__watch, name="looplag", daemon=True)
+        self.__thread.start()
+        self.__task = self.bot.loop.create_task(self.__export_loop())
+
+    def close(self):
+        self.__stopped.set()
+        if self.__handle is not None:
+            self.__handle.cancel()
+        if self.__task is not None:
+            self.__task.cancel()
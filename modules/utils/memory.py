@@ -0,0 +1,135 @@
+import asyncio
+import logging
+import random
+import sys
+import tracemalloc
+from collections import Counter, defaultdict
+
+import psutil
+import ujson
+
+log = logging.getLogger()
+
+def memory_key(instance: int):
+    return "memory:%s" % instance
+
+def sizeof(obj):
+    """Shallow size of obj plus its __slots__/__dict__ values, good enough to compare object types."""
+    size = sys.getsizeof(obj)
+    for cls in type(obj).__mro__:
+        for slot in getattr(cls, "__slots__", ()):
+            value = getattr(obj, slot, None)
+            if value is not None:
+                size += sys.getsizeof(value)
+    if hasattr(obj, "__dict__"):
+        size += sum(sys.getsizeof(v) for v in obj.__dict__.values())
+    return size
+
+def estimate(sample: list, count: int):
+    """Average sizeof() of the sample times count."""
+    if not sample or not count:
+        return 0
+    return int(sum(sizeof(x) for x in sample) / len(sample) * count)
+
+class MemoryMonitor:
+    """Where the cache memory goes.
+
+    snapshot() counts cached guilds, members, channels and messages per
+    shard and estimates bytes per object type from a sample. With
+    tracemalloc_frames set, tracemalloc runs and each snapshot also holds
+    the top allocation diffs since the previous one. The monitor exports
+    its snapshot to the memory:{instance} Redis hash every interval."""
+
+    def __init__(self, bot, *, interval: int = 300, tracemalloc_frames: int = 0, top: int = 10):
+        self.bot = bot
+        self.interval = interval
+        self.top = top
+        self.process = psutil.Process()
+        self.last = None
+        self.__trace = None
+        self.__task = None
+        if tracemalloc_frames:
+            tracemalloc.start(tracemalloc_frames)
+
+    def __messages(self):
+        return list(getattr(self.bot._connection, "_messages", None) or ())
+
+    def counts(self, samples: int = 50):
+        """Per shard counts, plus totals and a random sample of each object type."""
+        shards = defaultdict(Counter)
+        totals = Counter()
+        guilds = self.bot.guilds
+        for guild in guilds:
+            shard = shards[guild.shard_id]
+            shard["guilds"] += 1
+            shard["members"] += len(guild._members)
+            shard["channels"] += len(guild._channels)
+        messages = self.__messages()
+        for message in messages:
+            guild = getattr(message, "guild", None)
+            shards[guild.shard_id if guild else None]["messages"] += 1
+        for shard in shards.values():
+            totals.update(shard)
+
+        # Sample from a handful of guilds rather than listing every cached member
+        picked = random.sample(guilds, min(20, len(guilds)))
+        members = [m for g in picked for m in g.members]
+        channels = [c for g in picked for c in g.channels]
+        sample = {
+            "guilds": picked,
+            "members": random.sample(members, min(samples, len(members))),
+            "channels": random.sample(channels, min(samples, len(channels))),
+            "messages": random.sample(messages, min(samples, len(messages)))
+        }
+        return shards, totals, sample
+
+    def allocations(self):
+        """Top tracemalloc diffs since the last call, empty when tracemalloc is off."""
+        if not tracemalloc.is_tracing():
+            return []
+        trace = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>")
+        ))
+        if self.__trace is None:
+            stats = trace.statistics("lineno")
+        else:
+            stats = trace.compare_to(self.__trace, "lineno")
+        self.__trace = trace
+        return [{"where": str(stat.traceback[0]),
+                 "size": stat.size,
+                 "diff": getattr(stat, "size_diff", stat.size),
+                 "count": stat.count} for stat in stats[:self.top]]
+
+    def snapshot(self):
+        shards, totals, sample = self.counts()
+        self.last = {
+            "rss": self.process.memory_info().rss,
+            "shards": {str(k): dict(v) for k, v in shards.items()},
+            "estimated": {name: {"count": totals[name], "bytes": estimate(items, totals[name])}
+                          for name, items in sample.items()},
+            "allocations": self.allocations()
+        }
+        return self.last
+
+    async def export(self):
+        data = self.snapshot()
+        await self.bot.redis.hmset_dict(memory_key(self.bot.instance), {k: ujson.dumps(v) for k, v in data.items()})
+
+    async def __export_loop(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.export()
+            except Exception as e:
+                log.warning("Failed to export memory stats: %s" % e)
+
+    def start(self):
+        if self.__task is None:
+            self.__task = self.bot.loop.create_task(self.__export_loop())
+
+    def close(self):
+        if self.__task is not None:
+            self.__task.cancel()
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
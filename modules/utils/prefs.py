@@ -0,0 +1,123 @@
+import asyncio
+import logging
+import time
+from collections import Counter, OrderedDict
+
+import aioredis
+
+log = logging.getLogger()
+
+CHANNEL = "prefs:invalidate"
+MISSING = object()
+
+class PreferenceCache:
+    """In-process TTL + LRU cache for per-user Redis preferences ({id}-prefix, {id}-lang).
+
+    Unset preferences are cached too, so the common case of a user without a
+    custom prefix never leaves the process. Writes go through set()/delete()
+    which publish on CHANNEL so every instance drops its copy."""
+
+    def __init__(self, bot, *, maxsize: int = 50000, ttl: int = 600, address=("localhost", 6379)):
+        self.bot = bot
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.address = address
+        self.counter = Counter()
+        self.__cache = OrderedDict()
+        self.__task = bot.loop.create_task(self.__listen())
+
+    def __key(self, user_id, name: str):
+        return f"{user_id}-{name}"
+
+    def __store(self, key: str, value):
+        self.__cache[key] = (value, time.monotonic() + self.ttl)
+        self.__cache.move_to_end(key)
+        while len(self.__cache) > self.maxsize:
+            self.__cache.popitem(last=False)
+            self.counter["evictions"] += 1
+
+    def __lookup(self, key: str):
+        entry = self.__cache.get(key)
+        if entry is None:
+            return MISSING
+        value, expires = entry
+        if expires < time.monotonic():
+            del self.__cache[key]
+            self.counter["expired"] += 1
+            return MISSING
+        self.__cache.move_to_end(key)
+        return value
+
+    async def get(self, user_id, name: str):
+        key = self.__key(user_id, name)
+        value = self.__lookup(key)
+        if value is not MISSING:
+            self.counter["hits"] += 1
+            return value
+        self.counter["misses"] += 1
+        value = await self.bot.redis.get(key)
+        if value is not None:
+            value = value.decode("utf8")
+        self.__store(key, value)
+        return value
+
+    async def set(self, user_id, name: str, value: str):
+        key = self.__key(user_id, name)
+        await self.bot.redis.set(key, value)
+        self.__store(key, value)
+        await self.bot.redis.publish(CHANNEL, key)
+
+    async def delete(self, user_id, name: str):
+        key = self.__key(user_id, name)
+        await self.bot.redis.delete(key)
+        self.__store(key, None)
+        await self.bot.redis.publish(CHANNEL, key)
+
+    def invalidate(self, key: str):
+        self.__cache.pop(key, None)
+
+    async def get_prefix(self, user_id):
+        return await self.get(user_id, "prefix")
+
+    async def get_lang(self, user_id):
+        return await self.get(user_id, "lang") or "english"
+
+    def stats(self):
+        hits, misses = self.counter["hits"], self.counter["misses"]
+        return {
+            "size": len(self.__cache),
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": round(hits / (hits + misses), 3) if (hits + misses) else 0.0,
+            "evictions": self.counter["evictions"],
+            "expired": self.counter["expired"],
+            "invalidations": self.counter["invalidations"]
+        }
+
+    async def __listen(self):
+        retry = 1
+        while True:
+            sub = None
+            try:
+                sub = await aioredis.create_redis(address=self.address, loop=self.bot.loop)
+                channel, = await sub.subscribe(CHANNEL)
+                retry = 1
+                # Anything could have changed while we weren't listening
+                self.__cache.clear()
+                while await channel.wait_message():
+                    key = await channel.get(encoding="utf8")
+                    self.invalidate(key)
+                    self.counter["invalidations"] += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.warning("Preference invalidation listener failed, retrying in %ss: %s" % (retry, e))
+            finally:
+                if sub is not None:
+                    sub.close()
+            self.__cache.clear()
+            await asyncio.sleep(retry)
+            retry = min(retry * 2, 60)
+
+    def close(self):
+        self.__task.cancel()
@@ -0,0 +1,92 @@
+import asyncio
+import logging
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+log = logging.getLogger()
+
+# Workers import render_jobs themselves so the bot process never loads Pillow or NumPy
+def _warm():
+    from . import render_jobs
+    render_jobs.warm()
+
+def _run(job: str, *args):
+    from . import render_jobs
+    return render_jobs.run(job, *args)
+
+class RenderTimeout(Exception):
+    pass
+
+class RenderService:
+    """Runs Pillow/ColorThief jobs in a warm process pool so they never block the event loop.
+
+    Workers load the static assets once on start (render_jobs.warm). At most
+    `workers` jobs are handed to the pool at a time, the rest wait here so the
+    queue depth is visible in stats(). A job that goes past its timeout is
+    abandoned by the caller but keeps its slot until the worker finishes it,
+    so a slow image can't oversubscribe the pool."""
+
+    def __init__(self, loop, *, workers: int = 2, timeout: float = 15.0):
+        self.loop = loop
+        self.workers = workers
+        self.timeout = timeout
+        self.queued = 0
+        self.running = 0
+        self.counter = Counter()
+        self.__times = defaultdict(float)
+        self.__slots = asyncio.Semaphore(workers, loop=loop)
+        self.__pool = ProcessPoolExecutor(max_workers=workers, initializer=_warm)
+        # Start every worker now rather than on the first image command
+        for _ in range(workers):
+            self.__pool.submit(_run, "ping")
+
+    def __release(self, future):
+        self.running -= 1
+        self.__slots.release()
+
+    async def render(self, job: str, *args, timeout: float = None):
+        """Run a render_jobs job in the pool and return its result, raises RenderTimeout."""
+        timeout = timeout or self.timeout
+        deadline = self.loop.time() + timeout
+        self.queued += 1
+        try:
+            await asyncio.wait_for(self.__slots.acquire(), timeout=timeout, loop=self.loop)
+        except asyncio.TimeoutError:
+            self.counter["timeouts"] += 1
+            raise RenderTimeout("%s timed out waiting for a worker" % job)
+        finally:
+            self.queued -= 1
+
+        self.running += 1
+        start = time.perf_counter()
+        future = self.__pool.submit(_run, job, *args)
+        future.add_done_callback(lambda f: self.loop.call_soon_threadsafe(self.__release, f))
+        try:
+            result = await asyncio.wait_for(asyncio.wrap_future(future, loop=self.loop),
+                                            timeout=max(deadline - self.loop.time(), 0), loop=self.loop)
+        except asyncio.TimeoutError:
+            self.counter["timeouts"] += 1
+            log.warning("Render job %s timed out after %ss" % (job, timeout))
+            raise RenderTimeout("%s timed out" % job)
+        except Exception:
+            self.counter["errors"] += 1
+            raise
+        self.counter[job] += 1
+        self.__times[job] += time.perf_counter() - start
+        return result
+
+    def stats(self):
+        return {
+            "workers": self.workers,
+            "queued": self.queued,
+            "running": self.running,
+            "timeouts": self.counter["timeouts"],
+            "errors": self.counter["errors"],
+            "jobs": {job: {"count": self.counter[job],
+                           "avg": round(self.__times[job] / self.counter[job] * 1000, 2)}
+                     for job in self.__times}
+        }
+
+    def close(self):
+        self.__pool.shutdown(wait=False)
@@ -0,0 +1,297 @@
+"""Image jobs that run inside the render pool's worker processes.
+
+Everything in here is plain synchronous Pillow/ColorThief code. Jobs take
+and return picklable values (mostly bytes) since they cross a process
+boundary, see RenderService in render.py for the asyncio side."""
+import logging
+import os
+import textwrap
+from collections import OrderedDict
+from functools import lru_cache
+from io import BytesIO
+
+import numpy
+from PIL import Image, ImageDraw, ImageFont, ImageOps
+
+from .cards import DESCRIPTIONS
+
+log = logging.getLogger()
+
+NEKO_FOLDER = "data/nekopet/"
+NEKO_TYPES = {
+    1: "neko1.png",
+    2: "neko2.png",
+    3: "neko3.png"
+}
+
+class CardRenderer:
+    """Draws loli cards with the template and fonts loaded once."""
+
+    def __init__(self, template: str = "data/card.jpg", font: str = "data/fonts/card.ttf"):
+        self.template = Image.open(template)
+        self.template.load()
+        self.title_font = ImageFont.truetype(font, 40)
+        self.lower_font = ImageFont.truetype(font, 20)
+        self.desc_font = ImageFont.truetype(font, 16)
+
+    @lru_cache(maxsize=64)
+    def character(self, character: str):
+        img = Image.open(f"data/{character}.jpg").resize((314, 313))
+        img.load()
+        return img
+
+    def render(self, character: str, attack: int, defense: int, description: bool = True):
+        img = self.template.copy()
+        draw = ImageDraw.Draw(img)
+
+        img.paste(self.character(character), (52, 114))
+
+        draw.text((37, 23), character.replace('_', ' '), (0, 0, 0), self.title_font)
+        draw.text((255, 550), str(attack), (0, 0, 0), self.lower_font)
+        draw.text((344, 550), str(defense), (0, 0, 0), self.lower_font)
+        if description:
+            draw.text((40, 477), textwrap.fill(DESCRIPTIONS.get(character, ""), 37), (0, 0, 0), font=self.desc_font)
+
+        buf = BytesIO()
+        img.save(buf, "png")
+        return buf.getvalue()
+
+# Per-process assets, filled in by warm() when the worker starts
+_assets = {}
+_warmed = False
+
+def _load_neko(name):
+    img = Image.open(NEKO_FOLDER + name)
+    img.load()
+    return img
+
+def warm():
+    """Worker initializer, loads the static assets once per process.
+
+    A missing asset is logged and only fails the jobs that need it, an
+    exception here would break the whole pool."""
+    global _warmed
+    if _warmed:
+        return
+    _warmed = True
+    loaders = {
+        "cards": CardRenderer,
+        "neko_font": lambda: ImageFont.truetype("data/fonts/Neko.ttf", 30),
+        "welcome": _welcome_assets
+    }
+    for type, name in NEKO_TYPES.items():
+        loaders["neko%s" % type] = lambda name=name: _load_neko(name)
+    for key, loader in loaders.items():
+        try:
+            _assets[key] = loader()
+        except Exception as e:
+            log.error("Failed to load render asset %s: %s" % (key, e))
+
+def ping():
+    return os.getpid()
+
+def _png(img):
+    buf = BytesIO()
+    img.save(buf, format="png")
+    return buf.getvalue()
+
+def card(character: str, attack: int, defense: int, description: bool = True):
+    return _assets["cards"].render(character, attack, defense, description)
+
+def neko(background: str, type: int, food: int, play: int, level: int):
+    bg = Image.open(NEKO_FOLDER + background).convert("RGBA")
+    font = _assets["neko_font"]
+
+    draw = ImageDraw.Draw(bg)
+    neko = _assets["neko%s" % type].resize((250, bg.size[1]))
+
+    bg.alpha_composite(neko)
+    draw.text((225, 5), f"{food}% Food", (255, 255, 255), font)
+    draw.text((225, 45), f"{play}% Play", (255, 255, 255), font)
+    draw.text((225, 85), f"Level {level}", (255, 255, 255), font)
+    return _png(bg)
+
+WELCOME_FONT = "data/fonts/UniSansHeavy.otf"
+WELCOME_DEFAULT = "data/imgwelcome/transparent.png"
+WELCOME_TEMPLATES = 128
+
+# Prepared welcome templates per worker, keyed by background file state and guild name
+_welcome_templates = OrderedDict()
+
+def _circle_border(circle_img_size: tuple):
+    border_size = []
+    for i in range(len(circle_img_size)):
+        border_size.append(circle_img_size[0] + 8)
+    return tuple(border_size)
+
+def _welcome_assets():
+    """Avatar mask, frame and fonts for welcome images, built once per process."""
+    profile_area = Image.new("L", (512, 512), 0)
+    draw = ImageDraw.Draw(profile_area)
+    draw.ellipse(((0, 0), (512, 512)), fill=255)
+
+    mask = Image.new('L', (512, 512), 0)
+    draw_thumb = ImageDraw.Draw(mask)
+    draw_thumb.ellipse((0, 0) + (512, 512), fill=255, outline=0)
+    circle = Image.new("RGBA", (512, 512))
+    draw_circle = ImageDraw.Draw(circle)
+    draw_circle.ellipse([0, 0, 512, 512], fill=(255, 255, 255, 180), outline=(255, 255, 255, 250))
+    circle_border_size = _circle_border((128, 128))
+
+    return {
+        "profile_mask": profile_area.resize((128, 128), Image.ANTIALIAS),
+        "circle": circle.resize((circle_border_size), Image.ANTIALIAS),
+        "circle_mask": mask.resize((circle_border_size), Image.ANTIALIAS),
+        "circle_pos": (7 + int((136 - circle_border_size[0]) / 2)),
+        "border_pos": (11 + int((136 - circle_border_size[0]) / 2)),
+        "welcome_font": ImageFont.truetype(WELCOME_FONT, 50),
+        "name_font": ImageFont.truetype(WELCOME_FONT, 30),
+        "name_font_medium": ImageFont.truetype(WELCOME_FONT, 22),
+        "name_font_small": ImageFont.truetype(WELCOME_FONT, 18),
+        "name_font_smallest": ImageFont.truetype(WELCOME_FONT, 12),
+        "server_font": ImageFont.truetype(WELCOME_FONT, 22)
+    }
+
+def _outline(draw, original_position: tuple, text: str, pixel_displacement: int, font, textoutline):
+    op = original_position
+    pd = pixel_displacement
+
+    left = (op[0] - pd, op[1])
+    right = (op[0] + pd, op[1])
+    up = (op[0], op[1] - pd)
+    down = (op[0], op[1] + pd)
+
+    draw.text(left, text, font=font, fill=(textoutline))
+    draw.text(right, text, font=font, fill=(textoutline))
+    draw.text(up, text, font=font, fill=(textoutline))
+    draw.text(down, text, font=font, fill=(textoutline))
+
+    draw.text(op, text, font=font, fill=(textoutline))
+
+def _welcome_template(background: str, guild_name: str):
+    """The fitted background with the avatar frame, "Welcome" and the server name already drawn.
+
+    Keyed on the background's mtime and size so `imgwelcome img` replacing or
+    removing the file invalidates it in every worker."""
+    if not (background and os.path.exists(background)):
+        background = WELCOME_DEFAULT
+    st = os.stat(background)
+    key = (background, st.st_mtime_ns, st.st_size, guild_name)
+    template = _welcome_templates.get(key)
+    if template is not None:
+        _welcome_templates.move_to_end(key)
+        return template
+
+    assets = _assets["welcome"]
+    if background == WELCOME_DEFAULT:
+        bg = Image.open(background)
+    else:
+        bg = Image.open(background).convert("RGBA")
+
+    template = ImageOps.fit(bg, (500, 150), centering=(0.5, 0.5))
+    template.paste(bg)
+    template = template.resize((500, 150), Image.NEAREST)
+    template.paste(assets["circle"], (assets["circle_pos"], assets["circle_pos"]), assets["circle_mask"])
+
+    draw = ImageDraw.Draw(template)
+    _outline(draw, (150, 16), "Welcome", 1, assets["welcome_font"], (0, 0, 0, 255))
+    draw.text((150, 16), "Welcome", font=assets["welcome_font"], fill=(255, 255, 255, 230))
+    server_text = "\n".join(textwrap.wrap(f"Welcome to {guild_name}!", 25))
+    _outline(draw, (152, 100), server_text, 1, assets["server_font"], (0, 0, 0, 255))
+    draw.text((152, 100), server_text, font=assets["server_font"], fill=(255, 255, 255, 230))
+
+    # Drop this guild's entry for an older version of the background before caching the new one
+    for old in [k for k in _welcome_templates if k[0] == background and k[3] == guild_name]:
+        del _welcome_templates[old]
+    _welcome_templates[key] = template
+    while len(_welcome_templates) > WELCOME_TEMPLATES:
+        _welcome_templates.popitem(last=False)
+    return template
+
+def welcome(background: str, avatar: bytes, uname: str, guild_name: str):
+    assets = _assets["welcome"]
+    welcome_picture = _welcome_template(background, guild_name).copy()
+
+    profile_area_output = ImageOps.fit(Image.open(BytesIO(avatar)), (128, 128), centering=(0, 0))
+    profile_area_output.putalpha(assets["profile_mask"])
+    border_pos = assets["border_pos"]
+    welcome_picture.paste(profile_area_output, (border_pos, border_pos), profile_area_output)
+
+    drawtwo = ImageDraw.Draw(welcome_picture)
+
+    if len(uname) <= 17:
+        _outline(drawtwo, (152, 63), uname, 1, assets["name_font"], (0, 0, 0, 255))
+        drawtwo.text((152, 63), uname, font=assets["name_font"], fill=(255, 255, 255, 230))
+
+    if len(uname) > 17:
+        if len(uname) <= 23:
+            _outline(drawtwo, (152, 66), uname, 1, assets["name_font_medium"], (0, 0, 0, 255))
+            drawtwo.text((152, 66), uname, font=assets["name_font_medium"], fill=(255, 255, 255, 230))
+
+    if len(uname) >= 24:
+        if len(uname) <= 32:
+            _outline(drawtwo, (152, 70), uname, 1, assets["name_font_small"], (0, 0, 0, 255))
+            drawtwo.text((152, 70), uname, font=assets["name_font_small"], fill=(255, 255, 255, 230))
+
+    if len(uname) >= 33:
+        drawtwo.text((152, 73), uname, 1, assets["name_font_smallest"], (0, 0, 0, 255))
+        drawtwo.text((152, 73), uname, font=assets["name_font_smallest"], fill=(255, 255, 255, 230))
+
+    return _png(welcome_picture)
+
+def welcome_background(data: bytes):
+    img = Image.open(BytesIO(data)).convert("RGBA").resize((500, 150))
+    bg = Image.new("RGBA", (500, 150), (0, 0, 0, 0))
+    bg.alpha_composite(img, (0, 0))
+    return _png(bg)
+
+def emojisplit(data: bytes):
+    img = Image.open(BytesIO(data))
+    x, y = img.size
+    return [_png(img.crop(box)) for box in ((0, 0, x / 2, y / 2),
+                                             (x / 2, 0, x, y / 2),
+                                             (0, y / 2, x / 2, y),
+                                             (x / 2, y / 2, x, y))]
+
+def first_frame(data: bytes):
+    with Image.open(BytesIO(data)) as img:
+        img.seek(0)
+        return _png(img)
+
+def dominant_color(data: bytes, size: int = 64, bits: int = 4):
+    """Most common colour as an (r, g, b) tuple.
+
+    The image is shrunk to at most size x size, pixels that are mostly
+    transparent or almost white are skipped like ColorThief does, the rest
+    are bucketed on the top `bits` of each channel and the mean of the
+    fullest bucket is returned."""
+    with Image.open(BytesIO(data)) as img:
+        img.seek(0)
+        img.draft("RGB", (size, size))
+        img = img.convert("RGBA")
+        img.thumbnail((size, size))
+    pixels = numpy.asarray(img).reshape(-1, 4)
+    rgb = pixels[:, :3]
+    keep = (pixels[:, 3] >= 125) & ~(rgb > 250).all(axis=1)
+    if keep.any():
+        rgb = rgb[keep]
+    shift = 8 - bits
+    q = rgb >> shift
+    buckets = (q[:, 0].astype(numpy.int32) << (2 * bits)) | (q[:, 1].astype(numpy.int32) << bits) | q[:, 2]
+    top = numpy.bincount(buckets).argmax()
+    return tuple(int(x) for x in rgb[buckets == top].mean(axis=0).round())
+
+JOBS = {
+    "ping": ping,
+    "card": card,
+    "neko": neko,
+    "welcome": welcome,
+    "welcome_background": welcome_background,
+    "emojisplit": emojisplit,
+    "first_frame": first_frame,
+    "dominant_color": dominant_color
+}
+
+def run(job: str, *args):
+    warm()
+    return JOBS[job](*args)
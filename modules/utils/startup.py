@@ -0,0 +1,45 @@
+import logging
+import time
+from collections import OrderedDict
+
+log = logging.getLogger()
+
+class StartupProfile:
+    """Timings from NekoBot.__init__ to every shard being ready.
+
+    Per module import and setup time, when each shard sent READY and when
+    the deferred cogs finished loading, all in seconds since start."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.modules = OrderedDict()
+        self.shards = {}
+        self.ready = None
+        self.deferred = None
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def module(self, name: str, *, imported: float = None, setup: float = None, deferred: bool = False):
+        entry = self.modules.setdefault(name, {"import": 0.0, "setup": 0.0, "deferred": deferred})
+        if imported is not None:
+            entry["import"] = imported
+        if setup is not None:
+            entry["setup"] = setup
+
+    def shard_ready(self, shard_id: int):
+        self.shards.setdefault(shard_id, self.elapsed())
+
+    def report(self):
+        lines = ["Startup profile:"]
+        for name, entry in sorted(self.modules.items(), key=lambda x: x[1]["import"] + x[1]["setup"], reverse=True):
+            lines.append("  %-14s import %7.1fms  setup %7.1fms%s" % (name, entry["import"] * 1000,
+                                                                     entry["setup"] * 1000,
+                                                                     "  (deferred)" if entry["deferred"] else ""))
+        for shard_id, at in sorted(self.shards.items()):
+            lines.append("  shard %-8s ready at %.2fs" % (shard_id, at))
+        if self.ready is not None:
+            lines.append("  all shards ready at %.2fs" % self.ready)
+        if self.deferred is not None:
+            lines.append("  deferred cogs loaded at %.2fs" % self.deferred)
+        return "\n".join(lines)
@@ -0,0 +1,98 @@
+import asyncio
+import logging
+
+log = logging.getLogger()
+
+LATENCY_KEY = "shard_latencies"
+
+def instance_key(instance: int):
+    return "instance:%s" % instance
+
+class StatsPublisher:
+    """Publishes this instance's stats to Redis in one pipelined round-trip.
+
+    Member and channel totals are counted once on ready and then kept up to
+    date from gateway events, so publishing never walks the member cache.
+    Everything goes into the instance:{n} hash, shard latencies into the
+    shard_latencies hash."""
+
+    def __init__(self, bot, *, interval: int = 30):
+        self.bot = bot
+        self.interval = interval
+        self.members = 0
+        self.channels = 0
+        self.__task = None
+
+        for event in ("on_guild_join", "on_guild_remove", "on_member_join", "on_member_remove",
+                      "on_guild_channel_create", "on_guild_channel_delete"):
+            bot.add_listener(getattr(self, "_%s" % event), event)
+
+    def recount(self):
+        self.members = sum(g.member_count or 0 for g in self.bot.guilds)
+        self.channels = sum(len(g.channels) for g in self.bot.guilds)
+
+    async def _on_guild_join(self, guild):
+        self.members += guild.member_count or 0
+        self.channels += len(guild.channels)
+
+    async def _on_guild_remove(self, guild):
+        self.members -= guild.member_count or 0
+        self.channels -= len(guild.channels)
+
+    async def _on_member_join(self, member):
+        self.members += 1
+
+    async def _on_member_remove(self, member):
+        self.members -= 1
+
+    async def _on_guild_channel_create(self, channel):
+        self.channels += 1
+
+    async def _on_guild_channel_delete(self, channel):
+        self.channels -= 1
+
+    def snapshot(self):
+        data = {
+            "guilds": len(self.bot.guilds),
+            "users": self.members,
+            "channels": self.channels,
+            "messages": self.bot.counter["messages_read"],
+            "commands": self.bot.counter["commands_used"],
+            "shards": len(self.bot.latencies)
+        }
+        for k, v in self.bot.prefs.stats().items():
+            data["prefs_%s" % k] = v
+        render = self.bot.render.stats()
+        data["render_queued"] = render["queued"]
+        data["render_running"] = render["running"]
+        data["render_timeouts"] = render["timeouts"]
+        data["loop_lag_p99"] = self.bot.looplag.report()["p99"]
+        webhooks = self.bot.webhooks.stats()
+        data["webhooks_pending"] = webhooks["pending"]
+        data["webhooks_spilled"] = webhooks.get("spilled", 0)
+        return data
+
+    async def publish(self):
+        tr = self.bot.redis.pipeline()
+        tr.hmset_dict(instance_key(self.bot.instance), self.snapshot())
+        latencies = {shard: round(latency * 1000, 2) for shard, latency in self.bot.latencies}
+        if latencies:
+            tr.hmset_dict(LATENCY_KEY, latencies)
+        await tr.execute()
+
+    async def __publish_loop(self):
+        while True:
+            try:
+                await self.publish()
+            except Exception as e:
+                log.warning("Failed to publish instance stats: %s" % e)
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        self.recount()
+        if self.__task is None:
+            self.__task = self.bot.loop.create_task(self.__publish_loop())
+
+    def close(self):
+        if self.__task is not None:
+            self.__task.cancel()
@@ -0,0 +1,211 @@
+import asyncio
+import logging
+import time
+from collections import Counter, deque
+
+log = logging.getLogger()
+
+class UpstreamError(Exception):
+    pass
+
+class CircuitOpen(UpstreamError):
+    def __init__(self, host: str, retry_in: float):
+        self.host = host
+        self.retry_in = retry_in
+        super().__init__("%s is unavailable, retrying in %.0fs" % (host, retry_in))
+
+class RateLimited(UpstreamError):
+    def __init__(self, host: str):
+        self.host = host
+        super().__init__("Too many requests to %s" % host)
+
+class TokenBucket:
+    """rate tokens per second, up to burst saved up."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def __refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self):
+        self.__refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    async def acquire(self, max_wait: float):
+        """Take a token, waiting up to max_wait seconds for one. Returns False if it didn't get one."""
+        deadline = time.monotonic() + max_wait
+        while not self.try_acquire():
+            wait = (1 - self.tokens) / self.rate
+            if time.monotonic() + wait > deadline:
+                return False
+            await asyncio.sleep(wait)
+        return True
+
+class CircuitBreaker:
+    """Opens after `threshold` consecutive failures and fails fast for `cooldown` seconds.
+
+    After the cooldown one probe request is let through (half open), if it
+    fails the breaker opens again with the cooldown doubled up to max_cooldown."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half open"
+
+    def __init__(self, threshold: int = 5, cooldown: float = 30.0, max_cooldown: float = 300.0):
+        self.threshold = threshold
+        self.base_cooldown = cooldown
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.failures = 0
+        self.state = self.CLOSED
+        self.opened = 0.0
+        self.__probing = False
+
+    def retry_in(self):
+        return max(0.0, self.opened + self.cooldown - time.monotonic())
+
+    def allow(self):
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN and self.retry_in() == 0:
+            self.state = self.HALF_OPEN
+        if self.state == self.HALF_OPEN and not self.__probing:
+            self.__probing = True
+            return True
+        return False
+
+    def cancelled(self):
+        """The request let through never finished, let another probe through."""
+        self.__probing = False
+
+    def success(self):
+        self.failures = 0
+        self.cooldown = self.base_cooldown
+        self.state = self.CLOSED
+        self.__probing = False
+
+    def failure(self):
+        self.failures += 1
+        if self.state == self.HALF_OPEN:
+            self.cooldown = min(self.cooldown * 2, self.max_cooldown)
+            self.__open()
+        elif self.failures >= self.threshold:
+            self.__open()
+
+    def __open(self):
+        self.state = self.OPEN
+        self.opened = time.monotonic()
+        self.__probing = False
+
+class Upstream:
+    """Rate limit, breaker and latency window for one host."""
+
+    def __init__(self, host: str, *, rate: float, burst: int, timeout: float, min_timeout: float,
+                 max_timeout: float, timeout_factor: float, threshold: int, cooldown: float):
+        self.host = host
+        self.bucket = TokenBucket(rate, burst)
+        self.breaker = CircuitBreaker(threshold, cooldown)
+        self.default_timeout = timeout
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.timeout_factor = timeout_factor
+        self.latencies = deque(maxlen=200)
+        self.counter = Counter()
+
+    def percentile(self, p: float):
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+    def timeout(self):
+        """timeout_factor x observed p95, once there are enough samples to trust it."""
+        if len(self.latencies) < 20:
+            return self.default_timeout
+        return max(self.min_timeout, min(self.max_timeout, self.percentile(.95) * self.timeout_factor))
+
+    def hedge_delay(self):
+        p95 = self.percentile(.95)
+        return max(0.05, p95) if p95 is not None else self.default_timeout / 4
+
+    def success(self, elapsed: float):
+        self.latencies.append(elapsed)
+        self.counter["ok"] += 1
+        self.breaker.success()
+
+    def failure(self):
+        self.counter["failed"] += 1
+        self.breaker.failure()
+
+    def stats(self):
+        p50, p95 = self.percentile(.5), self.percentile(.95)
+        return {
+            "state": self.breaker.state,
+            "retry_in": round(self.breaker.retry_in(), 1),
+            "ok": self.counter["ok"],
+            "failed": self.counter["failed"],
+            "rejected": self.counter["rejected"],
+            "limited": self.counter["limited"],
+            "hedged": self.counter["hedged"],
+            "p50": round(p50 * 1000, 2) if p50 is not None else None,
+            "p95": round(p95 * 1000, 2) if p95 is not None else None,
+            "timeout": round(self.timeout(), 2)
+        }
+
+class Upstreams:
+    """Per-host Upstream registry, hosts are created on first use.
+
+    limits maps host to (rate, burst) for hosts that need something other
+    than the default bucket."""
+
+    def __init__(self, *, limits: dict = None, rate: float = 20.0, burst: int = 40, max_wait: float = 5.0,
+                 timeout: float = 30.0, min_timeout: float = 2.0, max_timeout: float = 30.0,
+                 timeout_factor: float = 3.0, threshold: int = 5, cooldown: float = 30.0):
+        self.limits = limits or {}
+        self.rate = rate
+        self.burst = burst
+        self.max_wait = max_wait
+        self.settings = {
+            "timeout": timeout,
+            "min_timeout": min_timeout,
+            "max_timeout": max_timeout,
+            "timeout_factor": timeout_factor,
+            "threshold": threshold,
+            "cooldown": cooldown
+        }
+        self.hosts = {}
+
+    def get(self, host: str):
+        upstream = self.hosts.get(host)
+        if upstream is None:
+            rate, burst = self.limits.get(host, (self.rate, self.burst))
+            upstream = self.hosts[host] = Upstream(host, rate=rate, burst=burst, **self.settings)
+        return upstream
+
+    async def admit(self, host: str):
+        """Check the breaker and take a token for host, raises CircuitOpen or RateLimited."""
+        upstream = self.get(host)
+        breaker = upstream.breaker
+        # Fail fast before queueing on the bucket, allow() below hands out the half open probe
+        if breaker.state == breaker.OPEN and breaker.retry_in() > 0:
+            upstream.counter["rejected"] += 1
+            raise CircuitOpen(host, breaker.retry_in())
+        if not await upstream.bucket.acquire(self.max_wait):
+            upstream.counter["limited"] += 1
+            raise RateLimited(host)
+        if not breaker.allow():
+            upstream.counter["rejected"] += 1
+            raise CircuitOpen(host, breaker.retry_in())
+        return upstream
+
+    def stats(self):
+        return {host: upstream.stats() for host, upstream in self.hosts.items()}
@@ -0,0 +1,205 @@
+import asyncio
+import logging
+import os
+import time
+from collections import Counter, deque
+
+import ujson
+
+log = logging.getLogger()
+
+# Discord rejects a message whose embeds add up to more than this many characters
+MAX_EMBED_CHARS = 6000
+
+def embed_size(embed: dict):
+    """Characters Discord counts towards MAX_EMBED_CHARS."""
+    size = len(embed.get("title", "")) + len(embed.get("description", ""))
+    size += len(embed.get("footer", {}).get("text", "")) + len(embed.get("author", {}).get("name", ""))
+    for field in embed.get("fields", ()):
+        size += len(field.get("name", "")) + len(field.get("value", ""))
+    return size
+
+class WebhookRejected(Exception):
+    """Discord refused the webhook itself (bad url, deleted hook, invalid embed), retrying won't help."""
+    pass
+
+class WebhookFailed(Exception):
+    """Discord errored, the batch is spilled and retried later."""
+    pass
+
+class WebhookDispatcher:
+    """Fire and forget webhook logging.
+
+    send() only queues, nothing awaits Discord. One worker per webhook URL
+    posts up to 10 embeds and MAX_EMBED_CHARS per message and follows the
+    webhook's rate limit headers. Text is sent as an embed description so
+    it batches with the rest. If Discord rejects a batch its embeds are
+    sent again one per message, so only the bad one is dropped. When
+    Discord errors or is unreachable, or more than `max_queue` embeds are
+    waiting, embeds are appended to `spill_path` as JSON lines instead of
+    being dropped. The file is replayed by start() and truncated."""
+
+    def __init__(self, bot, *, spill_path: str = "data/webhooks.jsonl", max_queue: int = 1000,
+                 batch_size: int = 10, backoff: float = 5.0, max_backoff: float = 300.0):
+        self.bot = bot
+        self.spill_path = spill_path
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.counter = Counter()
+        self.__queues = {}
+        self.__events = {}
+        self.__workers = {}
+        self.__singles = Counter()
+
+    def send(self, url: str, content: str = None, *, embed=None):
+        """Queue a message for url, embed can be a discord.Embed or a dict."""
+        if embed is None:
+            embed = {"description": content[:2048], "color": 0xDEADBF}
+        elif not isinstance(embed, dict):
+            embed = embed.to_dict()
+        self.__queue(url, [embed])
+
+    def __queue(self, url: str, embeds: list):
+        queue = self.__queues.get(url)
+        if queue is None:
+            queue = self.__queues[url] = deque()
+            self.__events[url] = asyncio.Event(loop=self.bot.loop)
+        queue.extend(embeds)
+        self.counter["queued"] += len(embeds)
+        if len(queue) > self.max_queue:
+            overflow = [queue.popleft() for _ in range(len(queue) - self.max_queue)]
+            self.__spill(url, overflow)
+        self.__events[url].set()
+        if url not in self.__workers:
+            self.__workers[url] = self.bot.loop.create_task(self.__worker(url))
+
+    def __batch(self, url: str, queue: deque):
+        if self.__singles[url]:
+            return [queue.popleft()]
+        batch = [queue.popleft()]
+        size = embed_size(batch[0])
+        while queue and len(batch) < self.batch_size:
+            size += embed_size(queue[0])
+            if size > MAX_EMBED_CHARS:
+                break
+            batch.append(queue.popleft())
+        return batch
+
+    def __single_done(self, url: str):
+        if self.__singles[url]:
+            self.__singles[url] -= 1
+
+    def __spill(self, url: str, embeds: list):
+        try:
+            with open(self.spill_path, "a", encoding="utf-8") as f:
+                f.write(ujson.dumps({"url": url, "embeds": embeds, "time": int(time.time())}) + "\n")
+            self.counter["spilled"] += len(embeds)
+        except OSError as e:
+            self.counter["dropped"] += len(embeds)
+            log.warning("Failed to spill %s webhook embeds: %s" % (len(embeds), e))
+
+    async def __post(self, url: str, embeds: list):
+        """Post one batch, returns (sent, seconds to wait before the next post)."""
+        resp = await self.bot.http_client.request("POST", url, json={"embeds": embeds}, read="response")
+        if resp.status == 429:
+            return False, resp.json().get("retry_after", 1000) / 1000
+        if 400 <= resp.status < 500:
+            raise WebhookRejected("%s %s" % (resp.status, resp.text()))
+        if resp.status >= 500:
+            raise WebhookFailed("%s %s" % (resp.status, resp.text()[:200]))
+        if resp.headers.get("X-RateLimit-Remaining") == "0":
+            reset = float(resp.headers.get("X-RateLimit-Reset", 0))
+            return True, max(reset - time.time(), 0)
+        return True, 0
+
+    async def __worker(self, url: str):
+        queue = self.__queues[url]
+        event = self.__events[url]
+        failures = 0
+        while True:
+            if not queue:
+                event.clear()
+                await event.wait()
+            batch = self.__batch(url, queue)
+            try:
+                sent, wait = await self.__post(url, batch)
+            except asyncio.CancelledError:
+                queue.extendleft(reversed(batch))
+                raise
+            except WebhookRejected as e:
+                if len(batch) > 1:
+                    # Find the bad embed by sending these one at a time
+                    queue.extendleft(reversed(batch))
+                    self.__singles[url] = len(batch)
+                    continue
+                self.__single_done(url)
+                self.counter["dropped"] += 1
+                log.warning("Webhook rejected an embed: %s" % e)
+                continue
+            except Exception as e:
+                # Discord is down or unreachable, keep everything waiting on disk instead
+                failures += 1
+                self.__spill(url, batch + list(queue))
+                queue.clear()
+                self.__singles.pop(url, None)
+                delay = min(self.backoff * 2 ** (failures - 1), self.max_backoff)
+                log.warning("Webhook post failed, spilled to %s, retrying in %ss: %s" % (self.spill_path, delay, e))
+                await asyncio.sleep(delay)
+                continue
+            if not sent:
+                # Rate limited, the batch goes back to the front
+                self.counter["limited"] += 1
+                queue.extendleft(reversed(batch))
+            else:
+                self.__single_done(url)
+                if failures:
+                    failures = 0
+                    self.replay()
+                self.counter["sent"] += len(batch)
+                self.counter["messages"] += 1
+            if wait:
+                await asyncio.sleep(wait)
+
+    def replay(self):
+        """Queue everything in the spill file again and truncate it."""
+        if not os.path.exists(self.spill_path):
+            return 0
+        try:
+            with open(self.spill_path, encoding="utf-8") as f:
+                lines = f.readlines()
+            os.remove(self.spill_path)
+        except OSError as e:
+            log.warning("Failed to read spilled webhook embeds: %s" % e)
+            return 0
+        count = 0
+        for line in lines:
+            try:
+                entry = ujson.loads(line)
+            except ValueError:
+                continue
+            self.__queue(entry["url"], entry["embeds"])
+            count += len(entry["embeds"])
+        if count:
+            log.info("Replaying %s spilled webhook embeds" % count)
+        return count
+
+    def start(self):
+        self.replay()
+
+    def stats(self):
+        return dict(self.counter, pending=sum(len(x) for x in self.__queues.values()))
+
+    async def close(self, timeout: float = 5.0):
+        """Give the queues a moment to drain, whatever is left goes to the spill file."""
+        deadline = self.bot.loop.time() + timeout
+        while any(self.__queues.values()) and self.bot.loop.time() < deadline:
+            await asyncio.sleep(0.1)
+        for worker in self.__workers.values():
+            worker.cancel()
+        await asyncio.gather(*self.__workers.values(), return_exceptions=True)
+        for url, queue in self.__queues.items():
+            if queue:
+                self.__spill(url, list(queue))
+                queue.clear()
@@ -1,7 +1,7 @@
-import aiohttp
 import logging
+from functools import partial
 from io import BytesIO
-from colorthief import ColorThief
+from .imagepool import ImagePool
 
 log = logging.getLogger()
 
@@ -16,530 +16,226 @@ class Weeb:
         }
 
         self.endpoint = "https://api.weeb.sh/images/"
-
-    async def set_dominant_color(self, url: str):
-        try:
-            async with aiohttp.ClientSession() as cs:
-                async with cs.get(url) as r:
-                    res = await r.read()
-
-            name = url.rpartition("/")[2]
-            r, g, b = ColorThief(BytesIO(res)).get_color()
-            color = format(r << 16 | g << 8 | b, '06' + "x")
-            color = int(color, 16)
-            await self.bot.redis.set(name, str(color))
-            log.info("Set dominant color for %s" % name)
-        except Exception as e:
-            log.error("Failed to set dominant color, %s" % e)
+        self.pool = ImagePool(bot.loop)
 
     async def get_dominant_color(self, url: str):
         try:
-            name = url.rpartition("/")[2]
-            data = await self.bot.redis.get(name)
-            if data:
-                return int(data.decode("utf8"))
-            else:
-                await self.set_dominant_color(url)
-                return 14593471
+            return await self.bot.colors.get(url)
         except Exception as e:
             log.error("Failed to get dominant color, %s" % e)
             return 14593471
 
     async def types(self):
-        async with aiohttp.ClientSession(headers=self.headers) as cs:
-            async with cs.get(self.endpoint + "types") as r:
-                if r.status == 200:
-                    res = await r.json()
-                    data = res["types"]
-                else:
-                    data = []
+        res = await self.bot.http_client.request("GET", self.endpoint + "types", headers=self.headers, read="response")
+        if res.status == 200:
+            return res.json()["types"]
+        return []
+
+    async def start(self):
+        """Register every weeb.sh type with the image pool and start prefetching."""
+        await self.bot.wait_until_ready()
+        try:
+            types = await self.types()
+        except Exception as e:
+            log.error("Failed to get weeb.sh types, %s" % e)
+            types = []
+        for image_type in types:
+            self.pool.register(image_type, partial(self.__fetch_random, image_type))
+        self.pool.start()
 
-        return data
+    def close(self):
+        self.pool.close()
 
-    async def awoo(self):
-        async with aiohttp.ClientSession(headers=self.headers) as cs:
-            async with cs.get(self.endpoint + "random?type=awoo") as r:
-                res = await r.json()
+    async def __fetch_random(self, image_type: str):
+        res = await self.bot.http_client.get_json(self.endpoint + "random?type=%s" % image_type, headers=self.headers,
+                                                  hedge=True)
 
         url = res["url"]
         color = await self.get_dominant_color(url)
         return color, url
 
-    async def bang(self):
-        async with aiohttp.ClientSession(headers=self.headers) as cs:
-            async with cs.get(self.endpoint + "random?type=bang") as r:
-                res = await r.json()
+    async def __fetch_nekos(self, endpoint: str):
+        res = await self.bot.http_client.get_json("https://nekos.life/api/v2/img/%s" % endpoint, hedge=True)
 
         url = res["url"]
         color = await self.get_dominant_color(url)
         return color, url
 
-    async def blush(self):
-        async with aiohttp.ClientSession(headers=self.headers) as cs:
-            async with cs.get(self.endpoint + "random?type=blush") as r:
-                res = await r.json()
+    async def random_image(self, image_type: str):
+        self.pool.register(image_type, partial(self.__fetch_random, image_type))
+        return await self.pool.get(image_type)
 
-        url = res["url"]
-        color = await self.get_dominant_color(url)
-        return color, url
+    async def nekos(self, endpoint: str):
+        """Random nekos.life image, served from the pool like weeb.sh types."""
+        name = "nekos:%s" % endpoint
+        self.pool.register(name, partial(self.__fetch_nekos, endpoint))
+        return await self.pool.get(name)
 
-    async def clagwimoth(self):
-        async with aiohttp.ClientSession(headers=self.headers) as cs:
-            async with cs.get(self.endpoint + "random?type=clagwimoth") as r:
-                res = await r.json()
+    async def awoo(self):
+        return await self.random_image("awoo")
 
-        url = res["url"]
-        color = await self.get_dominant_color(url)
-        return color, url
+    async def bang(self):
+        return await self.random_image("bang")
 
-    async def cry(self):
-        async with aiohttp.ClientSession(headers=self.headers) as cs:
-            async with cs.get(self.endpoint + "random?type=cry") as r:
-                res = await r.json()
+    async def blush(self):
+        return await self.random_image("blush")
 
-        url = res["url"]
-        color = await self.get_dominant_color(url)
-        return color, url
+    async def clagwimoth(self):
+        return await self.random_image("clagwimoth")
 
-    async def cuddle(self):
-        async with aiohttp.ClientSession(headers=self.headers) as cs:
-            async with cs.get(self.endpoint + "random?type=cuddle") as r:
-                res = await r.json()
+    async def cry(self):
+        return await self.random_image("cry")
 
-        url = res["url"]
-        color = await self.get_dominant_color(url)
-        return color, url
+    async def cuddle(self):
+        return await self.random_image("cuddle")
 
     async def dance(self):
-        async with aiohttp.ClientSession(headers=self.headers) as cs:
-            async with cs.get(self.endpoint + "random?type=dance") as r:
-                res = await r.json()
-
-        url = res["url"]
-        color = await self.get_dominant_color(url)
-        return color, url
+        return await self.random_image("dance")
 
     async def hug(self):
-        async with aiohttp.ClientSession(headers=self.headers) as cs:
-            async with cs.get(self.endpoint + "random?type=hug") as r:
-                res = await r.json()
-
-        url = res["url"]
-        color = await self.get_dominant_color(url)
-        return color, url
+        return await self.random_image("hug")
 
     async def insult(self):
-        async with aiohttp.ClientSession(headers=self.headers) as cs:
-            async with cs.get(self.endpoint + "random?type=insult") as r:
-                res = await r.json()
-
-        url = res["url"]
-        color = await self.get_dominant_color(url)
-        return color, url
+        return await self.random_image("insult")
 
     async def jojo(self):
-        async with aiohttp.ClientSession(headers=self.headers) as cs:
-            async with cs.get(self.endpoint + "random?type=jojo") as r:
-                res = await r.json()
-
-        url = res["url"]
-        color = await self.get_dominant_color(url)
-        return color, url
+        return await self.random_image("jojo")
 
     async def kiss(self):
-        async with aiohttp.ClientSession(headers=self.headers) as cs:
-            async with cs.get(self.endpoint + "random?type=kiss") as r:
-                res = await r.json()
-
-        url = res["url"]
-        color = await self.get_dominant_color(url)
-        return color, url
+        return await self.random_image("kiss")
 
     async def lewd(self):
-        async with aiohttp.ClientSession(headers=self.headers) as cs:
-            async with cs.get(self.endpoint + "random?type=lewd") as r:
-                res = await r.json()
-
-        url = res["url"]
-        color = await self.get_dominant_color(url)
-        return color, url
+        return await self.random_image("lewd")
 
     async def lick(self):
-        async with aiohttp.ClientSession(headers=self.headers) as cs:
-            async with cs.get(self.endpoint + "random?type=lick") as r:
-                res = await r.json()
-
-        url = res["url"]
-        color = await self.get_dominant_color(url)
-        return color, url
+        return await self.random_image("lick")
 
     async def megumin(self):
-        async with aiohttp.ClientSession(headers=self.headers) as cs:
-            async with cs.get(self.endpoint + "random?type=megumin") as r:
-                res = await r.json()
-
-        url = res["url"]
-        color = await self.get_dominant_color(url)
-        return color, url
+        return await self.random_image("megumin")
 
     async def neko(self):
-        async with aiohttp.ClientSession(headers=self.headers) as cs:
-            async with cs.get(self.endpoint + "random?type=neko") as r:
-                res = await r.json()
-
-        url = res["url"]
-        color = await self.get_dominant_color(url)
-        return color, url
+        return await self.random_image("neko")
 
     async def nom(self):
-        async with aiohttp.ClientSession(headers=self.headers) as cs:
-            async with cs.get(self.endpoint + "random?type=nom") as r:
-                res = await r.json()
-
-        url = res["url"]
-        color = await self.get_dominant_color(url)
-        return color, url
+        return await self.random_image("nom")
 
     async def owo(self):
-        async with aiohttp.ClientSession(headers=self.headers) as cs:
-            async with cs.get(self.endpoint + "random?type=owo") as r:
-                res = await r.json()
-
-        url = res["url"]
-        color = await self.get_dominant_color(url)
-        return color, url
+        return await self.random_image("owo")
 
     async def pat(self):
-        async with aiohttp.ClientSession(headers=self.headers) as cs:
-            async with cs.get(self.endpoint + "random?type=pat") as r:
-                res = await r.json()
-
-        url = res["url"]
-        color = await self.get_dominant_color(url)
-        return color, url
+        return await self.random_image("pat")
 
     async def poke(self):
-        async with aiohttp.ClientSession(headers=self.headers) as cs:
-            async with cs.get(self.endpoint + "random?type=poke") as r:
-                res = await r.json()
-
-        url = res["url"]
-        color = await self.get_dominant_color(url)
-        return color, url
+        return await self.random_image("poke")
 
     async def pout(self):
-        async with aiohttp.ClientSession(headers=self.headers) as cs:
-            async with cs.get(self.endpoint + "random?type=pout") as r:
-                res = await r.json()
-
-        url = res["url"]
-        color = await self.get_dominant_color(url)
-        return color, url
+        return await self.random_image("pout")
 
     async def rem(self):
-        async with aiohttp.ClientSession(headers=self.headers) as cs:
-            async with cs.get(self.endpoint + "random?type=rem") as r:
-                res = await r.json()
-
-        url = res["url"]
-        color = await self.get_dominant_color(url)
-        return color, url
+        return await self.random_image("rem")
 
     async def shrug(self):
-        async with aiohttp.ClientSession(headers=self.headers) as cs:
-            async with cs.get(self.endpoint + "random?type=shrug") as r:
-                res = await r.json()
-
-        url = res["url"]
-        color = await self.get_dominant_color(url)
-        return color, url
+        return await self.random_image("shrug")
 
     async def slap(self):
-        async with aiohttp.ClientSession(headers=self.headers) as cs:
-            async with cs.get(self.endpoint + "random?type=slap") as r:
-                res = await r.json()
-
-        url = res["url"]
-        color = await self.get_dominant_color(url)
-        return color, url
+        return await self.random_image("slap")
 
     async def sleepy(self):
-        async with aiohttp.ClientSession(headers=self.headers) as cs:
-            async with cs.get(self.endpoint + "random?type=sleepy") as r:
-                res = await r.json()
-
-        url = res["url"]
-        color = await self.get_dominant_color(url)
-        return color, url
+        return await self.random_image("sleepy")
 
     async def smile(self):
-        async with aiohttp.ClientSession(headers=self.headers) as cs:
-            async with cs.get(self.endpoint + "random?type=smile") as r:
-                res = await r.json()
-
-        url = res["url"]
-        color = await self.get_dominant_color(url)
-        return color, url
+        return await self.random_image("smile")
 
     async def teehee(self):
-        async with aiohttp.ClientSession(headers=self.headers) as cs:
-            async with cs.get(self.endpoint + "random?type=teehee") as r:
-                res = await r.json()
-
-        url = res["url"]
-        color = await self.get_dominant_color(url)
-        return color, url
+        return await self.random_image("teehee")
 
     async def smug(self):
-        async with aiohttp.ClientSession(headers=self.headers) as cs:
-            async with cs.get(self.endpoint + "random?type=smug") as r:
-                res = await r.json()
-
-        url = res["url"]
-        color = await self.get_dominant_color(url)
-        return color, url
+        return await self.random_image("smug")
 
     async def stare(self):
-        async with aiohttp.ClientSession(headers=self.headers) as cs:
-            async with cs.get(self.endpoint + "random?type=stare") as r:
-                res = await r.json()
-
-        url = res["url"]
-        color = await self.get_dominant_color(url)
-        return color, url
+        return await self.random_image("stare")
 
     async def thumbsup(self):
-        async with aiohttp.ClientSession(headers=self.headers) as cs:
-            async with cs.get(self.endpoint + "random?type=thumbsup") as r:
-                res = await r.json()
-
-        url = res["url"]
-        color = await self.get_dominant_color(url)
-        return color, url
+        return await self.random_image("thumbsup")
 
     async def triggered(self):
-        async with aiohttp.ClientSession(headers=self.headers) as cs:
-            async with cs.get(self.endpoint + "random?type=triggered") as r:
-                res = await r.json()
-
-        url = res["url"]
-        color = await self.get_dominant_color(url)
-        return color, url
+        return await self.random_image("triggered")
 
     async def wag(self):
-        async with aiohttp.ClientSession(headers=self.headers) as cs:
-            async with cs.get(self.endpoint + "random?type=wag") as r:
-                res = await r.json()
-
-        url = res["url"]
-        color = await self.get_dominant_color(url)
-        return color, url
+        return await self.random_image("wag")
 
     async def waifu_insult(self):
-        async with aiohttp.ClientSession(headers=self.headers) as cs:
-            async with cs.get(self.endpoint + "random?type=waifu_insult") as r:
-                res = await r.json()
-
-        url = res["url"]
-        color = await self.get_dominant_color(url)
-        return color, url
+        return await self.random_image("waifu_insult")
 
     async def wasted(self):
-        async with aiohttp.ClientSession(headers=self.headers) as cs:
-            async with cs.get(self.endpoint + "random?type=wasted") as r:
-                res = await r.json()
-
-        url = res["url"]
-        color = await self.get_dominant_color(url)
-        return color, url
+        return await self.random_image("wasted")
 
     async def sumfuk(self):
-        async with aiohttp.ClientSession(headers=self.headers) as cs:
-            async with cs.get(self.endpoint + "random?type=sumfuk") as r:
-                res = await r.json()
-
-        url = res["url"]
-        color = await self.get_dominant_color(url)
-        return color, url
+        return await self.random_image("sumfuk")
 
     async def dab(self):
-        async with aiohttp.ClientSession(headers=self.headers) as cs:
-            async with cs.get(self.endpoint + "random?type=dab") as r:
-                res = await r.json()
-
-        url = res["url"]
-        color = await self.get_dominant_color(url)
-        return color, url
+        return await self.random_image("dab")
 
     async def tickle(self):
-        async with aiohttp.ClientSession(headers=self.headers) as cs:
-            async with cs.get(self.endpoint + "random?type=tickle") as r:
-                res = await r.json()
-
-        url = res["url"]
-        color = await self.get_dominant_color(url)
-        return color, url
+        return await self.random_image("tickle")
 
     async def highfive(self):
-        async with aiohttp.ClientSession(headers=self.headers) as cs:
-            async with cs.get(self.endpoint + "random?type=highfive") as r:
-                res = await r.json()
-
-        url = res["url"]
-        color = await self.get_dominant_color(url)
-        return color, url
+        return await self.random_image("highfive")
 
     async def banghead(self):
-        async with aiohttp.ClientSession(headers=self.headers) as cs:
-            async with cs.get(self.endpoint + "random?type=banghead") as r:
-                res = await r.json()
-
-        url = res["url"]
-        color = await self.get_dominant_color(url)
-        return color, url
+        return await self.random_image("banghead")
 
     async def bite(self):
-        async with aiohttp.ClientSession(headers=self.headers) as cs:
-            async with cs.get(self.endpoint + "random?type=bite") as r:
-                res = await r.json()
-
-        url = res["url"]
-        color = await self.get_dominant_color(url)
-        return color, url
+        return await self.random_image("bite")
 
     async def discord_memes(self):
-        async with aiohttp.ClientSession(headers=self.headers) as cs:
-            async with cs.get(self.endpoint + "random?type=discord_memes") as r:
-                res = await r.json()
-
-        url = res["url"]
-        color = await self.get_dominant_color(url)
-        return color, url
+        return await self.random_image("discord_memes")
 
     async def nani(self):
-        async with aiohttp.ClientSession(headers=self.headers) as cs:
-            async with cs.get(self.endpoint + "random?type=nani") as r:
-                res = await r.json()
-
-        url = res["url"]
-        color = await self.get_dominant_color(url)
-        return color, url
+        return await self.random_image("nani")
 
     async def initial_d(self):
-        async with aiohttp.ClientSession(headers=self.headers) as cs:
-            async with cs.get(self.endpoint + "random?type=initial_d") as r:
-                res = await r.json()
-
-        url = res["url"]
-        color = await self.get_dominant_color(url)
-        return color, url
+        return await self.random_image("initial_d")
 
     async def delet_this(self):
-        async with aiohttp.ClientSession(headers=self.headers) as cs:
-            async with cs.get(self.endpoint + "random?type=delet_this") as r:
-                res = await r.json()
-
-        url = res["url"]
-        color = await self.get_dominant_color(url)
-        return color, url
+        return await self.random_image("delet_this")
 
     async def poi(self):
-        async with aiohttp.ClientSession(headers=self.headers) as cs:
-            async with cs.get(self.endpoint + "random?type=poi") as r:
-                res = await r.json()
-
-        url = res["url"]
-        color = await self.get_dominant_color(url)
-        return color, url
+        return await self.random_image("poi")
 
     async def thinking(self):
-        async with aiohttp.ClientSession(headers=self.headers) as cs:
-            async with cs.get(self.endpoint + "random?type=thinking") as r:
-                res = await r.json()
-
-        url = res["url"]
-        color = await self.get_dominant_color(url)
-        return color, url
+        return await self.random_image("thinking")
 
     async def greet(self):
-        async with aiohttp.ClientSession(headers=self.headers) as cs:
-            async with cs.get(self.endpoint + "random?type=greet") as r:
-                res = await r.json()
-
-        url = res["url"]
-        color = await self.get_dominant_color(url)
-        return color, url
+        return await self.random_image("greet")
 
     async def punch(self):
-        async with aiohttp.ClientSession(headers=self.headers) as cs:
-            async with cs.get(self.endpoint + "random?type=punch") as r:
-                res = await r.json()
-
-        url = res["url"]
-        color = await self.get_dominant_color(url)
-        return color, url
+        return await self.random_image("punch")
 
     async def handholding(self):
-        async with aiohttp.ClientSession(headers=self.headers) as cs:
-            async with cs.get(self.endpoint + "random?type=handholding") as r:
-                res = await r.json()
-
-        url = res["url"]
-        color = await self.get_dominant_color(url)
-        return color, url
+        return await self.random_image("handholding")
 
     async def kemonomimi(self):
-        async with aiohttp.ClientSession(headers=self.headers) as cs:
-            async with cs.get(self.endpoint + "random?type=kemonomimi") as r:
-                res = await r.json()
-
-        url = res["url"]
-        color = await self.get_dominant_color(url)
-        return color, url
+        return await self.random_image("kemonomimi")
 
     async def trap(self):
-        async with aiohttp.ClientSession(headers=self.headers) as cs:
-            async with cs.get(self.endpoint + "random?type=trap") as r:
-                res = await r.json()
-
-        url = res["url"]
-        color = await self.get_dominant_color(url)
-        return color, url
+        return await self.random_image("trap")
 
     async def deredere(self):
-        async with aiohttp.ClientSession(headers=self.headers) as cs:
-            async with cs.get(self.endpoint + "random?type=deredere") as r:
-                res = await r.json()
-
-        url = res["url"]
-        color = await self.get_dominant_color(url)
-        return color, url
+        return await self.random_image("deredere")
 
     async def dog(self):
-        async with aiohttp.ClientSession(headers=self.headers) as cs:
-            async with cs.get(self.endpoint + "random?type=animal_dog") as r:
-                res = await r.json()
-
-        url = res["url"]
-        color = await self.get_dominant_color(url)
-        return color, url
+        return await self.random_image("animal_dog")
 
     async def cat(self):
-        async with aiohttp.ClientSession(headers=self.headers) as cs:
-            async with cs.get(self.endpoint + "random?type=animal_cat") as r:
-                res = await r.json()
-
-        url = res["url"]
-        color = await self.get_dominant_color(url)
-        return color, url
+        return await self.random_image("animal_cat")
 
     async def waifu_insult_gen(self, avatar: str):
         body = {
             "avatar": avatar
         }
-        async with aiohttp.ClientSession(headers=self.headers) as cs:
-            async with cs.post("https://api.weeb.sh/auto-image/waifu-insult", data=body) as r:
-                res = await r.read()
+        res = await self.bot.http_client.request("POST", "https://api.weeb.sh/auto-image/waifu-insult",
+                                                 read="bytes", data=body, headers=self.headers)
 
         return BytesIO(res)
 
@@ -548,8 +244,7 @@ class Weeb:
             "targetOne": avatar1,
             "targetTwo": avatar2
         }
-        async with aiohttp.ClientSession(headers=self.headers) as cs:
-            async with cs.post("https://api.weeb.sh/auto-image/love-ship", data=body) as r:
-                res = await r.read()
+        res = await self.bot.http_client.request("POST", "https://api.weeb.sh/auto-image/love-ship",
+                                                 read="bytes", data=body, headers=self.headers)
 
         return BytesIO(res)
\ No newline at end of file
@@ -0,0 +1,182 @@
+import asyncio
+import logging
+import random
+import time
+
+import rethinkdb as r
+
+from . import activity
+
+log = logging.getLogger()
+
+def merge_xp(cooldown: int):
+    """Conflict function for flush, enforces the cooldown against the stored lastxp.
+
+    Each instance only checks its own cached lastxp, so a user active on
+    several instances could otherwise earn XP once per instance per
+    cooldown. Award times closer than the cooldown to the previous accepted
+    one are dropped, and the XP is scaled down to match."""
+    def accept(acc, timestamp):
+        return r.branch(
+            timestamp.sub(acc["last"]).ge(cooldown),
+            {"last": timestamp, "times": acc["times"].append(timestamp)},
+            acc
+        )
+
+    def merge(id, old, new):
+        times = new["xpactivity"]["recent"]
+        return times.fold({"last": old["lastxp"].default("0").coerce_to("number"), "times": []}, accept).do(
+            lambda accepted: r.branch(
+                old["blacklisted"].default(False).or_(accepted["times"].is_empty()),
+                old,
+                old.merge({
+                    "xp": old["xp"].default(0).add(
+                        new["xp"].mul(accepted["times"].count()).div(times.count()).floor()),
+                    "lastxp": accepted["last"].coerce_to("string"),
+                    "xpactivity": activity.record(old["xpactivity"], accepted["times"])
+                })
+            )
+        )
+    return merge
+
+class XPAccumulator:
+    """Write-behind buffer for levelSystem XP.
+
+    Eligible messages only touch memory, gains are coalesced per user and written
+    to levelSystem in one batched insert every `interval` seconds, so at most one
+    interval of XP is lost if the process dies without a clean close()."""
+
+    def __init__(self, bot, *, interval: int = 30, cooldown: int = 120, state_ttl: int = 900, batch_size: int = 500):
+        self.bot = bot
+        self.interval = interval
+        self.cooldown = cooldown
+        self.state_ttl = state_ttl
+        self.batch_size = batch_size
+
+        # user_id -> {"xp": int, "lastxp": int, "times": [int]}
+        self.pending = {}
+        # user_id -> [lastxp, blacklisted, fetched_at]
+        self.state = {}
+        self.flushes = 0
+        self.flushed_users = 0
+
+        self.__lock = asyncio.Lock(loop=bot.loop)
+        self.__task = bot.loop.create_task(self.__flush_loop())
+
+    async def __get_state(self, user_id: str):
+        now = time.time()
+        state = self.state.get(user_id)
+        if state and (now - state[2]) < self.state_ttl:
+            return state
+
+        data = await r.table("levelSystem").get(user_id).pluck("lastxp", "blacklisted").default(None).run(self.bot.r_conn)
+        state = self.state.get(user_id)
+        if state and (now - state[2]) < self.state_ttl:
+            # Another message from this user fetched it while we were waiting
+            return state
+        if data:
+            state = [int(data.get("lastxp", 0)), data.get("blacklisted", False), now]
+        else:
+            state = [0, False, now]
+
+        pending = self.pending.get(user_id)
+        if pending:
+            state[0] = max(state[0], pending["lastxp"])
+        self.state[user_id] = state
+        return state
+
+    async def add(self, user_id: int):
+        """Award XP to a user if they are off cooldown, buffered until the next flush."""
+        user_id = str(user_id)
+        state = await self.__get_state(user_id)
+        if state[1]:
+            return
+        now = int(time.time())
+        if (now - state[0]) < self.cooldown:
+            return
+        state[0] = now
+
+        pending = self.pending.setdefault(user_id, {"xp": 0, "lastxp": now, "times": []})
+        pending["xp"] += random.randint(1, 30)
+        pending["lastxp"] = now
+        pending["times"].append(now)
+
+    def pending_xp(self, user_id: int):
+        """XP gained on this instance that hasn't been flushed yet."""
+        pending = self.pending.get(str(user_id))
+        return pending["xp"] if pending else 0
+
+    def invalidate(self, user_id: int):
+        """Drop cached state and any unflushed XP, used after owner blacklist/reset."""
+        user_id = str(user_id)
+        self.state.pop(user_id, None)
+        self.pending.pop(user_id, None)
+
+    async def flush(self):
+        """Write all pending XP to levelSystem in batched inserts."""
+        async with self.__lock:
+            if not self.pending:
+                return
+            pending, self.pending = self.pending, {}
+
+            docs = [{
+                "id": user_id,
+                "xp": data["xp"],
+                "lastxp": str(data["lastxp"]),
+                "blacklisted": False,
+                "xpactivity": activity.from_times(data["times"])
+            } for user_id, data in pending.items()]
+
+            for i in range(0, len(docs), self.batch_size):
+                batch = docs[i:i + self.batch_size]
+                try:
+                    result = await r.table("levelSystem").insert(
+                        batch,
+                        conflict=merge_xp(self.cooldown),
+                        return_changes=True
+                    ).run(self.bot.r_conn)
+                except Exception as e:
+                    log.warning("Failed to flush %s XP entries, requeueing: %s" % (len(batch), e))
+                    self.__requeue(batch)
+                    continue
+                self.flushed_users += len(batch)
+                await self.__update_leaderboard(result)
+            self.flushes += 1
+
+    async def __update_leaderboard(self, result):
+        leaderboard = getattr(self.bot, "leaderboard", None)
+        if leaderboard is None:
+            return
+        scores = {x["new_val"]["id"]: x["new_val"]["xp"] for x in result.get("changes", []) if x.get("new_val")}
+        try:
+            await leaderboard.update_many("xp", scores)
+        except Exception as e:
+            log.warning("Failed to update xp leaderboard: %s" % e)
+
+    def __requeue(self, batch):
+        for doc in batch:
+            pending = self.pending.setdefault(doc["id"], {"xp": 0, "lastxp": 0, "times": []})
+            pending["xp"] += doc["xp"]
+            pending["lastxp"] = max(pending["lastxp"], int(doc["lastxp"]))
+            pending["times"] = doc["xpactivity"]["recent"] + pending["times"]
+
+    def __prune_state(self):
+        now = time.time()
+        for user_id in [k for k, v in self.state.items() if (now - v[2]) >= self.state_ttl]:
+            del self.state[user_id]
+
+    async def __flush_loop(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            if not hasattr(self.bot, "r_conn"):
+                continue
+            try:
+                await self.flush()
+            except Exception as e:
+                log.warning("XP flush failed: %s" % e)
+            self.__prune_state()
+
+    async def close(self):
+        self.__task.cancel()
+        await self.flush()
+        log.info("Flushed XP accumulator, %s users over %s flushes" % (self.flushed_users, self.flushes))
@@ -3,10 +3,24 @@ import logging, traceback, discord
 from collections import Counter
 import datetime
 import asyncio, aioredis
-import os, sys
+import os, sys, time, importlib
 
 import config
 import rethinkdb as r
+from modules.utils.httpclient import HTTPClient
+from modules.utils.xpaccumulator import XPAccumulator
+from modules.utils.prefs import PreferenceCache
+from modules.utils.ledger import Ledger
+from modules.utils.leaderboard import Leaderboard
+from modules.utils.stats import StatsPublisher
+from modules.utils.commandbus import CommandBus
+from modules.utils.render import RenderService
+from modules.utils.colors import DominantColors
+from modules.utils.startup import StartupProfile
+from modules.utils.memory import MemoryMonitor
+from modules.utils.latency import CommandLatency
+from modules.utils.looplag import LoopLagMonitor
+from modules.utils.webhooks import WebhookDispatcher
 
 BLACK, RED, GREEN, YELLOW, BLUE, MAGENTA, CYAN, WHITE = range(8)
 RESET_SEQ = "\033[0m"
@@ -79,12 +93,16 @@ if sys.platform == "linux":
     file.setFormatter(color_formatter)
     logger.addHandler(file)
 
+# Loaded in this order before connecting, everything else in modules/ is
+# imported in the background and set up once the shards are ready
+CORE_MODULES = ["error_handler", "ipc", "general", "mod", "eco"]
+
 async def _prefix_callable(bot, msg):
-    prefix = await bot.redis.get(f"{msg.author.id}-prefix")
+    prefix = await bot.prefs.get_prefix(msg.author.id)
     if not prefix:
         prefix = ['n!', 'N!']
     else:
-        prefix = [prefix.decode("utf8"), "n!", "N!"]
+        prefix = [prefix, "n!", "N!"]
     return commands.when_mentioned_or(*prefix)(bot, msg)
 
 class NekoBot(commands.AutoShardedBot):
@@ -100,11 +118,48 @@ class NekoBot(commands.AutoShardedBot):
                          fetch_offline_members=False,
                          max_messages=kwargs.get("max_messages", 105),
                          help_attrs={'hidden': True})
+        self.startup = StartupProfile()
         self.counter = Counter()
         self.command_usage = Counter()
         self.instance = instance
         self.instances = instances
 
+        self.http_client = HTTPClient(self.loop,
+                                      limit=kwargs.get("http_limit", 200),
+                                      limit_per_host=kwargs.get("http_limit_per_host", 30),
+                                      dns_ttl=kwargs.get("http_dns_ttl", 300),
+                                      upstream_limits=kwargs.get("upstream_limits"))
+        self.session = self.http_client.session
+        self.webhooks = WebhookDispatcher(self,
+                                          spill_path=kwargs.get("webhook_spill_path", "data/webhooks.jsonl"),
+                                          max_queue=kwargs.get("webhook_queue_size", 1000))
+        self.xp = XPAccumulator(self, interval=kwargs.get("xp_flush_interval", 30))
+        self.leaderboard = Leaderboard(self)
+        self.ledger = Ledger(self, leaderboard=self.leaderboard)
+        self.prefs = PreferenceCache(self,
+                                     maxsize=kwargs.get("prefs_cache_size", 50000),
+                                     ttl=kwargs.get("prefs_cache_ttl", 600))
+        self.stats = StatsPublisher(self, interval=kwargs.get("stats_interval", 30))
+        self.bus = CommandBus(self)
+        self.render = RenderService(self.loop,
+                                    workers=kwargs.get("render_workers", 2),
+                                    timeout=kwargs.get("render_timeout", 15))
+        self.colors = DominantColors(self,
+                                     maxsize=kwargs.get("color_cache_size", 50000),
+                                     ttl=kwargs.get("color_cache_ttl", 604800))
+        self.memory = MemoryMonitor(self,
+                                    interval=kwargs.get("memory_interval", 300),
+                                    tracemalloc_frames=kwargs.get("tracemalloc_frames", 0))
+        self.latency = CommandLatency(self,
+                                      interval=kwargs.get("latency_flush_interval", 15),
+                                      port=kwargs.get("metrics_port", getattr(config, "metrics_port", None)))
+        self.looplag = LoopLagMonitor(self,
+                                      interval=kwargs.get("looplag_interval", 0.1),
+                                      threshold=kwargs.get("looplag_threshold", 0.25))
+        self.slim = kwargs.get("slim_cache", False)
+        if self.slim:
+            self.__slim_cache()
+
         async def _init_redis():
             self.redis = await aioredis.create_redis(address=("localhost", 6379), loop=self.loop)
 
@@ -116,21 +171,88 @@ class NekoBot(commands.AutoShardedBot):
         self.loop.create_task(_init_rethink())
         self.loop.create_task(_init_redis())
 
-        for file in os.listdir("modules"):
-            if file.endswith(".py"):
-                name = file[:-3]
+        modules = sorted(file[:-3] for file in os.listdir("modules") if file.endswith(".py"))
+        for name in CORE_MODULES:
+            if name in modules:
                 try:
-                    self.load_extension(f"modules.{name}")
+                    self.startup.module(name, imported=self.__import_module(name))
+                    self.__setup_module(name)
                 except:
                     logger.warning("Failed to load {}.".format(name))
                     traceback.print_exc()
+        self.loop.create_task(self.__load_deferred([name for name in modules if name not in CORE_MODULES]))
+
+    def __slim_cache(self):
+        """Don't keep data NekoBot never reads: presences, activities and typing events.
+
+        The gateway parsers dict is shared with every shard's websocket, so
+        this has to happen before connecting. Member status and activity stay
+        at their defaults (offline, no game) in slim mode."""
+        parsers = self._connection.parsers
+        parse_guild_create = parsers["GUILD_CREATE"]
+
+        def _guild_create(data):
+            data.pop("presences", None)
+            return parse_guild_create(data)
+
+        parsers["GUILD_CREATE"] = _guild_create
+        parsers["PRESENCE_UPDATE"] = lambda data: None
+        parsers["TYPING_START"] = lambda data: None
+        logger.info("Slim cache enabled")
+
+    def __import_module(self, name: str):
+        start = time.perf_counter()
+        importlib.import_module(f"modules.{name}")
+        return time.perf_counter() - start
+
+    def __setup_module(self, name: str, deferred: bool = False):
+        start = time.perf_counter()
+        self.load_extension(f"modules.{name}")
+        self.startup.module(name, setup=time.perf_counter() - start, deferred=deferred)
+
+    async def __load_deferred(self, names: list):
+        async def _import(name):
+            try:
+                imported = await self.loop.run_in_executor(None, self.__import_module, name)
+            except:
+                logger.warning("Failed to import {}.".format(name))
+                traceback.print_exc()
+                return False
+            self.startup.module(name, imported=imported, deferred=True)
+            return True
+
+        # Imports run in threads while the shards connect, setup waits for READY
+        imported = await asyncio.gather(*[_import(name) for name in names])
+        await self.wait_until_ready()
+        for name, ok in zip(names, imported):
+            if not ok:
+                continue
+            cogs = set(self.cogs)
+            try:
+                self.__setup_module(name, deferred=True)
+            except:
+                logger.warning("Failed to load {}.".format(name))
+                traceback.print_exc()
+                continue
+            # The first READY fired before these cogs existed, replay it for their on_ready listeners
+            for cog_name in set(self.cogs) - cogs:
+                on_ready = getattr(self.cogs[cog_name], "on_ready", None)
+                if on_ready is not None:
+                    self.loop.create_task(on_ready())
+        self.startup.deferred = self.startup.elapsed()
+        logger.info(self.startup.report())
     async def on_command_error(self, context, exception):
+        self.latency.finished(context, exception)
         if isinstance(exception, commands.CommandNotFound):
             return
 
     async def on_command(self, ctx):
         self.counter["commands_used"] += 1
         self.command_usage[str(ctx.command)] += 1
+        self.latency.started(ctx)
+
+    async def on_command_completion(self, ctx):
+        self.latency.finished(ctx)
 
     async def send_cmd_help(self, ctx):
         if ctx.invoked_subcommand:
@@ -149,13 +271,29 @@ class NekoBot(commands.AutoShardedBot):
         await self.process_commands(message)
 
     async def close(self):
+        await self.webhooks.close()
+        await self.http_client.close()
+        await self.xp.close()
+        self.prefs.close()
+        self.leaderboard.close()
+        self.stats.close()
+        self.bus.close()
+        self.render.close()
+        self.memory.close()
+        await self.latency.close()
+        self.looplag.close()
         self.r_conn.close()
         self.redis.close()
         await super().close()
 
+    async def on_shard_ready(self, shard_id):
+        self.startup.shard_ready(shard_id)
+
     async def on_ready(self):
         if not hasattr(self, 'uptime'):
             self.uptime = datetime.datetime.utcnow()
+        if self.startup.ready is None:
+            self.startup.ready = self.startup.elapsed()
         print("             _         _           _   \n"
                                "            | |       | |         | |  \n"
                                "  _ __   ___| | _____ | |__   ___ | |_ \n"
@@ -168,33 +306,16 @@ class NekoBot(commands.AutoShardedBot):
         logger.info(f"Shards: {self.shard_count}")
         logger.info(f"Servers {len(self.guilds)}")
         logger.info(f"Instance {self.instance}")
-        logger.info(f"Users {len(set(self.get_all_members()))}")
+        self.stats.start()
+        self.memory.start()
+        self.latency.start()
+        self.looplag.start()
+        self.webhooks.start()
+        logger.info(f"Users {self.stats.members}")
         await self.change_presence(status=discord.Status.idle)
 
-        if not hasattr(self, "instancePoster"):
-            self.instancePoster = True
-            while self.instancePoster:
-                await self.redis.set("instance%s-guilds" % self.instance, len(self.guilds))
-                await self.redis.set("instance%s-users" % self.instance, len(set(self.get_all_members())))
-                await self.redis.set("instance%s-messages" % self.instance, self.counter["messages_read"])
-                await self.redis.set("instance%s-commands" % self.instance, self.counter["commands_used"])
-                await self.redis.set("instance%s-channels" % self.instance, len(set(self.get_all_channels())))
-                logger.info(f"Updated Instance {self.instance}'s Guild Count with {len(self.guilds)}")
-
-                if self.instance == 0:
-
-                    top_users = await r.table("economy").order_by(r.desc("balance")).limit(10).run(self.r_conn)
-
-                    for i, u in enumerate(top_users):
-                        try:
-                            user = await self.get_user_info(int(u["id"]))
-                            username = user.name + "#" + user.discriminator
-                        except:
-                            username = "Unknown User"
-
-                        await self.redis.set("top%s" % i, username)
-
-                await asyncio.sleep(300)
+        if self.instance == 0:
+            self.leaderboard.start()
 
     def run(self):
         super().run(config.token)
@@ -0,0 +1,17 @@
+import os, sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import rethinkdb as r
+from modules.utils import activity
+from modules.utils.xpaccumulator import merge_xp
+
+def test_flush_query_builds():
+    doc = {
+        "id": "1",
+        "xp": 20,
+        "lastxp": "1000",
+        "blacklisted": False,
+        "xpactivity": activity.from_times([1000, 1200])
+    }
+    query = r.table("levelSystem").insert([doc], conflict=merge_xp(120), return_changes=True)
+    query.build()